@@ -0,0 +1,148 @@
+'''запечённый кэш спрайтов: уже нарезанные и увеличенные кадры одним файлом сырых пикселей
+
+при запуске файл отображается в память, и кадры создаются прямо поверх него через
+pygame.image.frombuffer, без декодирования PNG и масштабирования. Файл устаревает при
+изменении исходных листов, конфига анимаций или масштаба и тогда пересобирается
+
+запуск из корня репозитория:
+    python -m assets.bake           # пересобрать кэш
+    python -m assets.bake --report  # сравнить холодную и тёплую загрузку
+'''
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import time
+import pygame
+from config import FRAME_SCALE, SPRITE_CACHE_PATH
+from assets.config import ANIMATION_CONFIG
+from entities.sprite_cache import SpriteCache
+
+# заголовок: сигнатура, версия, отпечаток исходников, число листов
+HEADER = struct.Struct('<4sB20sI')
+# запись листа: число кадров, ширина и высота кадра, смещение пикселей от начала файла
+ENTRY = struct.Struct('<HHHQ')
+MAGIC = b'DRSC'
+VERSION = 1
+PIXEL_FORMAT = 'RGBA'
+
+
+def fingerprint(animation_config, scale) -> bytes:
+    '''отпечаток всего, от чего зависят пиксели: содержимое листов, конфиг и масштаб'''
+    digest = hashlib.sha1(f'{VERSION}:{PIXEL_FORMAT}:{float(scale)!r}'.encode())
+    for name, config in animation_config.items():
+        digest.update(f'{name}:{config["path"]}:{config["frame_count"]}'.encode())
+        with open(config['path'], 'rb') as file:
+            digest.update(file.read())
+    return digest.digest()
+
+
+def bake(animation_config, scale, path, cache: SpriteCache | None = None):
+    '''запись кадров всех листов в файл; кадры берутся из cache, если он уже заполнен'''
+    cache = cache or SpriteCache()
+    entries = []
+    pixels = []
+    offset = HEADER.size + ENTRY.size * len(animation_config)
+    for config in animation_config.values():
+        frames = cache.get_frames(config['path'], config['frame_count'], scale)
+        width, height = frames[0].get_size()
+        entries.append(ENTRY.pack(len(frames), width, height, offset))
+        for frame in frames:
+            data = pygame.image.tobytes(frame, PIXEL_FORMAT)
+            pixels.append(data)
+            offset += len(data)
+
+    # запись во временный файл и замена, чтобы прерванная сборка не оставила битый кэш
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, fingerprint(animation_config, scale), len(entries)))
+        file.writelines(entries)
+        file.writelines(pixels)
+    os.replace(temporary_path, path)
+
+
+def try_bake(animation_config, scale, path, cache: SpriteCache | None = None) -> bool:
+    '''bake, который не мешает игре: False, если файл записать не удалось'''
+    try:
+        bake(animation_config, scale, path, cache)
+    except OSError:
+        return False # каталог только для чтения: игра работает и без файла кэша
+    return True
+
+
+def load_baked(animation_config, scale, path):
+    '''(отображение файла, {ключ кэша: кадры}) или None, если кэша нет или он устарел'''
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None
+        magic, version, digest, count = HEADER.unpack(header)
+        if (magic != MAGIC or version != VERSION or count != len(animation_config)
+                or digest != fingerprint(animation_config, scale)):
+            return None
+        # копирование при записи: кадры только читаются, но файл на диске не должен меняться ни при каком блите
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    view = memoryview(mapped)
+    frames_by_key = {}
+    for i, config in enumerate(animation_config.values()):
+        frame_count, width, height, offset = ENTRY.unpack_from(mapped, HEADER.size + ENTRY.size * i)
+        frame_size = width * height * 4
+        frames_by_key[(config['path'], config['frame_count'], float(scale))] = tuple(
+            pygame.image.frombuffer(view[offset + j * frame_size:offset + (j + 1) * frame_size],
+                                    (width, height), PIXEL_FORMAT)
+            for j in range(frame_count))
+    return mapped, frames_by_key
+
+
+def preload_sprites(cache: SpriteCache, animation_config, scale, path=SPRITE_CACHE_PATH) -> dict:
+    '''заполнение кэша спрайтов из запечённого файла, а при его отсутствии — из PNG с пересборкой файла'''
+    start = time.perf_counter()
+    baked = load_baked(animation_config, scale, path) if path else None
+    if baked is not None:
+        mapped, frames_by_key = baked
+        cache.add_mapped(mapped, frames_by_key)
+        source = 'baked'
+    else:
+        cache.preload(animation_config, scale)
+        source = 'decoded'
+        if path:
+            try_bake(animation_config, scale, path, cache)
+    return {'source': source, 'ms': (time.perf_counter() - start) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='сборка кэша спрайтов')
+    parser.add_argument('--path', default=SPRITE_CACHE_PATH)
+    parser.add_argument('--report', action='store_true', help='замер холодной и тёплой загрузки')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if not args.report:
+        start = time.perf_counter()
+        bake(ANIMATION_CONFIG, FRAME_SCALE, args.path)
+        print(f'кэш спрайтов записан в {args.path} за {(time.perf_counter() - start) * 1000:.1f} мс, '
+              f'{os.path.getsize(args.path) / 1024:.0f} КБ')
+        return
+
+    # загрузка с окном, как в игре: в обоих случаях кадры приводятся к формату экрана
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    bake(ANIMATION_CONFIG, FRAME_SCALE, args.path)
+    for label, path in (('PNG (холодный запуск)', None), ('кэш (тёплый запуск)', args.path)):
+        timings = []
+        for _ in range(args.repeat):
+            timings.append(preload_sprites(SpriteCache(), ANIMATION_CONFIG, FRAME_SCALE, path)['ms'])
+        timings.sort()
+        print(f'{label:22} медиана {timings[len(timings) // 2]:.2f} мс, минимум {timings[0]:.2f} мс')
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
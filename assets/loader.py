@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from config import SPRITE_CACHE_PATH
+from assets.bake import load_baked, try_bake
+from entities.sprite_cache import SpriteCache
+
+
+class AssetLoader:
+    '''фоновая загрузка листов спрайтов в кэш, пока главный поток рисует экран загрузки
+
+    чтение запечённого файла и декодирование PNG идут в пуле потоков, а
+    приведение кадров к формату экрана (convert_alpha) выполняет главный поток
+    в poll. Листы, которые уже есть в кэше, не загружаются повторно
+    '''
+    def __init__(self, cache: SpriteCache, animation_config, scale, cache_path=SPRITE_CACHE_PATH, workers=4):
+        self.cache = cache
+        self.animation_config = animation_config
+        self.scale = scale
+        self.cache_path = cache_path
+        self.workers = workers
+        self.total = len(animation_config)
+        self.loaded = 0
+        self.source = None # 'cache' — всё уже было в памяти, 'baked' — из запечённого файла, 'decoded' — из PNG
+        self.ms = 0.0 # время от start до готовности
+        self.done = False
+        self._executor = None
+        self._baked = None
+        self._pending = {} # задача декодирования -> ключ кэша
+        self._start = 0.0
+
+    @property
+    def progress(self) -> float:
+        return self.loaded / self.total if self.total else 1.0
+
+    def start(self):
+        self._start = perf_counter()
+        missing = [config for config in self.animation_config.values()
+                   if not self.cache.contains(config['path'], config['frame_count'], self.scale)]
+        self.loaded = self.total - len(missing)
+        if not missing:
+            self._finish('cache')
+            return
+        self._executor = ThreadPoolExecutor(min(self.workers, len(missing)), thread_name_prefix='assets')
+        if self.cache_path and len(missing) == self.total:
+            # отпечаток исходников тоже считается в фоне: для него читаются все PNG
+            self._baked = self._executor.submit(load_baked, self.animation_config, self.scale, self.cache_path)
+        else:
+            self._decode(missing)
+
+    def _decode(self, configs):
+        for config in configs:
+            future = self._executor.submit(SpriteCache.decode_frames, config['path'], config['frame_count'],
+                                           self.scale)
+            self._pending[future] = (config['path'], config['frame_count'], float(self.scale))
+
+    def poll(self) -> bool:
+        '''перенос готовых результатов в кэш из главного потока; True, когда загрузка закончена'''
+        if self.done:
+            return True
+        if self._baked is not None:
+            if not self._baked.done():
+                return False
+            baked = self._baked.result()
+            self._baked = None
+            if baked is not None:
+                mapped, frames_by_key = baked
+                self.cache.add_mapped(mapped, frames_by_key)
+                self.loaded = self.total
+                self._finish('baked')
+                return True
+            self._decode(list(self.animation_config.values()))
+
+        for future in [future for future in self._pending if future.done()]:
+            # ошибка чтения файла всплывает здесь, в главном потоке
+            self.cache.add_frames(self._pending.pop(future), future.result())
+            self.loaded += 1
+        if self._pending:
+            return False
+
+        if self.cache_path:
+            # файл для следующих запусков пишется в фоне, кадры к этому моменту уже готовы
+            self._executor.submit(try_bake, self.animation_config, self.scale, self.cache_path, self.cache)
+        self._finish('decoded')
+        return True
+
+    def _finish(self, source):
+        self.source = source
+        self.ms = (perf_counter() - self._start) * 1000
+        self.done = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,97 @@
+'''цена попиксельных столкновений по сравнению с хитбоксами
+
+партия идёт при разном числе препятствий на экране, и на каждом шаге поиск ударов по динозавру
+выполняется в обоих режимах на одном и том же состоянии мира: так режимы сравниваются без шума
+от разного хода партии. Прибавка попиксельной проверки считается в процентах от шага с хитбоксами;
+если она выше порога, команда завершается с ошибкой.
+Запуск из корня репозитория:
+    python -m benchmarks.collision
+    python -m benchmarks.collision --counts 0 20 100 --steps 3000 --max-overhead 3
+'''
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import random
+import time
+from config import *
+from game.simulation import Simulation, ACTION_JUMP, ACTION_DUCK, ACTION_STAND_UP
+
+# прыжок, затем приседание: в замер попадают все кадры динозавра
+PATTERN = {0: (ACTION_JUMP,), 60: (ACTION_DUCK,), 100: (ACTION_STAND_UP,)}
+
+
+def _populate(simulation, count, rng):
+    '''препятствия между динозавром и правым краем: они постоянно наезжают на рамку его кадра'''
+    simulation.spawn_obstacles = False
+    for _ in range(count):
+        x = rng.randint(simulation.dinosaur.x, SCREEN_WIDTH)
+        if rng.random() < 0.5:
+            obstacle = simulation.flying_obstacle_pool.acquire(x, GROUND_LEVEL - rng.randint(40, 120),
+                                                               rng.randint(30, 50), rng.randint(20, 40),
+                                                               (0, 0, 255), False)
+        else:
+            obstacle = simulation.ground_obstacle_pool.acquire(x, 0, rng.randint(20, 60), rng.randint(20, 40),
+                                                               (0, 0, 255), False, 'jump')
+        simulation.add_obstacle(obstacle)
+
+
+def run(count, steps, rounds) -> tuple[float, float, float, int, int]:
+    '''время шага с хитбоксами и поиска ударов в обоих режимах в мкс и число найденных ударов в каждом режиме'''
+    rng = random.Random(count)
+    simulation = Simulation()
+    simulation.reset(count)
+    simulation.dinosaur.hp = 1 << 30 # партия не должна закончиться раньше замера
+    _populate(simulation, count, rng)
+    step_seconds = 0.0
+    seconds = [0.0, 0.0]
+    hits = [0, 0]
+    for step in range(steps):
+        if len(simulation.obstacles) < count // 2:
+            _populate(simulation, count - len(simulation.obstacles), rng)
+        simulation.pixel_collisions = False
+        start = time.perf_counter()
+        simulation.step(PATTERN.get(step % 120, ()))
+        step_seconds += time.perf_counter() - start
+        simulation.broadphase.refresh() # после шага в широкой фазе могут остаться удалённые препятствия
+        # режимы чередуются, чтобы фоновая нагрузка машины делилась между ними поровну
+        for _ in range(rounds):
+            for pixel in (False, True):
+                simulation.pixel_collisions = pixel
+                start = time.perf_counter()
+                simulation.dinosaur_hits()
+                seconds[pixel] += time.perf_counter() - start
+        for pixel in (False, True):
+            simulation.pixel_collisions = pixel
+            hits[pixel] += len(simulation.dinosaur_hits())
+    checks = steps * rounds
+    return (step_seconds / steps * 1e6, seconds[False] / checks * 1e6, seconds[True] / checks * 1e6,
+            hits[False], hits[True])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='замер попиксельных столкновений')
+    parser.add_argument('--counts', type=int, nargs='+', default=[0, 5, 20, 50, 100])
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5, help='повторов поиска ударов на каждом шаге')
+    parser.add_argument('--max-overhead', type=float, default=5.0, help='допустимая прибавка к шагу, %%')
+    args = parser.parse_args()
+
+    # маски кадров считаются при первом обращении, поэтому сначала холостой прогон
+    run(5, 1200, 1)
+    over = []
+    for count in args.counts:
+        step, rect_check, pixel_check, rect_hits, pixel_hits = run(count, args.steps, args.rounds)
+        overhead = (pixel_check - rect_check) / step * 100
+        print(f'препятствий {count:4d}: шаг {step:7.1f} мкс, поиск ударов {rect_check:5.2f} / {pixel_check:5.2f} мкс, '
+              f'прибавка к шагу {overhead:+5.1f}%, ударов {rect_hits} / {pixel_hits}')
+        if overhead > args.max_overhead:
+            over.append(count)
+    for count in over:
+        print(f'ПРЕВЫШЕНИЕ: препятствий {count}, прибавка выше {args.max_overhead:.1f}% шага')
+    raise SystemExit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+'''память сущностей: байт на объект и общий объём кучи Python при разном числе живых сущностей
+
+запуск из корня репозитория:
+    python -m benchmarks.memory                                   # 100, 1000 и 10000 сущностей
+    python -m benchmarks.memory --budget-entity 400 --budget-kb 20000
+'''
+import tracemalloc
+
+# отслеживание с самого начала, чтобы общий объём включал и модули игры
+tracemalloc.start()
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import gc
+import random
+from config import *
+from entities.fireball import create_fireball
+from entities.obstacles import GroundObstacle, FlyingObstacle
+from game.simulation import Simulation
+
+
+def _ground(rng):
+    is_destructible = rng.random() < 0.3
+    return GroundObstacle(SCREEN_WIDTH, 0, rng.randint(40, 60), rng.randint(20, 40),
+                          (255, 255, 0) if is_destructible else (0, 0, 255), is_destructible, 'jump')
+
+
+def _flying(rng):
+    is_destructible = rng.random() < 0.3
+    return FlyingObstacle(SCREEN_WIDTH, GROUND_LEVEL - rng.randint(50, 170), rng.randint(30, 50),
+                          rng.randint(30, 50), (255, 255, 0) if is_destructible else (0, 0, 255), is_destructible)
+
+
+def _fireball(rng):
+    return create_fireball(rng.randint(0, SCREEN_WIDTH), GROUND_LEVEL - 45, BASE_GAME_SPEED)
+
+
+FACTORIES = {'ground_obstacle': _ground, 'flying_obstacle': _flying, 'fireball': _fireball}
+
+
+def bytes_per_entity(factory, count=1000) -> float:
+    '''прирост кучи на одну сущность, включая её хитбокс, анимации и словари'''
+    rng = random.Random(0)
+    factory(rng) # общие для вида данные создаются при первом объекте и в замер не входят
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = [factory(rng) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    # сам список тоже занимает память, но к сущностям не относится
+    return (after - before - entities.__sizeof__()) / count
+
+
+def live_world(count) -> tuple[int, int]:
+    '''общий объём кучи и её прирост при count живых сущностях: две трети препятствий, треть снарядов'''
+    rng = random.Random(count)
+    simulation = Simulation()
+    simulation.spawn_obstacles = False
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        if i % 3 == 2:
+            fireball = simulation.fireball_pool.acquire(rng.randint(0, SCREEN_WIDTH), GROUND_LEVEL - 45,
+                                                        BASE_GAME_SPEED)
+            simulation.fireballs.append(fireball)
+            simulation.broadphase.add_fireball(fireball)
+        else:
+            simulation.add_obstacle((_ground if i % 3 else _flying)(rng))
+    total = tracemalloc.get_traced_memory()[0]
+    return total, total - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description='отчёт о памяти сущностей')
+    parser.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--budget-entity', type=float, help='предел байт на сущность любого вида')
+    parser.add_argument('--budget-kb', type=float, help='предел общего объёма кучи при наибольшем числе сущностей')
+    args = parser.parse_args()
+
+    over = []
+    largest = 0.0
+    for name, factory in FACTORIES.items():
+        size = bytes_per_entity(factory)
+        largest = max(largest, size)
+        print(f'{name:16} {size:8.0f} Б на объект')
+    if args.budget_entity is not None and largest > args.budget_entity:
+        over.append(f'{largest:.0f} Б на сущность > {args.budget_entity:.0f}')
+
+    total = 0
+    for count in args.counts:
+        total, entities = live_world(count)
+        print(f'живых сущностей {count:6d}: куча {total / 1024:9.0f} КБ, из них сущности {entities / 1024:8.0f} КБ '
+              f'({entities / count:.0f} Б на сущность)')
+    if args.budget_kb is not None and total / 1024 > args.budget_kb:
+        over.append(f'куча {total / 1024:.0f} КБ > {args.budget_kb:.0f}')
+
+    for line in over:
+        print('ПРЕВЫШЕНИЕ', line)
+    raise SystemExit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
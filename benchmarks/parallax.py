@@ -0,0 +1,81 @@
+'''цена параллакс-фона за кадр по сравнению со статичным фоном
+
+фон рисуется в окно (или в буфер мира при RENDER_SCALE > 1) при разной скорости игры;
+прибавка к кадру должна укладываться в бюджет, иначе команда завершается с ошибкой.
+Запуск из корня репозитория:
+    python -m benchmarks.parallax
+    python -m benchmarks.parallax --frames 5000 --budget-ms 0.5
+'''
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import time
+import pygame
+from config import *
+from game.parallax import Parallax
+from game.renderer import make_background
+from game.simulation import Simulation
+
+
+def _timings(draw, frames) -> list[float]:
+    timings = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        draw(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings
+
+
+def measure(frames, game_speed) -> tuple[list[float], list[float], int]:
+    '''времена кадра статичного фона и параллакса в мс и наибольшее число блитов параллакса за кадр'''
+    surface = pygame.display.get_surface()
+    if RENDER_SCALE > 1:
+        surface = pygame.Surface((SCREEN_WIDTH // RENDER_SCALE, SCREEN_HEIGHT // RENDER_SCALE)).convert()
+    background = make_background(RENDER_SCALE).convert()
+    parallax = Parallax(RENDER_SCALE)
+    simulation = Simulation()
+    simulation.reset(0)
+    blits = 0
+
+    def draw_parallax(frame):
+        nonlocal blits
+        # шаг партии без самой симуляции: фону нужен только пройденный путь
+        simulation.distance = frame * game_speed
+        blits = max(blits, parallax.draw(surface, simulation))
+
+    static = _timings(lambda frame: surface.blit(background, (0, 0)), frames)
+    layered = _timings(draw_parallax, frames)
+    return static, layered, blits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='замер параллакс-фона')
+    parser.add_argument('--frames', type=int, default=3000)
+    parser.add_argument('--speeds', type=int, nargs='+', default=[BASE_GAME_SPEED, 15, 40])
+    parser.add_argument('--budget-ms', type=float, default=1.0, help='допустимая прибавка к кадру')
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    over = []
+    for speed in args.speeds:
+        static, layered, blits = measure(args.frames, speed)
+        mean_static = sum(static) / len(static)
+        mean_layered = sum(layered) / len(layered)
+        p99 = layered[int(len(layered) * 0.99)]
+        added = mean_layered - mean_static
+        print(f'скорость {speed:3d}: статичный фон {mean_static:.3f} мс, параллакс {mean_layered:.3f} мс '
+              f'(p99 {p99:.3f}), прибавка {added:+.3f} мс, блитов до {blits}')
+        if added > args.budget_ms:
+            over.append(f'скорость {speed}: прибавка {added:.3f} мс > {args.budget_ms} мс')
+    pygame.quit()
+    for line in over:
+        print('ПРЕВЫШЕНИЕ', line)
+    raise SystemExit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+'''цена кадра и память спрайтов при отрисовке мира в уменьшенный буфер (RENDER_SCALE)
+
+масштаб задаётся в config.py до импорта игры, поэтому каждый режим замеряется в своём процессе.
+Запуск из корня репозитория:
+    python -m benchmarks.render_scale                  # RENDER_SCALE 1 и 3
+    python -m benchmarks.render_scale --scenario obstacles_200 --frames 1200
+'''
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import multiprocessing
+import config
+
+
+def _measure(scale, upscale, scenario, frames, results):
+    # до импорта игры: модули берут настройки из config при импорте
+    config.RENDER_SCALE = scale
+    config.RENDER_UPSCALE = upscale
+    config.FRAME_SCALE = config.SPRITE_SCALE / scale
+    config.SPRITE_CACHE_PATH = None # запечённый файл собран под основной масштаб и не должен перезаписываться
+    import pygame
+    from benchmarks.suite import run_scenario
+    from entities.composite_cache import composite_cache
+    from entities.sprite_cache import sprite_cache
+    from game.game_engine import GameEngine
+
+    engine = GameEngine(telemetry=False)
+    metrics = run_scenario(engine, scenario, frames)
+    metrics['sprite_kb'] = sprite_cache.stats()['memory_bytes'] / 1024
+    metrics['composite_kb'] = composite_cache.stats()['memory_bytes'] / 1024
+    pygame.quit()
+    results.put(metrics)
+
+
+def measure(scale, upscale, scenario, frames) -> dict[str, float]:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(scale, upscale, scenario, frames, results))
+    process.start()
+    metrics = results.get()
+    process.join()
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description='замер отрисовки через уменьшенный буфер мира')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 3])
+    parser.add_argument('--upscale', choices=('nearest', 'scale2x'), default='nearest')
+    parser.add_argument('--scenario', default='obstacles_50')
+    parser.add_argument('--frames', type=int, default=600)
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        metrics = measure(scale, args.upscale, args.scenario, args.frames)
+        print(f'RENDER_SCALE {scale}: отрисовка {metrics["draw_ms"]:.3f} мс, {metrics["fps"]:.0f} fps, '
+              f'кадры спрайтов {metrics["sprite_kb"]:.0f} КБ, собранные кадры {metrics["composite_kb"]:.0f} КБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+'''стоимость снимка и восстановления состояния симуляции в зависимости от числа сущностей
+
+запуск из корня репозитория:
+    python -m benchmarks.snapshot                  # проверка точности и замер
+    python -m benchmarks.snapshot --counts 0 50 200
+'''
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import random
+import time
+from config import *
+from game.simulation import Simulation, ACTION_JUMP, ACTION_DUCK, ACTION_STAND_UP, ACTION_SHOOT
+from game.snapshot import WorldSnapshot
+
+ACTIONS = ((), (ACTION_JUMP,), (ACTION_DUCK,), (ACTION_STAND_UP,), (ACTION_SHOOT,))
+
+
+def _random_actions(seed, steps) -> list[tuple]:
+    rng = random.Random(seed)
+    return [ACTIONS[rng.randrange(len(ACTIONS))] if rng.random() < 0.1 else () for _ in range(steps)]
+
+
+def _state(simulation, snapshot) -> bytes:
+    snapshot.capture(simulation)
+    return bytes(snapshot.buffer[:snapshot.used])
+
+
+def verify(seeds=20, steps=1200) -> int:
+    '''откат к середине партии и повтор тех же действий должны давать то же состояние, что и прямой прогон
+
+    проверяется и восстановление в другую симуляцию: её объекты никак не связаны с исходными
+    '''
+    mismatches = 0
+    saved = WorldSnapshot()
+    probe = WorldSnapshot()
+    other = Simulation()
+    for seed in range(seeds):
+        actions = _random_actions(seed, steps)
+        simulation = Simulation()
+        simulation.reset(seed)
+        middle = steps // 3
+        for step in range(steps):
+            if step == middle:
+                saved.capture(simulation)
+            simulation.step(actions[step])
+        expected = _state(simulation, probe)
+
+        for target in (simulation, other):
+            saved.restore(target)
+            for step in range(middle, steps):
+                target.step(actions[step])
+            if _state(target, probe) != expected:
+                mismatches += 1
+                print(f'зерно {seed}: расхождение после восстановления в {"ту же" if target is simulation else "другую"}'
+                      ' симуляцию')
+    return mismatches
+
+
+def _populate(simulation, count):
+    '''count препятствий и count / 4 снарядов в полёте'''
+    rng = random.Random(count)
+    simulation.spawn_obstacles = False
+    for _ in range(count):
+        x = rng.randint(0, SCREEN_WIDTH)
+        if rng.random() < 0.5:
+            obstacle = simulation.flying_obstacle_pool.acquire(x, GROUND_LEVEL - rng.randint(50, 170),
+                                                               rng.randint(30, 50), rng.randint(30, 50),
+                                                               (0, 0, 255), rng.random() < 0.3)
+        else:
+            obstacle = simulation.ground_obstacle_pool.acquire(x, 0, rng.randint(40, 60), rng.randint(20, 40),
+                                                               (0, 0, 255), rng.random() < 0.3, 'jump')
+        simulation.add_obstacle(obstacle)
+    for _ in range(count // 4):
+        fireball = simulation.fireball_pool.acquire(rng.randint(0, SCREEN_WIDTH), GROUND_LEVEL - 45,
+                                                    simulation.game_speed)
+        simulation.fireballs.append(fireball)
+        simulation.broadphase.add_fireball(fireball)
+
+
+def measure(count, repeat) -> tuple[float, float, int]:
+    '''среднее время снимка и восстановления в мкс и размер снимка в байтах'''
+    simulation = Simulation()
+    simulation.reset(count)
+    _populate(simulation, count)
+    snapshot = WorldSnapshot(max_obstacles=max(256, count), max_fireballs=max(64, count))
+    snapshot.capture(simulation)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        snapshot.capture(simulation)
+    capture_us = (time.perf_counter() - start) / repeat * 1e6
+    start = time.perf_counter()
+    for _ in range(repeat):
+        snapshot.restore(simulation)
+    restore_us = (time.perf_counter() - start) / repeat * 1e6
+    return capture_us, restore_us, snapshot.used
+
+
+def main():
+    parser = argparse.ArgumentParser(description='замер снимков состояния симуляции')
+    parser.add_argument('--counts', type=int, nargs='+', default=[0, 10, 50, 100, 200, 500])
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--skip-verify', action='store_true')
+    args = parser.parse_args()
+
+    if not args.skip_verify:
+        mismatches = verify()
+        print('откат и повтор: ' + (f'расхождений {mismatches}' if mismatches else 'расхождений нет'))
+        if mismatches:
+            raise SystemExit(1)
+    for count in args.counts:
+        capture_us, restore_us, size = measure(count, args.repeat)
+        print(f'препятствий {count:4d}, снарядов {count // 4:3d}: снимок {capture_us:8.1f} мкс, '
+              f'восстановление {restore_us:8.1f} мкс, {size} Б')
+
+
+if __name__ == '__main__':
+    main()
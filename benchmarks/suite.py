@@ -0,0 +1,187 @@
+'''набор замеров производительности горячих участков игры без окна
+
+запуск из корня репозитория:
+    python -m benchmarks.suite                    # замер и сравнение с baseline.json
+    python -m benchmarks.suite --update-baseline  # сохранить текущие результаты как эталон
+'''
+import os
+
+# без окна: SDL рисует в память, поэтому замеры воспроизводимы и на сервере
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+import pygame
+from config import *
+from game.game_engine import GameEngine
+from game.profiler import profiler
+from game.simulation import ACTION_JUMP, ACTION_DUCK, ACTION_STAND_UP, ACTION_SHOOT
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+ENDLESS_HP = 10 ** 9 # в нагрузочных сценариях партия не должна заканчиваться
+
+
+def _idle(simulation, frame):
+    return ()
+
+
+def _sustained_fire(simulation, frame):
+    return (ACTION_SHOOT,)
+
+
+def _duck_jump_toggle(simulation, frame):
+    return ((ACTION_DUCK,), (ACTION_STAND_UP,), (ACTION_JUMP,), ())[frame % 4]
+
+
+def _keep_obstacles(count):
+    '''сценарий с постоянным числом препятствий: ушедшие за экран сразу заменяются новыми справа'''
+    rng = random.Random(count)
+
+    def spawn(simulation, x):
+        if rng.random() < 0.5:
+            obstacle = simulation.flying_obstacle_pool.acquire(x, GROUND_LEVEL - rng.randint(50, 170),
+                                                               rng.randint(30, 50), rng.randint(30, 50),
+                                                               (0, 0, 255), rng.random() < 0.3)
+        else:
+            obstacle = simulation.ground_obstacle_pool.acquire(x, 0, rng.randint(40, 60), rng.randint(20, 40),
+                                                               (0, 0, 255), rng.random() < 0.3, 'jump')
+        simulation.add_obstacle(obstacle)
+
+    def setup(simulation):
+        simulation.spawn_obstacles = False
+        for _ in range(count):
+            spawn(simulation, rng.randint(0, SCREEN_WIDTH))
+
+    def actions(simulation, frame):
+        for _ in range(count - len(simulation.obstacles)):
+            spawn(simulation, SCREEN_WIDTH + rng.randint(0, 200))
+        return (ACTION_SHOOT,) if frame % 2 else ()
+
+    return setup, actions
+
+
+SCENARIOS = {
+    'idle_run': (None, _idle),
+    'sustained_fire': (None, _sustained_fire),
+    'obstacles_50': _keep_obstacles(50),
+    'obstacles_200': _keep_obstacles(200),
+    'obstacles_1000': _keep_obstacles(1000),
+    'duck_jump_toggle': (None, _duck_jump_toggle),
+}
+
+
+def _prepare(engine, name, seed):
+    engine.recorder = None
+    engine.simulation.recorder = None
+    engine.simulation.spawn_obstacles = True
+    engine.simulation.reset(seed)
+    engine.simulation.dinosaur.hp = ENDLESS_HP
+    setup, actions = SCENARIOS[name]
+    if setup:
+        setup(engine.simulation)
+    return actions
+
+
+def _run_frames(engine, actions, frames):
+    simulation = engine.simulation
+    for frame in range(frames):
+        profiler.begin_frame()
+        with profiler.section('step'):
+            simulation.step(actions(simulation, frame))
+        with profiler.section('draw'):
+            engine.draw()
+        profiler.end_frame()
+
+
+def run_scenario(engine, name, frames, seed=0) -> dict[str, float]:
+    # замер времени без tracemalloc: он сам по себе замедляет выделения памяти
+    profiler.reset(window=frames)
+    profiler.enabled = True
+    actions = _prepare(engine, name, seed)
+    start = time.perf_counter()
+    _run_frames(engine, actions, frames)
+    elapsed = time.perf_counter() - start
+    phases = profiler.phase_averages()
+    percentiles = profiler.percentiles()
+    profiler.enabled = False
+
+    # отдельный прогон того же сценария для пикового объёма памяти
+    actions = _prepare(engine, name, seed)
+    tracemalloc.start()
+    _run_frames(engine, actions, frames)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'fps': frames / elapsed,
+        'frame_p50_ms': percentiles['p50'],
+        'frame_p99_ms': percentiles['p99'],
+        'peak_memory_kb': peak / 1024,
+    }
+    for phase, ms in phases.items():
+        result[f'{phase}_ms'] = ms
+    return result
+
+
+def compare(results, baseline, tolerance) -> list[str]:
+    '''регрессии: fps ниже эталона или пиковая память выше эталона больше чем на tolerance'''
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if metrics['fps'] < reference['fps'] * (1 - tolerance):
+            regressions.append(f'{name}: fps {metrics["fps"]:.0f} < {reference["fps"]:.0f}')
+        if metrics['peak_memory_kb'] > reference['peak_memory_kb'] * (1 + tolerance):
+            regressions.append(f'{name}: память {metrics["peak_memory_kb"]:.0f} КБ > '
+                               f'{reference["peak_memory_kb"]:.0f} КБ')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='замеры производительности без окна')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='запустить только указанные сценарии')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое ухудшение, доля')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', help='сохранить результаты в JSON')
+    args = parser.parse_args()
+
+    engine = GameEngine(telemetry=False)
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(engine, name, args.frames)
+        metrics = results[name]
+        phases = ', '.join(f'{key[:-3]} {value:.3f}' for key, value in metrics.items()
+                           if key.endswith('_ms') and not key.startswith('frame'))
+        print(f'{name:18} {metrics["fps"]:8.0f} fps  p99 {metrics["frame_p99_ms"]:.2f} мс  '
+              f'память {metrics["peak_memory_kb"]:.0f} КБ  [{phases} мс]')
+    pygame.quit()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f'эталон сохранён в {args.baseline}')
+        return
+    if not os.path.exists(args.baseline):
+        print('эталона нет, сравнение пропущено')
+        return
+
+    with open(args.baseline, encoding='utf-8') as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    for regression in regressions:
+        print('РЕГРЕССИЯ', regression)
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
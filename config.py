@@ -2,11 +2,37 @@
 SCREEN_WIDTH = 1000
 SCREEN_HEIGHT = 400
 GROUND_LEVEL = 350
+FPS = 60 # ограничение частоты кадров отрисовки
+FRAME_PACING = 'fixed' # 'fixed' — не чаще FPS, 'vsync' — по монитору, 'uncapped' — без ожидания
+ADAPTIVE_RENDERING = True # при нехватке времени пропускать и упрощать отрисовку, а не замедлять игру
+MAX_RENDER_INTERVAL = 4 # под нагрузкой отрисовывается хотя бы каждый такой кадр
+SPRITE_SCALE = 3.0 # увеличение спрайтов на экране относительно исходного размера
+# мир рисуется в буфер в RENDER_SCALE раз меньше окна и увеличивается один раз за кадр;
+# при RENDER_SCALE = SPRITE_SCALE кадры хранятся и рисуются в исходном размере. Должен делить SPRITE_SCALE нацело
+RENDER_SCALE = 1
+RENDER_UPSCALE = 'nearest' # увеличение буфера мира: 'nearest' или 'scale2x' (RENDER_SCALE — степень двойки)
+FRAME_SCALE = SPRITE_SCALE / RENDER_SCALE # масштаб, в котором кадры хранятся в кэше спрайтов
+SPRITE_CACHE_PATH = 'assets/sprites.cache' # запечённые кадры; None — всегда загружать из PNG
+DIRTY_RECT_RENDERING = False # выводить на экран только изменившиеся области
+PARALLAX = True # прокручиваемые слои фона вместо статичного; с DIRTY_RECT_RENDERING не используется
+DINO_COMPOSITE_CACHE_SIZE = 2048 # сколько собранных кадров динозавра хранится в кэше (около 24 КБ каждый)
+DINO_COMPOSITE_RLE = True # RLE-ускорение собранных кадров динозавра
+HUD_TEXT_CACHE_SIZE = 64 # сколько отрисованных строк интерфейса хранится в кэше
+PROFILING = False # замеры кадра с запуска; F3 включает их и сводку на экране
+PROFILE_TRACE_PATH = 'profile_trace.json' # трассировка для chrome://tracing, рядом CSV
 
-# физика
+# физика (величины заданы на один шаг симуляции)
+SIMULATION_TICK_RATE = 60 # шагов симуляции в секунду, не зависит от FPS
+MAX_FRAME_TIME = 250 # больше этого времени за кадр симуляция не догоняет
 GRAVITY = 1
 JUMP_STRENGTH = 17
 DUCKING_GRAVITY_MULTIPLIER = 3
+PIXEL_COLLISIONS = False # удар по динозавру по пикселям видимого кадра, а не по хитбоксу
+
+# ввод
+INPUT_GRACE_MS = 100 # столько ждёт прыжок в воздухе или выстрел на перезарядке, прежде чем забыться
+INPUT_POLL_MS = 1 # шаг опроса ввода во время ожидания кадра: точность меток времени нажатий
+INPUT_LATENCY_PROBE = False # замер задержки от нажатия до кадра на экране: сводка при выходе и события телеметрии
 
 # скорости
 FIREBALL_SPEED = 5
@@ -16,4 +42,24 @@ SPEED_DECREMENT_ON_HIT = 2
 
 # время
 SPEED_INCREASE_INTERVAL = 10000
-FIREBALL_COOLDOWN = 1000
\ No newline at end of file
+FIREBALL_COOLDOWN = 1000
+
+# пулы сущностей
+ENTITY_POOL_CAPACITY = 256 # максимум свободных объектов каждого типа, хранимых для повторного использования
+
+# записи партий
+SESSION_SEED = None # зерно сессии; None — случайное при каждом запуске
+RECORD_REPLAYS = True # сохранять ввод каждой партии для точного повтора
+REPLAY_DIR = 'replays'
+
+# телеметрия
+TELEMETRY = True # записывать события партий в фоне
+TELEMETRY_DIR = 'telemetry'
+TELEMETRY_MAX_BYTES = 32 << 20 # старые файлы удаляются, чтобы каталог телеметрии не рос без предела
+TELEMETRY_FORMAT = 'binary' # 'binary' — записи фиксированного размера, 'ndjson' — по строке JSON на событие
+# сервер зрителей
+SPECTATOR_PORT = 8765
+SPECTATOR_TICK_RATE = 20 # снимков состояния в секунду
+SPECTATOR_HISTORY = 64 # сколько последних снимков хранится как опора для разностей
+SPECTATOR_INTERPOLATION_DELAY = 2 # на сколько снимков клиент показывает мир позже последнего полученного
+SPECTATOR_MAX_BUFFERED = 64 * 1024 # при большем объёме неотправленного клиент пропускает снимки
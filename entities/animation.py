@@ -1,75 +1,113 @@
-import pygame
+from entities.sprite_cache import sprite_cache
 
-class Animation:
-    def __init__(self, sprite_sheet_path, frame_count, frame_duration, loop=True, scale=1.0):
-        self.sprite_sheet = pygame.image.load(sprite_sheet_path).convert_alpha()
-        self.frame_count = frame_count
-        self.frame_width = self.sprite_sheet.get_width() // frame_count
-        self.frame_height = self.sprite_sheet.get_height()
+
+class AnimationClip:
+    '''общие для всех сущностей кадры и параметры воспроизведения одного листа'''
+    __slots__ = ('frames', 'frame_count', 'frame_duration', 'loop')
+
+    def __init__(self, frames, frame_duration, loop=True):
+        self.frames = frames
+        self.frame_count = len(frames)
         self.frame_duration = frame_duration
         self.loop = loop
-        self.scale = scale # пропорциональное увеличение спрайтов относительно исходного размера
-        self.frames = []
-        self._split_frames() # всегда делим лист на спрайты при инициализации
+
+
+_clips: dict[tuple, AnimationClip] = {}
+
+
+def get_clip(sprite_sheet_path, frame_count, frame_duration, loop=True, scale=1.0) -> AnimationClip:
+    '''клип из общего кэша; пересоздаётся, только если кэш спрайтов выдал новые кадры'''
+    frames = sprite_cache.get_frames(sprite_sheet_path, frame_count, scale)
+    key = (sprite_sheet_path, frame_count, frame_duration, loop, float(scale))
+    clip = _clips.get(key)
+    if clip is None or clip.frames is not frames:
+        clip = _clips[key] = AnimationClip(frames, frame_duration, loop)
+    return clip
+
+
+class Animation:
+    '''курсор воспроизведения поверх общего клипа: у каждой сущности только номер кадра и время'''
+    __slots__ = ('clip', 'current_frame', 'timer', 'active', 'forward')
+
+    def __init__(self, sprite_sheet_path, frame_count, frame_duration, loop=True, scale=1.0):
+        self.clip = get_clip(sprite_sheet_path, frame_count, frame_duration, loop, scale)
         self.current_frame = 0
         self.timer = 0
         self.active = True
         self.forward = True  # направление воспроизведения
-    
-    def _split_frames(self):
-        for i in range(self.frame_count):
-            frame_rect = pygame.Rect(
-                i * self.frame_width, 0,
-                self.frame_width, self.frame_height
-            )
-            frame = self.sprite_sheet.subsurface(frame_rect)
-            if self.scale != 1.0:
-                new_size = (int(self.frame_width * self.scale), int(self.frame_height * self.scale))
-                frame = pygame.transform.scale(frame, new_size)
-            self.frames.append(frame)
-    
+
+    @classmethod
+    def from_clip(cls, clip) -> 'Animation':
+        animation = cls.__new__(cls)
+        animation.clip = clip
+        animation.reset()
+        return animation
+
+    @property
+    def frames(self):
+        return self.clip.frames
+
+    @property
+    def frame_count(self) -> int:
+        return self.clip.frame_count
+
+    @property
+    def frame_duration(self):
+        return self.clip.frame_duration
+
+    @property
+    def loop(self) -> bool:
+        return self.clip.loop
+
     def update(self, dt, speed_multiplier=1.0):
         if not self.active:
             return
-            
+
+        clip = self.clip
         self.timer += dt
-        adjusted_duration = self.frame_duration / max(0.1, speed_multiplier)  # защита от деления на 0
-        
+        adjusted_duration = clip.frame_duration / max(0.1, speed_multiplier)  # защита от деления на 0
+
         if self.timer >= adjusted_duration:
             self.timer = 0
-            
+
             if self.forward:
                 self.current_frame += 1
-                if self.current_frame >= self.frame_count:
-                    if self.loop:
+                if self.current_frame >= clip.frame_count:
+                    if clip.loop:
                         self.current_frame = 0
                     else:
-                        self.current_frame = self.frame_count - 1
+                        self.current_frame = clip.frame_count - 1
                         self.active = False
             else:
                 self.current_frame -= 1
                 if self.current_frame < 0:
-                    if self.loop:
-                        self.current_frame = self.frame_count - 1
+                    if clip.loop:
+                        self.current_frame = clip.frame_count - 1
                     else:
                         self.current_frame = 0
                         self.active = False
-    
+
     def get_current_frame(self):
-        return self.frames[self.current_frame]
-    
+        return self.clip.frames[self.current_frame]
+
+    def play(self, clip, forward=True):
+        '''переключение курсора на другой клип с начала'''
+        self.clip = clip
+        self.reset(forward)
+
     def reset(self, forward=True):
-        self.current_frame = 0 if forward else self.frame_count - 1
+        self.current_frame = 0 if forward else self.clip.frame_count - 1
         self.timer = 0
         self.active = True
         self.forward = forward
-    
+
     def set_frame(self, frame_index):
-        self.current_frame = max(0, min(frame_index, self.frame_count - 1))
-    
+        self.current_frame = max(0, min(frame_index, self.clip.frame_count - 1))
+
     def is_complete(self) -> bool:
         '''проверка анимации на завершение'''
+        clip = self.clip
         if self.forward:
-            return self.current_frame >= self.frame_count - 1 and not self.loop
+            return self.current_frame >= clip.frame_count - 1 and not clip.loop
         else:
-            return self.current_frame <= 0 and not self.loop
\ No newline at end of file
+            return self.current_frame <= 0 and not clip.loop
\ No newline at end of file
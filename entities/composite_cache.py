@@ -0,0 +1,121 @@
+from collections import OrderedDict
+import pygame
+from config import DINO_COMPOSITE_CACHE_SIZE, DINO_COMPOSITE_RLE, RENDER_SCALE
+from entities.sprite_cache import sprite_cache
+
+
+class CompositeCache:
+    '''LRU-кэш кадров, собранных из нескольких слоёв, чтобы рисовать их одним блитом
+
+    ключ — кортеж слоёв ((кадр, (dx, dy)), ...) в порядке отрисовки; кадры берутся
+    из общего кэша спрайтов, поэтому одинаковые комбинации дают одинаковый ключ.
+    Смещения слоёв заданы в пикселях окна, а кадры хранятся в RENDER_SCALE раз мельче
+    '''
+    def __init__(self, max_size=256, rle=False, scale=1):
+        self.max_size = max_size
+        self.rle = rle # RLE-ускорение альфа-канала: быстрее блит, дольше сборка
+        self.scale = scale # пикселей окна на пиксель кадра
+        self._composites: OrderedDict[tuple, tuple[pygame.Surface, tuple[int, int]]] = OrderedDict()
+        self._masks: OrderedDict[tuple, tuple[pygame.mask.Mask, pygame.Rect]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0 # суммарный размер пикселей собранных кадров
+
+    def get(self, layers) -> tuple[pygame.Surface, tuple[int, int]]:
+        '''собранная поверхность и смещение её левого верхнего угла относительно точки привязки слоёв в пикселях кадра'''
+        composite = self._composites.get(layers)
+        if composite is not None:
+            self.hits += 1
+            self._composites.move_to_end(layers)
+            return composite
+
+        self.misses += 1
+        composite = self._compose(layers)
+        self._composites[layers] = composite
+        self.memory_bytes += self._size(composite[0])
+        if len(self._composites) > self.max_size:
+            _, (evicted, _) = self._composites.popitem(last=False)
+            self.memory_bytes -= self._size(evicted)
+            self.evictions += 1
+        return composite
+
+    def _compose(self, layers) -> tuple[pygame.Surface, tuple[int, int]]:
+        scale = self.scale
+        rects = [frame.get_rect(topleft=(x // scale, y // scale)) for frame, (x, y) in layers]
+        bounds = rects[0].unionall(rects[1:])
+        surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        # на полностью прозрачный пиксель слой копируется как есть, дальше смешивается поверх
+        for (frame, _), rect in zip(layers, rects):
+            surface.blit(frame, (rect.x - bounds.x, rect.y - bounds.y))
+        # прозрачные поля кадров отрезаются: меньше памяти на запись и пикселей на блит
+        opaque = surface.get_bounding_rect()
+        surface = surface.subsurface(opaque).copy()
+        bounds.move_ip(opaque.topleft)
+        if self.rle:
+            surface.set_alpha(255, pygame.RLEACCEL)
+        return surface, bounds.topleft
+
+    def get_mask(self, layers) -> tuple[pygame.mask.Mask, pygame.Rect]:
+        '''маска столкновений собранного кадра в пикселях окна и её область относительно точки привязки слоёв'''
+        entry = self._masks.get(layers)
+        if entry is not None:
+            self._masks.move_to_end(layers)
+            return entry
+        entry = self._masks[layers] = self._compose_mask(layers)
+        if len(self._masks) > self.max_size:
+            self._masks.popitem(last=False)
+        return entry
+
+    def _compose_mask(self, layers) -> tuple[pygame.mask.Mask, pygame.Rect]:
+        '''объединение обрезанных масок слоёв из кэша спрайтов: рамка сразу охватывает только занятые пиксели
+
+        маски увеличиваются до пикселей окна: у кадров, увеличенных без сглаживания, они совпадают
+        с масками полноразмерных кадров, поэтому столкновения не зависят от RENDER_SCALE
+        '''
+        scale = self.scale
+        parts = []
+        for frame, (x, y) in layers:
+            mask, area = sprite_cache.mask(frame)
+            if not area.w:
+                continue
+            if scale != 1:
+                mask = mask.scale((area.w * scale, area.h * scale))
+                area = pygame.Rect(area.x * scale, area.y * scale, area.w * scale, area.h * scale)
+            parts.append((mask, area.move(x, y)))
+        if not parts:
+            return pygame.mask.Mask((0, 0)), pygame.Rect(layers[0][1], (0, 0))
+        bounds = parts[0][1].unionall([area for _, area in parts[1:]])
+        composite = pygame.mask.Mask(bounds.size)
+        for mask, area in parts:
+            composite.draw(mask, (area.x - bounds.x, area.y - bounds.y))
+        return composite, bounds
+
+    @staticmethod
+    def _size(surface) -> int:
+        return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._composites),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'memory_bytes': self.memory_bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._composites.clear()
+        self._masks.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+
+
+# собранные кадры динозавра (ноги, тело, голова)
+composite_cache = CompositeCache(DINO_COMPOSITE_CACHE_SIZE, DINO_COMPOSITE_RLE, RENDER_SCALE)
@@ -1,11 +1,21 @@
 import pygame
-from config import GROUND_LEVEL, GRAVITY, JUMP_STRENGTH, DUCKING_GRAVITY_MULTIPLIER, FIREBALL_COOLDOWN
+from config import (GROUND_LEVEL, GRAVITY, JUMP_STRENGTH, DUCKING_GRAVITY_MULTIPLIER, FIREBALL_COOLDOWN, FRAME_SCALE,
+                    RENDER_SCALE)
 from entities.animation import Animation
-from entities.fireball import Fireball
-from assets.config import ANIMATION_CONFIG
+from entities.composite_cache import composite_cache
+from entities.sprite_cache import sprite_cache
+from entities.fireball import create_fireball
+from entities.pool import EntityPool
 
 class Dinosaur:
-    def __init__(self, x, y):
+    # хитбоксы отстают от x, y на шаг физики, на этом держатся столкновения, поэтому координаты хранятся отдельно
+    __slots__ = ('x', 'y', 'hp', 'velocity_y', 'cooldown', 'can_shoot', 'is_jumping', 'is_ducking', 'was_ducking',
+                 'is_running', 'is_alive', 'is_duck_key_pressed', 'fireball_pool', 'scheduler', 'animations',
+                 'current_head_anim', 'current_body_anim', 'current_legs_anim', 'is_shooting', 'duck_animation_frame',
+                 'shoot_delay_active', 'shot_ready', 'normal_rect', 'ducking_rect', 'reach_rect',
+                 'mask_layers', 'mask_entry')
+
+    def __init__(self, x, y, scheduler, fireball_pool: EntityPool | None = None):
         self.x = x
         self.y = y
         self.hp = 3
@@ -18,6 +28,10 @@ class Dinosaur:
         self.is_running = True
         self.is_alive = True
         self.is_duck_key_pressed = False
+        # снаряды берутся из пула, чтобы не создавать новый объект на каждый выстрел
+        self.fireball_pool = fireball_pool or EntityPool(create_fireball)
+        # кулдаун и задержка выстрела отсчитываются планировщиком по времени симуляции
+        self.scheduler = scheduler
 
         # анимации разных частей тела
         self.animations: dict[str, Animation] = {}
@@ -26,23 +40,34 @@ class Dinosaur:
         self.current_legs_anim = None
         self.is_shooting = False
         self.duck_animation_frame = 0
-        self.shoot_delay_timer = 0
         self.shoot_delay_active = False
+        self.shot_ready = False # задержка выстрела истекла, снаряд выпускается в ближайшем update
 
         # хитбоксы для разных состояний
         self.normal_rect = pygame.Rect(x, y, 40, 60)
         self.ducking_rect = pygame.Rect(x, y+20, 40, 30)
+        self.reach_rect = pygame.Rect(0, 0, 0, 0) # область, которую может занять любой кадр; см. reach
+        self.mask_layers = None # слои, для которых взята mask_entry: кадр анимации меняется реже шага
+        self.mask_entry = None
 
     def load_animations(self, animation_config: dict[str, dict[str, str | int]]):
         for anim_name, config in animation_config.items():
+            # листы снарядов динозавру не нужны
+            if not anim_name.startswith('dino_'):
+                continue
             self.animations[anim_name] = Animation(
                 config['path'],
                 config['frame_count'],
                 config['frame_duration'],
                 config.get('loop', True),
-                scale=3.0
+                scale=FRAME_SCALE
             )
         
+        frames = [frame for animation in self.animations.values() for frame in animation.frames]
+        # слои сдвинуты по вертикали на -23..-17 относительно y, поэтому к высоте кадра добавляется разброс
+        self.reach_rect.size = (max(frame.get_width() for frame in frames) * RENDER_SCALE,
+                                max(frame.get_height() for frame in frames) * RENDER_SCALE + 6)
+
         # установка начальных анимаций
         self.current_body_anim = self.animations['dino_body_run']
         self.current_head_anim = self.animations['dino_head_run']
@@ -52,8 +77,15 @@ class Dinosaur:
     def rect(self):
         return self.ducking_rect if self.is_ducking else self.normal_rect
 
+    def can_jump(self) -> bool:
+        return not self.is_jumping
+
+    def ready_to_shoot(self) -> bool:
+        '''сработает ли выстрел прямо сейчас: не присел, нет перезарядки и задержки прошлого выстрела'''
+        return not self.is_ducking and self.can_shoot and not self.shoot_delay_active
+
     def jump(self):
-        if not self.is_jumping:
+        if self.can_jump():
             # мгновенно меняем состояние хитбокса при прыжке
             if self.is_ducking:
                 self.is_ducking = False
@@ -80,31 +112,29 @@ class Dinosaur:
             duck_anim.reset(forward=True)
 
     def shoot(self, game_speed):
-        if not self.is_ducking and self.can_shoot and not self.shoot_delay_active:
-            current_time = pygame.time.get_ticks()
+        if self.ready_to_shoot():
             self.can_shoot = False
-            self.cooldown_timer = current_time + FIREBALL_COOLDOWN
+            self.scheduler.schedule(FIREBALL_COOLDOWN, self._end_cooldown)
             # Запуск анимации выстрела
             self.is_shooting = True
             self.current_head_anim = self.animations['dino_head_shoot']
             self.animations['dino_head_shoot'].reset(forward=True)
             # Задержка перед появлением снаряда
             self.shoot_delay_active = True
-            self.shoot_delay_timer = current_time + 200  # 200ms задержка перед появлением снаряда
+            self.scheduler.schedule(200, self._end_shoot_delay)  # 200ms задержка перед появлением снаряда
+
+    def _end_cooldown(self):
+        self.can_shoot = True
+
+    def _end_shoot_delay(self):
+        self.shoot_delay_active = False
+        self.shot_ready = True
 
     def update(self, dt, game_speed):
-        current_time = pygame.time.get_ticks()
-        # проверка кулдауна на выстрел
-        if not self.can_shoot and current_time >= self.cooldown_timer:
-            self.can_shoot = True
-        
-        # проверка задержки перед созданием снаряда
-        if self.shoot_delay_active and current_time >= self.shoot_delay_timer:
-            self.shoot_delay_active = False
-            fireball = Fireball(self.x + 50, self.y + 15, game_speed)
-            # загружаем анимации для снаряда
-            fireball.load_animations(ANIMATION_CONFIG)
-            return fireball
+        # создание снаряда после задержки
+        if self.shot_ready:
+            self.shot_ready = False
+            return self.fireball_pool.acquire(self.x + 50, self.y + 15, game_speed)
 
         # множитель скорости для анимаций на основании скорости игры
         speed_multiplier = game_speed / 10.0
@@ -170,32 +200,53 @@ class Dinosaur:
                     self.current_body_anim = self.animations['dino_body_duck']
                     self.current_head_anim = None
 
-    def draw(self, screen):
-        body_y = self.y
+    def layers(self) -> tuple:
+        '''части текущего кадра ((кадр, (dx, dy)), ...) в порядке отрисовки, относительно (x - 45, y)'''
+        layers = []
         if self.is_ducking and self.current_body_anim == self.animations['dino_body_duck']:
-            # отрисовка присевшего динозавра (тело + голова)
-            duck_frame = self.current_body_anim.get_current_frame()
-            screen.blit(duck_frame, (self.x - 45, body_y - 20))
-            
+            # присевший динозавр (тело + голова), ноги поверх
+            layers.append((self.current_body_anim.get_current_frame(), (0, -20)))
             if self.current_legs_anim:
-                legs_frame = self.current_legs_anim.get_current_frame()
-                screen.blit(legs_frame, (self.x - 45, body_y - 23))
-            
+                layers.append((self.current_legs_anim.get_current_frame(), (0, -23)))
         else:
-            # отрисовка динозавра по частям, если он не сидит
-            
-            # ноги
+            # ноги, тело и голова снизу вверх
             if self.current_legs_anim:
-                legs_frame = self.current_legs_anim.get_current_frame()
-                screen.blit(legs_frame, (self.x - 45, body_y - 23))
-            
-            # тело
+                layers.append((self.current_legs_anim.get_current_frame(), (0, -23)))
             if self.current_body_anim:
-                body_frame = self.current_body_anim.get_current_frame()
-                screen.blit(body_frame, (self.x - 45, body_y - 20))
-            
-            # голова
+                layers.append((self.current_body_anim.get_current_frame(), (0, -20)))
             if self.current_head_anim:
-                head_frame = self.current_head_anim.get_current_frame()
-                screen.blit(head_frame, (self.x - 45, body_y - 17))
-        
\ No newline at end of file
+                layers.append((self.current_head_anim.get_current_frame(), (0, -17)))
+        return tuple(layers)
+
+    def reach(self) -> pygame.Rect:
+        '''область, за пределы которой не выходит ни один кадр: дешёвое отсечение перед проверкой маски
+
+        прямоугольник один на динозавра и сдвигается на месте, поэтому действителен до следующего вызова
+        '''
+        rect = self.reach_rect
+        rect.x = self.x - 45
+        rect.y = self.y - 23
+        return rect
+
+    def collision_mask(self) -> tuple[pygame.mask.Mask, pygame.Rect]:
+        '''маска видимого кадра и занятая ею область экрана, для попиксельных столкновений'''
+        layers = self.layers()
+        if layers != self.mask_layers:
+            self.mask_layers = layers
+            self.mask_entry = composite_cache.get_mask(layers)
+        mask, area = self.mask_entry
+        return mask, area.move(self.x - 45, self.y)
+
+    def draw(self, screen, opaque=False) -> pygame.Rect | None:
+        '''отрисовка одним блитом кадра, собранного из частей, возвращает занятую им область
+
+        opaque — упрощённая отрисовка копией кадра без альфа-канала
+        '''
+        layers = self.layers()
+        if not layers:
+            return None
+        surface, (dx, dy) = composite_cache.get(layers)
+        if opaque:
+            surface = sprite_cache.opaque(surface)
+        # смещение собранного кадра уже в пикселях буфера мира
+        return screen.blit(surface, ((self.x - 45) // RENDER_SCALE + dx, self.y // RENDER_SCALE + dy))
@@ -1,41 +1,60 @@
 import pygame
-from config import SCREEN_WIDTH, FIREBALL_SPEED
-from entities.animation import Animation
+from config import SCREEN_WIDTH, FIREBALL_SPEED, FRAME_SCALE, RENDER_SCALE
+from entities.animation import Animation, AnimationClip, get_clip
+from entities.sprite_cache import sprite_cache
+from assets.config import ANIMATION_CONFIG
 
 
 class Fireball:
+    '''снаряд: хитбокс — единственный источник координат, кадры общие для всех снарядов'''
+    __slots__ = ('rect', 'serial', 'speed', 'game_speed', 'active', 'is_exploding', 'explosion_complete',
+                 'current_animation', 'sweep_index')
+    clips: dict[str, AnimationClip] = {} # полёт и взрыв, общие для всех снарядов
+
     def __init__(self, x, y, game_speed):
-        self.x = x
-        self.y = y
+        self.rect = pygame.Rect(x, y, 20, 20) # хитбокс
+        self.serial = 0 # сквозной номер появления, назначается симуляцией
+        self.sweep_index = -1 # место в списке широкой фазы, см. SweepAndPrune
+        self.current_animation = None # один курсор, который переключается между клипами полёта и взрыва
+        self.reset(x, y, game_speed)
+
+    @property
+    def x(self):
+        return self.rect.x
+
+    @property
+    def y(self):
+        return self.rect.y
+
+    def reset(self, x, y, game_speed):
+        '''повторная инициализация снаряда, взятого из пула'''
         self.speed = game_speed + FIREBALL_SPEED
         self.game_speed = game_speed  # сохранение скорости игры для движения взрыва
         self.active = True
-        self.rect = pygame.Rect(x, y, 20, 20) # хитбокс
-        # анимации
-        self.animations: dict[str, Animation] = {}
-        self.current_animation = None
+        self.rect.update(x, y, 20, 20)
         self.is_exploding = False
         self.explosion_complete = False
+        if self.current_animation:
+            self.current_animation.play(self.clips['fireball_fly'])
 
     def load_animations(self, animation_config: dict[str, dict[str, str | int]]):
         for anim_name, config in animation_config.items():
             if anim_name.startswith('fireball_'):
-                self.animations[anim_name] = Animation(
+                self.clips[anim_name] = get_clip(
                     config['path'],
                     config['frame_count'],
                     config['frame_duration'],
                     config.get('loop', True),
-                    scale=3.0
+                    scale=FRAME_SCALE
                 )
-        
+
         # установка начальной анимации полёта
-        self.current_animation = self.animations['fireball_fly']
+        self.current_animation = Animation.from_clip(self.clips['fireball_fly'])
 
     def explode(self):
         if not self.is_exploding:
             self.is_exploding = True
-            self.current_animation = self.animations['fireball_explode']
-            self.current_animation.reset(forward=True)
+            self.current_animation.play(self.clips['fireball_explode'])
             self.speed = -self.game_speed # для эффекта "привязки" к препятствию после столкновения
 
     def update(self, dt):
@@ -52,11 +71,11 @@ class Fireball:
                 self.explosion_complete = True
                 return
         
-        self.x += self.speed
-        self.rect.x = self.x
-        
+        rect = self.rect
+        rect.x += self.speed
+
         # деактивация при выходе за экран
-        if self.x > SCREEN_WIDTH or self.x < -100:
+        if rect.x > SCREEN_WIDTH or rect.x < -100:
             self.active = False
 
     def check_collision(self, obstacle):
@@ -66,7 +85,18 @@ class Fireball:
             return True
         return False
 
-    def draw(self, screen):
+    def draw(self, screen, opaque=False) -> pygame.Rect | None:
         if self.current_animation and self.active:
             frame = self.current_animation.get_current_frame()
-            screen.blit(frame, (self.x-10, self.y-10))
\ No newline at end of file
+            if opaque:
+                frame = sprite_cache.opaque(frame)
+            # кадры хранятся в масштабе буфера мира, координаты — в пикселях окна
+            return screen.blit(frame, ((self.rect.x-10) // RENDER_SCALE, (self.rect.y-10) // RENDER_SCALE))
+        return None
+
+
+def create_fireball(x, y, game_speed) -> Fireball:
+    '''фабрика для пула снарядов: новый снаряд сразу с анимациями'''
+    fireball = Fireball(x, y, game_speed)
+    fireball.load_animations(ANIMATION_CONFIG)
+    return fireball
@@ -2,25 +2,82 @@ import pygame
 from config import SCREEN_WIDTH, GROUND_LEVEL
 
 
-class Obstacle:
-    """базовый класс для всех препятствий"""
-    def __init__(self, x, y, width, height, color, is_destructible, obstacle_type, is_flying=False):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.destroyed = False
-        self.rect = pygame.Rect(x, y, width, height) # хитбокс
+class ObstacleKind:
+    '''неизменяемые свойства вида препятствия, один объект на все препятствия этого вида'''
+    __slots__ = ('color', 'obstacle_type', 'is_destructible', 'is_flying')
+
+    def __init__(self, color, obstacle_type, is_destructible, is_flying):
         self.color = color
-        self.is_destructible = is_destructible
         self.obstacle_type = obstacle_type
+        self.is_destructible = is_destructible
         self.is_flying = is_flying
+
+
+_kinds: dict[tuple, ObstacleKind] = {}
+
+
+def obstacle_kind(color, obstacle_type, is_destructible, is_flying) -> ObstacleKind:
+    key = (tuple(color), obstacle_type, bool(is_destructible), is_flying)
+    kind = _kinds.get(key)
+    if kind is None:
+        kind = _kinds[key] = ObstacleKind(*key)
+    return kind
+
+
+class Obstacle:
+    """базовый класс для всех препятствий
+
+    координаты и размеры хранятся только в хитбоксе, общие свойства вида — в ObstacleKind
+    """
+    __slots__ = ('rect', 'kind', 'serial', 'destroyed', 'health', 'sweep_index')
+
+    def __init__(self, x, y, width, height, color, is_destructible, obstacle_type, is_flying=False):
+        self.rect = pygame.Rect(x, y, width, height) # хитбокс
+        self.serial = 0 # сквозной номер появления, назначается симуляцией
+        self.sweep_index = -1 # место в списке широкой фазы, см. SweepAndPrune
+        self._init_state(x, y, width, height, color, is_destructible, obstacle_type, is_flying)
+
+    def _init_state(self, x, y, width, height, color, is_destructible, obstacle_type, is_flying):
+        self.rect.update(x, y, width, height)
+        self.kind = obstacle_kind(color, obstacle_type, is_destructible, is_flying)
+        self.destroyed = False
         self.health = 1 if is_destructible else 0
 
+    @property
+    def x(self):
+        return self.rect.x
+
+    @property
+    def y(self):
+        return self.rect.y
+
+    @property
+    def width(self):
+        return self.rect.w
+
+    @property
+    def height(self):
+        return self.rect.h
+
+    @property
+    def color(self):
+        return self.kind.color
+
+    @property
+    def obstacle_type(self):
+        return self.kind.obstacle_type
+
+    @property
+    def is_destructible(self):
+        return self.kind.is_destructible
+
+    @property
+    def is_flying(self):
+        return self.kind.is_flying
+
     def update(self, game_speed):
         # движение препятствия
-        self.x -= game_speed
-        self.rect.x = self.x
+        self.rect.x -= game_speed
 
     def check_collision(self, dinosaur) -> bool:
         '''проверка столкновения с дино '''
@@ -28,11 +85,11 @@ class Obstacle:
 
     def is_off_screen(self) -> bool:
         '''ушло ли препятствие ли за экран'''
-        return self.x + self.width < 0
+        return self.rect.right < 0
 
     def handle_fireball_collision(self, fireball) -> bool:
         """обработка столкновения с огненным шаром"""
-        if self.is_destructible:
+        if self.kind.is_destructible:
             self.health -= 1
             if self.health <= 0:
                 self.destroyed = True
@@ -42,15 +99,27 @@ class Obstacle:
 
 class GroundObstacle(Obstacle):
     '''наземные препятствия'''
+    __slots__ = ()
+
     def __init__(self, x, y, width, height, color, is_destructible, obstacle_type):
         ground_y = GROUND_LEVEL - height
         super().__init__(x, ground_y, width, height, color, is_destructible, obstacle_type, is_flying=False)
 
+    def reset(self, x, y, width, height, color, is_destructible, obstacle_type):
+        '''повторная инициализация препятствия, взятого из пула'''
+        ground_y = GROUND_LEVEL - height
+        self._init_state(x, ground_y, width, height, color, is_destructible, obstacle_type, is_flying=False)
+
 
 class FlyingObstacle(Obstacle):
     '''летающие препятствия'''
+    __slots__ = ()
+
     def __init__(self, x, y, width, height, color, is_destructible):
-        min_y = GROUND_LEVEL - height - 15
-        if y > min_y:
-            y = min_y
-        super().__init__(x, y, width, height, color, is_destructible, 'flying', is_flying=True)
\ No newline at end of file
+        y = min(y, GROUND_LEVEL - height - 15)
+        super().__init__(x, y, width, height, color, is_destructible, 'flying', is_flying=True)
+
+    def reset(self, x, y, width, height, color, is_destructible):
+        '''повторная инициализация препятствия, взятого из пула'''
+        y = min(y, GROUND_LEVEL - height - 15)
+        self._init_state(x, y, width, height, color, is_destructible, 'flying', is_flying=True)
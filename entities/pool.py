@@ -0,0 +1,43 @@
+class EntityPool:
+    '''пул сущностей: вышедшие из игры объекты сбрасываются через reset и выдаются повторно'''
+    def __init__(self, factory, capacity=64):
+        self.factory = factory # создаёт новый объект, если свободных в пуле нет
+        self.capacity = capacity # сколько свободных объектов пул держит про запас
+        self._free = []
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self.discarded = 0 # возвращённые сверх ёмкости и отданные сборщику мусора
+
+    def acquire(self, *args):
+        if self._free:
+            entity = self._free.pop()
+            entity.reset(*args)
+            self.reused += 1
+            return entity
+        self.created += 1
+        return self.factory(*args)
+
+    def release(self, entity):
+        self.released += 1
+        if len(self._free) < self.capacity:
+            self._free.append(entity)
+        else:
+            self.discarded += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'capacity': self.capacity,
+            'free': len(self._free),
+            'created': self.created,
+            'reused': self.reused,
+            'released': self.released,
+            'discarded': self.discarded,
+        }
+
+
+def swap_remove(items: list, index: int):
+    '''удаление за O(1): на место удаляемого элемента встаёт последний'''
+    last = items.pop()
+    if index < len(items):
+        items[index] = last
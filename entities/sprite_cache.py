@@ -0,0 +1,122 @@
+import weakref
+import pygame
+
+OPAQUE_COLORKEY = (255, 0, 255) # цвет прозрачных пикселей в копиях кадров без альфа-канала
+
+
+class SpriteCache:
+    '''общий на процесс кэш кадров анимаций по ключу (путь, число кадров, масштаб)'''
+    def __init__(self):
+        self._frames: dict[tuple[str, int, float], tuple[pygame.Surface, ...]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.memory_bytes = 0 # суммарный размер пикселей всех кадров в кэше
+        self._mapped = [] # отображённые в память файлы запечённых кадров, на которые ссылаются поверхности
+        # копии кадров без альфа-канала живут, пока жив сам кадр
+        self._opaque: weakref.WeakKeyDictionary[pygame.Surface, pygame.Surface] = weakref.WeakKeyDictionary()
+        # маски столкновений кадров, тоже на время жизни кадра
+        self._masks: weakref.WeakKeyDictionary[pygame.Surface, tuple[pygame.mask.Mask, pygame.Rect]] = weakref.WeakKeyDictionary()
+
+    def get_frames(self, sprite_sheet_path, frame_count, scale=1.0) -> tuple[pygame.Surface, ...]:
+        key = (sprite_sheet_path, frame_count, float(scale))
+        frames = self._frames.get(key)
+        if frames is not None:
+            self.hits += 1
+            return frames
+
+        self.misses += 1
+        frames = self.decode_frames(sprite_sheet_path, frame_count, scale)
+        self.add_frames(key, frames)
+        return self._frames[key]
+
+    def contains(self, sprite_sheet_path, frame_count, scale=1.0) -> bool:
+        return (sprite_sheet_path, frame_count, float(scale)) in self._frames
+
+    def add_frames(self, key, frames: tuple[pygame.Surface, ...]):
+        '''добавление декодированных кадров; вызывается из главного потока, так как кадры приводятся к формату экрана'''
+        # без окна (безголовая симуляция) преобразовывать формат пикселей не под что
+        if pygame.display.get_surface() is not None:
+            frames = tuple(frame.convert_alpha() for frame in frames)
+        self._frames[key] = frames
+        self.memory_bytes += sum(frame.get_bytesize() * frame.get_width() * frame.get_height()
+                                 for frame in frames)
+
+    def add_mapped(self, mapped, frames_by_key: dict[tuple[str, int, float], tuple[pygame.Surface, ...]]):
+        '''добавление готовых кадров из запечённого файла; mapped живёт, пока на него ссылаются кадры'''
+        self._mapped.append(mapped)
+        for key, frames in frames_by_key.items():
+            self.add_frames(key, frames)
+
+    def preload(self, animation_config: dict[str, dict[str, str | int]], scale=1.0):
+        '''загрузка всех листов из конфига заранее, чтобы не обращаться к диску посреди кадра'''
+        for config in animation_config.values():
+            key = (config['path'], config['frame_count'], float(scale))
+            if key not in self._frames:
+                self.get_frames(config['path'], config['frame_count'], scale)
+
+    @staticmethod
+    def decode_frames(sprite_sheet_path, frame_count, scale) -> tuple[pygame.Surface, ...]:
+        '''декодирование, нарезка и масштабирование листа; не зависит от окна, поэтому выполняется в любом потоке'''
+        sprite_sheet = pygame.image.load(sprite_sheet_path)
+        frame_width = sprite_sheet.get_width() // frame_count
+        frame_height = sprite_sheet.get_height()
+        frames = []
+        for i in range(frame_count):
+            frame_rect = pygame.Rect(i * frame_width, 0, frame_width, frame_height)
+            frame = sprite_sheet.subsurface(frame_rect)
+            if scale != 1.0:
+                new_size = (int(frame_width * scale), int(frame_height * scale))
+                frame = pygame.transform.scale(frame, new_size)
+            frames.append(frame)
+        # кортеж, чтобы общие кадры нельзя было случайно изменить через одну из анимаций
+        return tuple(frames)
+
+    def opaque(self, frame) -> pygame.Surface:
+        '''копия кадра с цветовым ключом вместо альфа-канала: блит без смешивания, полупрозрачность теряется'''
+        surface = self._opaque.get(frame)
+        if surface is None:
+            surface = pygame.Surface(frame.get_size())
+            surface.fill(OPAQUE_COLORKEY)
+            surface.blit(frame, (0, 0))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.set_colorkey(OPAQUE_COLORKEY, pygame.RLEACCEL)
+            self._opaque[frame] = surface
+        return surface
+
+    def mask(self, frame) -> tuple[pygame.mask.Mask, pygame.Rect]:
+        '''маска непрозрачных пикселей кадра, обрезанная по ним, и её место в кадре; считается один раз на кадр'''
+        entry = self._masks.get(frame)
+        if entry is None:
+            mask = pygame.mask.from_surface(frame)
+            rects = mask.get_bounding_rects()
+            if rects:
+                # пустые поля листа спрайтов в маску не попадают
+                area = rects[0].unionall(rects[1:])
+                cropped = pygame.mask.Mask(area.size)
+                cropped.draw(mask, (-area.x, -area.y))
+                entry = (cropped, area)
+            else:
+                entry = (mask, pygame.Rect(0, 0, 0, 0))
+            self._masks[frame] = entry
+        return entry
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'entries': len(self._frames),
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory_bytes': self.memory_bytes,
+        }
+
+    def clear(self):
+        self._frames.clear()
+        self._mapped.clear()
+        self._opaque.clear()
+        self._masks.clear()
+        self.hits = 0
+        self.misses = 0
+        self.memory_bytes = 0
+
+
+sprite_cache = SpriteCache()
@@ -0,0 +1,404 @@
+import argparse
+import random
+import time
+import numpy as np
+from config import *
+from assets.config import ANIMATION_CONFIG
+from game.simulation import Simulation, ACTIONS, STEP_MS
+
+# коды действий для массива actions, совпадают с индексами в ACTIONS
+NOOP, JUMP, DUCK, STAND_UP, SHOOT = range(len(ACTIONS))
+
+DINO_X = 100
+DINO_GROUND_Y = GROUND_LEVEL - 60
+DUCK_FRAMES = ANIMATION_CONFIG['dino_body_duck']['frame_count']
+DUCK_FRAME_DURATION = ANIMATION_CONFIG['dino_body_duck']['frame_duration']
+EXPLODE_FRAMES = ANIMATION_CONFIG['fireball_explode']['frame_count']
+EXPLODE_FRAME_DURATION = ANIMATION_CONFIG['fireball_explode']['frame_duration']
+SHOOT_DELAY = 200
+
+
+def _rect_coord(value):
+    '''округление координаты так же, как это делает pygame.Rect при присваивании float'''
+    return np.sign(value) * np.floor(np.abs(value) + 0.5)
+
+
+def _overlap(ax, ay, aw, ah, bx, by, bw, bh):
+    '''векторный аналог Rect.colliderect'''
+    return (ax < bx + bw) & (ax + aw > bx) & (ay < by + bh) & (ay + ah > by)
+
+
+class BatchSimulation:
+    '''N независимых партий в виде структуры массивов, один шаг продвигает сразу все партии
+
+    повторяет логику Simulation: Dinosaur.update, Fireball.update и
+    порядконезависимую обработку столкновений Simulation.check_collisions. Настраиваемые константы
+    можно задать скаляром или массивом длины num_games для перебора параметров
+    '''
+    def __init__(self, num_games, max_obstacles=16, max_fireballs=8, seed=None,
+                 jump_strength=JUMP_STRENGTH, speed_increment=SPEED_INCREMENT,
+                 speed_decrement_on_hit=SPEED_DECREMENT_ON_HIT, fireball_cooldown=FIREBALL_COOLDOWN):
+        self.num_games = num_games
+        self.max_obstacles = max_obstacles
+        self.max_fireballs = max_fireballs
+        self.step_ms = STEP_MS
+        self.rng = np.random.default_rng(seed)
+        self.spawn_obstacles = True
+
+        shape = (num_games,)
+        self.jump_strength = np.broadcast_to(np.asarray(jump_strength, dtype=float), shape).copy()
+        self.speed_increment = np.broadcast_to(np.asarray(speed_increment, dtype=float), shape).copy()
+        self.speed_decrement_on_hit = np.broadcast_to(np.asarray(speed_decrement_on_hit, dtype=float),
+                                                      shape).copy()
+        self.fireball_cooldown = np.broadcast_to(np.asarray(fireball_cooldown, dtype=float), shape).copy()
+
+        # сущности, которым не хватило слота
+        self.dropped_obstacles = 0
+        self.dropped_fireballs = 0
+        self.reset()
+
+    def reset(self):
+        n, m, f = self.num_games, self.max_obstacles, self.max_fireballs
+        self.time = np.zeros(n)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.game_speed = np.full(n, float(BASE_GAME_SPEED))
+        self.score = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        # сроки событий, которые Simulation ставит в планировщик
+        self.next_obstacle_at = self.rng.integers(1000, 3001, n).astype(float)
+        self.next_speed_at = np.full(n, float(SPEED_INCREASE_INTERVAL))
+
+        # динозавр
+        self.y = np.full(n, float(DINO_GROUND_Y))
+        self.velocity_y = np.zeros(n)
+        self.hp = np.full(n, 3, dtype=np.int64)
+        self.is_jumping = np.zeros(n, dtype=bool)
+        self.is_ducking = np.zeros(n, dtype=bool)
+        self.duck_key = np.zeros(n, dtype=bool)
+        self.can_shoot = np.ones(n, dtype=bool)
+        self.cooldown_until = np.zeros(n)
+        self.shoot_delay_active = np.zeros(n, dtype=bool)
+        self.shoot_at = np.zeros(n)
+        # хитбоксы обновляются в Dinosaur.update не на каждом кадре, поэтому хранятся отдельно от y
+        self.rect_y = np.full(n, float(DINO_GROUND_Y))
+        self.duck_rect_y = np.full(n, float(DINO_GROUND_Y + 20))
+        # курсор анимации приседания, от него зависит момент вставания
+        self.duck_frame = np.zeros(n, dtype=np.int64)
+        self.duck_timer = np.zeros(n)
+        self.duck_forward = np.ones(n, dtype=bool)
+        self.duck_active = np.ones(n, dtype=bool)
+
+        # препятствия
+        self.ob_active = np.zeros((n, m), dtype=bool)
+        self.ob_x = np.zeros((n, m))
+        self.ob_y = np.zeros((n, m))
+        self.ob_w = np.zeros((n, m))
+        self.ob_h = np.zeros((n, m))
+        self.ob_destructible = np.zeros((n, m), dtype=bool)
+
+        # снаряды
+        self.fb_active = np.zeros((n, f), dtype=bool)
+        self.fb_x = np.zeros((n, f))
+        self.fb_y = np.zeros((n, f))
+        self.fb_speed = np.zeros((n, f))
+        self.fb_game_speed = np.zeros((n, f))
+        self.fb_exploding = np.zeros((n, f), dtype=bool)
+        self.fb_frame = np.zeros((n, f), dtype=np.int64)
+        self.fb_timer = np.zeros((n, f))
+
+    def step(self, actions=None):
+        '''один фиксированный шаг для всех партий; actions — массив кодов действий длины num_games'''
+        alive = ~self.game_over
+        self.time[alive] += self.step_ms
+        self.ticks[alive] += 1
+        if actions is not None:
+            self._apply_actions(np.asarray(actions), alive)
+        self._run_timers(alive)
+        self._update_dinosaurs(alive)
+        self._update_fireballs(alive)
+        self._update_obstacles(alive)
+        self._check_collisions(alive)
+
+    def spawn_obstacle(self, games, x, y, width, height, is_destructible):
+        '''размещение препятствий в первых свободных слотах указанных партий'''
+        games = np.atleast_1d(games)
+        free = ~self.ob_active[games]
+        has_slot = free.any(axis=1)
+        self.dropped_obstacles += int((~has_slot).sum())
+        slots = free.argmax(axis=1)[has_slot]
+        idx = games[has_slot]
+        values = [np.broadcast_to(v, games.shape)[has_slot] for v in (x, y, width, height, is_destructible)]
+        self.ob_active[idx, slots] = True
+        self.ob_x[idx, slots] = values[0]
+        self.ob_y[idx, slots] = values[1]
+        self.ob_w[idx, slots] = values[2]
+        self.ob_h[idx, slots] = values[3]
+        self.ob_destructible[idx, slots] = values[4]
+
+    def _reset_duck_animation(self, mask, forward):
+        self.duck_frame[mask] = 0 if forward else DUCK_FRAMES - 1
+        self.duck_timer[mask] = 0
+        self.duck_active[mask] = True
+        self.duck_forward[mask] = forward
+
+    def _apply_actions(self, actions, alive):
+        # Dinosaur.jump
+        jump = alive & (actions == JUMP) & ~self.is_jumping
+        self.is_ducking[jump] = False
+        self.velocity_y[jump] = -self.jump_strength[jump]
+        self.is_jumping |= jump
+
+        # Dinosaur.duck
+        duck = alive & (actions == DUCK)
+        self.duck_key[duck] = True
+        start_duck = duck & ~self.is_jumping & ~self.is_ducking
+        self.is_ducking |= start_duck
+        self._reset_duck_animation(start_duck, forward=False)
+
+        # Dinosaur.stand_up
+        stand = alive & (actions == STAND_UP)
+        self.duck_key[stand] = False
+        self._reset_duck_animation(stand & self.is_ducking & ~self.is_jumping, forward=True)
+
+        # Dinosaur.shoot
+        shoot = alive & (actions == SHOOT) & ~self.is_ducking & self.can_shoot & ~self.shoot_delay_active
+        self.can_shoot[shoot] = False
+        self.cooldown_until[shoot] = self.time[shoot] + self.fireball_cooldown[shoot]
+        self.shoot_delay_active |= shoot
+        self.shoot_at[shoot] = self.time[shoot] + SHOOT_DELAY
+
+    def _update_dinosaurs(self, alive):
+        self.can_shoot |= alive & (self.time >= self.cooldown_until)
+
+        release = alive & self.shoot_delay_active & (self.time >= self.shoot_at)
+        self.shoot_delay_active[release] = False
+        self._spawn_fireballs(release)
+        # на кадре выпуска снаряда Dinosaur.update завершается сразу после его создания
+        moving = alive & ~release
+
+        # анимация приседания: кадр меняется раз в DUCK_FRAME_DURATION
+        playing = moving & self.is_ducking & self.duck_active
+        self.duck_timer[playing] += self.step_ms
+        advance = playing & (self.duck_timer >= DUCK_FRAME_DURATION)
+        self.duck_timer[advance] = 0
+        self.duck_frame += np.where(advance, np.where(self.duck_forward, 1, -1), 0)
+        past_end = advance & (self.duck_frame >= DUCK_FRAMES)
+        self.duck_frame[past_end] = DUCK_FRAMES - 1
+        before_start = advance & (self.duck_frame < 0)
+        self.duck_frame[before_start] = 0
+        self.duck_active[past_end | before_start] = False
+        # завершение анимации вставания
+        stood_up = moving & self.is_ducking & self.duck_forward & (self.duck_frame >= DUCK_FRAMES - 1)
+        self.is_ducking[stood_up] = False
+
+        # хитбоксы обновляются в присяде и в прыжке (до перемещения), но не при беге
+        self.duck_rect_y[moving & self.is_ducking] = GROUND_LEVEL - 30
+        airborne = moving & self.is_jumping & ~self.is_ducking
+        self.rect_y[airborne] = _rect_coord(self.y[airborne])
+
+        jumping = moving & self.is_jumping
+        gravity = np.where(self.duck_key, GRAVITY * DUCKING_GRAVITY_MULTIPLIER, GRAVITY)
+        self.velocity_y[jumping] += gravity[jumping]
+        self.y[jumping] += self.velocity_y[jumping]
+        landed = jumping & (self.y >= DINO_GROUND_Y)
+        self.y[landed] = DINO_GROUND_Y
+        self.is_jumping[landed] = False
+        self.velocity_y[landed] = 0
+        # приземление с зажатой клавишей приседания
+        duck_landing = landed & self.duck_key
+        self.is_ducking |= duck_landing
+        self._reset_duck_animation(duck_landing, forward=False)
+
+    def _spawn_fireballs(self, mask):
+        games = np.nonzero(mask)[0]
+        if not len(games):
+            return
+        free = ~self.fb_active[games]
+        has_slot = free.any(axis=1)
+        self.dropped_fireballs += int((~has_slot).sum())
+        games = games[has_slot]
+        slots = free.argmax(axis=1)[has_slot]
+        self.fb_active[games, slots] = True
+        self.fb_x[games, slots] = DINO_X + 50
+        self.fb_y[games, slots] = self.y[games] + 15
+        self.fb_speed[games, slots] = self.game_speed[games] + FIREBALL_SPEED
+        self.fb_game_speed[games, slots] = self.game_speed[games]
+        self.fb_exploding[games, slots] = False
+        self.fb_frame[games, slots] = 0
+        self.fb_timer[games, slots] = 0
+
+    def _update_fireballs(self, alive):
+        live = self.fb_active & alive[:, None]
+        exploding = live & self.fb_exploding
+        self.fb_timer[exploding] += self.step_ms
+        advance = exploding & (self.fb_timer >= EXPLODE_FRAME_DURATION)
+        self.fb_timer[advance] = 0
+        self.fb_frame[advance] = np.minimum(self.fb_frame[advance] + 1, EXPLODE_FRAMES - 1)
+        # после завершения взрыва снаряд исчезает, не сдвигаясь на этом кадре
+        finished = exploding & (self.fb_frame >= EXPLODE_FRAMES - 1)
+        self.fb_active[finished] = False
+
+        moving = live & ~finished
+        self.fb_x[moving] += self.fb_speed[moving]
+        off_screen = moving & ((self.fb_x > SCREEN_WIDTH) | (self.fb_x < -100))
+        self.fb_active[off_screen] = False
+
+    def _update_obstacles(self, alive):
+        live = self.ob_active & alive[:, None]
+        self.ob_x -= np.where(live, self.game_speed[:, None], 0)
+        off_screen = live & (self.ob_x + self.ob_w < 0)
+        self.ob_active[off_screen] = False
+        self.score += off_screen.sum(axis=1)
+
+    def _check_collisions(self, alive):
+        live = self.ob_active & alive[:, None]
+        ob_x = _rect_coord(self.ob_x)
+        dino_y = np.where(self.is_ducking, self.duck_rect_y, self.rect_y)[:, None]
+        dino_h = np.where(self.is_ducking, 30, 60)[:, None]
+        hits = live & _overlap(DINO_X, dino_y, 40, dino_h, ob_x, self.ob_y, self.ob_w, self.ob_h)
+
+        # как и в Simulation.check_collisions, за кадр учитываются все удары по динозавру
+        hit_count = hits.sum(axis=1)
+        self.ob_active[hits] = False
+        self.hp -= hit_count
+        self.game_speed = np.where(hit_count > 0,
+                                   np.maximum(BASE_GAME_SPEED,
+                                              self.game_speed - self.speed_decrement_on_hit * hit_count),
+                                   self.game_speed)
+        self.game_over |= alive & (self.hp <= 0)
+
+        # снаряды против препятствий считаются только в партиях, где есть и те и другие
+        remaining = live & ~hits
+        flying = self.fb_active & ~self.fb_exploding & alive[:, None]
+        rows = np.nonzero(flying.any(axis=1) & remaining.any(axis=1))[0]
+        if not len(rows):
+            return
+        fb_x = _rect_coord(self.fb_x[rows])[:, None, :]
+        fb_y = _rect_coord(self.fb_y[rows])[:, None, :]
+        pairs = (remaining[rows, :, None] & flying[rows, None, :] &
+                 _overlap(fb_x, fb_y, 20, 20, ob_x[rows, :, None], self.ob_y[rows, :, None],
+                          self.ob_w[rows, :, None], self.ob_h[rows, :, None]))
+        # каждый снаряд взрывается о самое левое задетое препятствие
+        claimed = pairs.any(axis=1)
+        target = np.where(pairs, ob_x[rows, :, None], np.inf).argmin(axis=1)
+        hit_rows, slots = np.nonzero(claimed)
+        games = rows[hit_rows]
+        self.fb_exploding[games, slots] = True
+        self.fb_speed[games, slots] = -self.fb_game_speed[games, slots]
+        self.fb_frame[games, slots] = 0
+        self.fb_timer[games, slots] = 0
+
+        struck = np.zeros((len(rows), self.max_obstacles), dtype=bool)
+        struck[hit_rows, target[hit_rows, slots]] = True
+        destroyed = struck & self.ob_destructible[rows]
+        self.ob_active[rows] &= ~destroyed
+        self.score[rows] += 2 * destroyed.sum(axis=1)
+
+    def _run_timers(self, alive):
+        '''события планировщика Simulation, наступившие к началу шага'''
+        due = alive & (self.time >= self.next_speed_at)
+        self.game_speed[due] += self.speed_increment[due]
+        self.next_speed_at[due] += SPEED_INCREASE_INTERVAL
+
+        spawn = alive & (self.time >= self.next_obstacle_at)
+        games = np.nonzero(spawn)[0]
+        if not len(games):
+            return
+        if self.spawn_obstacles:
+            self._generate_obstacles(games)
+        self.next_obstacle_at[games] = self.time[games] + self.rng.integers(1000, 3001, len(games))
+
+    def _generate_obstacles(self, games):
+        rng = self.rng
+        k = len(games)
+        is_destructible = rng.random(k) < 0.3
+        is_flying = rng.random(k) < 0.5
+        is_wall = ~is_flying & is_destructible & (rng.random(k) < 0.5)
+        width = np.where(is_flying | is_wall, rng.integers(30, 51, k), rng.integers(40, 61, k))
+        height = np.where(is_flying, rng.integers(30, 51, k),
+                          np.where(is_wall, rng.integers(180, 201, k), rng.integers(20, 41, k)))
+        flying_y = np.minimum(GROUND_LEVEL - rng.integers(50, 171, k), GROUND_LEVEL - height - 15)
+        y = np.where(is_flying, flying_y, GROUND_LEVEL - height)
+        self.spawn_obstacle(games, SCREEN_WIDTH, y, width, height, is_destructible)
+
+
+def check_parity(num_games=64, steps=3000, seed=0) -> int:
+    '''сверка BatchSimulation с Simulation на одинаковых действиях и препятствиях, возвращает число расхождений'''
+    rng = random.Random(seed)
+    batch = BatchSimulation(num_games, seed=seed)
+    batch.spawn_obstacles = False
+    games = []
+    for _ in range(num_games):
+        simulation = Simulation()
+        simulation.spawn_obstacles = False
+        simulation.pixel_collisions = False # пакетная симуляция считает столкновения только по хитбоксам
+        games.append(simulation)
+
+    mismatches = 0
+    for tick in range(steps):
+        actions = np.array([rng.choice((NOOP,) * 6 + (JUMP, DUCK, STAND_UP, SHOOT)) for _ in games])
+        for i, simulation in enumerate(games):
+            if actions[i] != NOOP:
+                simulation.step([ACTIONS[actions[i]]])
+            else:
+                simulation.step()
+        batch.step(actions)
+
+        # одинаковые препятствия появляются в обеих версиях до следующего шага
+        for i, simulation in enumerate(games):
+            if simulation.game_over or rng.random() > 0.01:
+                continue
+            if rng.random() < 0.5:
+                width, height = rng.randint(30, 50), rng.randint(30, 50)
+                y = min(GROUND_LEVEL - rng.randint(50, 170), GROUND_LEVEL - height - 15)
+                is_destructible = rng.random() < 0.3
+                obstacle = simulation.flying_obstacle_pool.acquire(SCREEN_WIDTH, y, width, height,
+                                                                   (0, 0, 255), is_destructible)
+            else:
+                width, height = rng.randint(40, 60), rng.randint(20, 40)
+                is_destructible = rng.random() < 0.3
+                obstacle = simulation.ground_obstacle_pool.acquire(SCREEN_WIDTH, 0, width, height,
+                                                                   (0, 0, 255), is_destructible, 'jump')
+            simulation.add_obstacle(obstacle)
+            batch.spawn_obstacle(i, SCREEN_WIDTH, obstacle.y, width, height, is_destructible)
+
+        for i, simulation in enumerate(games):
+            dinosaur = simulation.dinosaur
+            expected = (dinosaur.y, dinosaur.hp, simulation.score, simulation.game_speed, simulation.game_over,
+                        sorted((o.x, o.y, o.width, o.height) for o in simulation.obstacles),
+                        sorted((f.x, f.is_exploding) for f in simulation.fireballs))
+            actual = (batch.y[i], batch.hp[i], batch.score[i], batch.game_speed[i], batch.game_over[i],
+                      sorted(zip(batch.ob_x[i][batch.ob_active[i]], batch.ob_y[i][batch.ob_active[i]],
+                                 batch.ob_w[i][batch.ob_active[i]], batch.ob_h[i][batch.ob_active[i]])),
+                      sorted(zip(batch.fb_x[i][batch.fb_active[i]], batch.fb_exploding[i][batch.fb_active[i]])))
+            if expected != actual:
+                mismatches += 1
+                print(f'шаг {tick}, партия {i}: ожидалось {expected}, получено {actual}')
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='пакетная симуляция множества партий')
+    parser.add_argument('--games', type=int, default=4096)
+    parser.add_argument('--steps', type=int, default=3600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--parity', action='store_true', help='сверить результат со скалярной Simulation')
+    args = parser.parse_args()
+
+    if args.parity:
+        mismatches = check_parity(seed=args.seed)
+        print('расхождений нет' if not mismatches else f'расхождений: {mismatches}')
+        raise SystemExit(1 if mismatches else 0)
+
+    batch = BatchSimulation(args.games, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        batch.step(rng.integers(0, len(ACTIONS), args.games))
+    elapsed = time.perf_counter() - start
+    print(f'{args.games * args.steps / elapsed:.0f} шагов партий в секунду, '
+          f'средний счёт {batch.score.mean():.1f}, закончено партий {batch.game_over.sum()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+from bisect import bisect_left
+import pygame
+
+
+def _sort_live(items) -> int:
+    '''досортировка почти упорядоченного списка по левому краю хитбокса за O(n + число инверсий)
+
+    удалённые записи (None) выбрасываются в том же проходе, список укорачивается на месте,
+    а каждая сущность получает свой новый индекс; возвращает наибольшую ширину
+    '''
+    count = 0
+    widest = 0
+    for item in items:
+        if item is None:
+            continue
+        left = item.rect.x
+        j = count - 1
+        while j >= 0 and items[j].rect.x > left:
+            items[j + 1] = items[j]
+            j -= 1
+        items[j + 1] = item
+        count += 1
+    del items[count:]
+    for i in range(count):
+        item = items[i]
+        item.sweep_index = i
+        width = item.rect.w
+        if width > widest:
+            widest = width
+    return widest
+
+
+class SweepAndPrune:
+    '''широкая фаза столкновений: препятствия и снаряды в списках, упорядоченных по x
+
+    мир прокручивается по горизонтали, поэтому после движения порядок почти не
+    меняется и восстанавливается сортировкой вставками. Кандидаты ищутся
+    бинарным поиском по x с запасом на самую широкую сущность. Удаление
+    оставляет на месте сущности None по её sweep_index, а пропуски убираются
+    при следующем refresh, поэтому порядок остальных не нарушается
+    '''
+    def __init__(self):
+        self.obstacles = []
+        self.fireballs = []
+        self._keys = [] # левые края препятствий для бинарного поиска
+        self.max_obstacle_width = 0
+
+    def clear(self):
+        self.obstacles.clear()
+        self.fireballs.clear()
+        self._keys.clear()
+        self.max_obstacle_width = 0
+
+    def add_obstacle(self, obstacle):
+        obstacle.sweep_index = len(self.obstacles)
+        self.obstacles.append(obstacle)
+        self.max_obstacle_width = max(self.max_obstacle_width, obstacle.rect.w)
+
+    def add_fireball(self, fireball):
+        fireball.sweep_index = len(self.fireballs)
+        self.fireballs.append(fireball)
+
+    def remove_obstacle(self, obstacle):
+        self.obstacles[obstacle.sweep_index] = None
+
+    def remove_fireball(self, fireball):
+        self.fireballs[fireball.sweep_index] = None
+
+    def refresh(self):
+        '''восстановление порядка после перемещения и удаления сущностей'''
+        # ширина пересчитывается по живым препятствиям, чтобы окно поиска сужалось после широких
+        self.max_obstacle_width = _sort_live(self.obstacles)
+        _sort_live(self.fireballs)
+        obstacles = self.obstacles
+        keys = self._keys
+        del keys[len(obstacles):]
+        for i in range(len(keys)):
+            keys[i] = obstacles[i].rect.x
+        for i in range(len(keys), len(obstacles)):
+            keys.append(obstacles[i].rect.x)
+
+    def query_obstacles(self, rect) -> list:
+        '''препятствия, чей отрезок по x может пересекаться с rect, по возрастанию левого края'''
+        start = bisect_left(self._keys, rect.x - self.max_obstacle_width + 1)
+        end = bisect_left(self._keys, rect.right, start)
+        return self.obstacles[start:end]
+
+    def candidate_pairs(self):
+        '''пары (снаряд, препятствия-кандидаты) для узкой фазы'''
+        for fireball in self.fireballs:
+            candidates = self.query_obstacles(fireball.rect)
+            if candidates:
+                yield fireball, candidates
+
+
+_filled_masks: dict[tuple[int, int], pygame.mask.Mask] = {}
+
+
+def mask_hits(mask, mask_rect, obstacles) -> list:
+    '''препятствия, в прямоугольник которых попадают занятые пиксели маски, лежащей в mask_rect'''
+    hits = []
+    left, top = mask_rect.topleft
+    overlap = mask.overlap
+    for obstacle in obstacles:
+        rect = obstacle.rect
+        if not rect.colliderect(mask_rect):
+            continue
+        filled = _filled_masks.get(rect.size)
+        if filled is None:
+            # размеров препятствий немного, поэтому сплошные маски создаются один раз на размер
+            filled = _filled_masks[rect.size] = pygame.mask.Mask(rect.size, fill=True)
+        if overlap(filled, (rect.x - left, rect.y - top)) is not None:
+            hits.append(obstacle)
+    return hits
@@ -0,0 +1,251 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import pygame
+from config import *
+from game.renderer import draw_world
+from game.simulation import Simulation, ACTIONS
+
+# коды действий агента (индексы в ACTIONS)
+NOOP, JUMP, DUCK, STAND, SHOOT = range(len(ACTIONS))
+
+DINO_FEATURES = 8
+OBSTACLE_FEATURES = 6
+FIREBALL_FEATURES = 3
+HIT_PENALTY = 5.0 # штраф за потерянное здоровье в единицах счёта
+
+
+class DinoEnv:
+    '''среда для обучения с подкреплением в стиле gym поверх безголовой Simulation
+
+    наблюдение — вектор признаков float32 или, при pixels=True, словарь
+    {'features': ..., 'pixels': ...} с уменьшенным кадром (H, W, 3) uint8
+    '''
+    num_actions = len(ACTIONS)
+
+    def __init__(self, max_obstacles=4, max_fireballs=2, pixels=False, pixel_size=(100, 40), max_steps=None):
+        self.max_obstacles = max_obstacles
+        self.max_fireballs = max_fireballs
+        self.pixels = pixels
+        self.pixel_size = pixel_size
+        self.max_steps = max_steps
+        self.feature_size = (DINO_FEATURES + max_obstacles * OBSTACLE_FEATURES +
+                             max_fireballs * FIREBALL_FEATURES)
+        self.pixel_shape = (pixel_size[1], pixel_size[0], 3)
+        # мир рисуется в размере буфера мира: при RENDER_SCALE > 1 до уменьшения доходит меньше пикселей
+        self._canvas = pygame.Surface((SCREEN_WIDTH // RENDER_SCALE, SCREEN_HEIGHT // RENDER_SCALE)) if pixels else None
+        self._small = pygame.Surface(pixel_size) if pixels else None
+        self.simulation = Simulation()
+        self._last_score = 0
+        self._last_hp = self.simulation.dinosaur.hp
+
+    def reset(self, seed=None):
+        self.simulation.reset(seed)
+        self._last_score = 0
+        self._last_hp = self.simulation.dinosaur.hp
+        return self._observe(), self._info()
+
+    def step(self, action):
+        reward, terminated, truncated = self.advance(action)
+        return self._observe(), reward, terminated, truncated, self._info()
+
+    def advance(self, action) -> tuple[float, bool, bool]:
+        '''шаг без построения наблюдения: его пишет вызывающий код, например в общую память'''
+        simulation = self.simulation
+        if action != NOOP:
+            simulation.step((ACTIONS[action],))
+        else:
+            simulation.step()
+
+        hp = simulation.dinosaur.hp
+        reward = (simulation.score - self._last_score) - HIT_PENALTY * (self._last_hp - hp)
+        self._last_score = simulation.score
+        self._last_hp = hp
+        terminated = simulation.game_over
+        truncated = self.max_steps is not None and simulation.ticks >= self.max_steps
+        return float(reward), terminated, truncated
+
+    def _info(self) -> dict[str, int]:
+        simulation = self.simulation
+        return {'score': simulation.score, 'hp': simulation.dinosaur.hp, 'ticks': simulation.ticks}
+
+    def _observe(self, features=None, pixels=None):
+        features = self.write_features(np.empty(self.feature_size, dtype=np.float32) if features is None
+                                       else features)
+        if not self.pixels:
+            return features
+        pixels = self.write_pixels(np.empty(self.pixel_shape, dtype=np.uint8) if pixels is None else pixels)
+        return {'features': features, 'pixels': pixels}
+
+    def write_features(self, out):
+        '''заполнение out признаками: состояние динозавра, ближайшие препятствия и снаряды'''
+        simulation = self.simulation
+        dinosaur = simulation.dinosaur
+        out[:] = 0
+        out[:DINO_FEATURES] = (
+            dinosaur.y / SCREEN_HEIGHT,
+            dinosaur.velocity_y / JUMP_STRENGTH,
+            dinosaur.is_jumping,
+            dinosaur.is_ducking,
+            dinosaur.can_shoot,
+            dinosaur.shoot_delay_active,
+            dinosaur.hp / 3,
+            simulation.game_speed / BASE_GAME_SPEED,
+        )
+
+        # препятствия впереди динозавра, от ближайшего
+        ahead = sorted((o for o in simulation.obstacles if o.x + o.width >= dinosaur.x), key=lambda o: o.x)
+        offset = DINO_FEATURES
+        for obstacle in ahead[:self.max_obstacles]:
+            out[offset:offset + OBSTACLE_FEATURES] = (
+                (obstacle.x - dinosaur.x) / SCREEN_WIDTH,
+                obstacle.y / SCREEN_HEIGHT,
+                obstacle.width / SCREEN_WIDTH,
+                obstacle.height / SCREEN_HEIGHT,
+                obstacle.is_destructible,
+                obstacle.is_flying,
+            )
+            offset += OBSTACLE_FEATURES
+
+        offset = DINO_FEATURES + self.max_obstacles * OBSTACLE_FEATURES
+        for fireball in sorted(simulation.fireballs, key=lambda f: f.x)[:self.max_fireballs]:
+            out[offset:offset + FIREBALL_FEATURES] = (
+                (fireball.x - dinosaur.x) / SCREEN_WIDTH,
+                fireball.y / SCREEN_HEIGHT,
+                fireball.is_exploding,
+            )
+            offset += FIREBALL_FEATURES
+        return out
+
+    def write_pixels(self, out):
+        '''отрисовка мира тем же кодом, что и в окне, и уменьшение кадра до pixel_size'''
+        draw_world(self._canvas, self.simulation)
+        pygame.transform.scale(self._canvas, self.pixel_size, self._small)
+        out[:] = pygame.surfarray.pixels3d(self._small).swapaxes(0, 1)
+        return out
+
+
+def _attach(name, shape, dtype):
+    memory = shared_memory.SharedMemory(name=name)
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def _worker(conn, indices, buffer_specs, env_kwargs):
+    '''процесс с частью сред: наблюдения пишутся прямо в общую память, по каналу идут только действия'''
+    attached = {key: _attach(*spec) for key, spec in buffer_specs.items()}
+    buffers = {key: array for key, (_, array) in attached.items()}
+    envs = [DinoEnv(**env_kwargs) for _ in indices]
+    pixels = buffers.get('pixels')
+
+    def write(i, env):
+        env.write_features(buffers['features'][i])
+        if pixels is not None:
+            env.write_pixels(pixels[i])
+
+    try:
+        while True:
+            command, data = conn.recv()
+            if command == 'reset':
+                for env, i, seed in zip(envs, indices, data):
+                    env.reset(seed)
+                    write(i, env)
+                conn.send(None)
+            elif command == 'step':
+                finished = []
+                for env, i, action in zip(envs, indices, data):
+                    reward, terminated, truncated = env.advance(action)
+                    buffers['rewards'][i] = reward
+                    buffers['terminated'][i] = terminated
+                    buffers['truncated'][i] = truncated
+                    # законченная партия сразу перезапускается, итог и последнее наблюдение уходят в info:
+                    # в общей памяти его заменит наблюдение новой партии, а при обрезке оно нужно для оценки
+                    if terminated or truncated:
+                        info = env._info()
+                        info['final_observation'] = env._observe()
+                        finished.append((i, info))
+                        env.reset()
+                    write(i, env)
+                conn.send(finished)
+            elif command == 'close':
+                break
+    finally:
+        for memory, _ in attached.values():
+            memory.close()
+        conn.close()
+
+
+class VectorEnv:
+    '''K сред DinoEnv в пуле процессов с общей памятью под наблюдения и награды'''
+    def __init__(self, num_envs, processes=None, **env_kwargs):
+        self.num_envs = num_envs
+        processes = min(processes or mp.cpu_count(), num_envs)
+        probe = DinoEnv(**env_kwargs)
+        self.pixels = probe.pixels
+
+        specs = {
+            'features': ((num_envs, probe.feature_size), np.float32),
+            'rewards': ((num_envs,), np.float32),
+            'terminated': ((num_envs,), np.bool_),
+            'truncated': ((num_envs,), np.bool_),
+        }
+        if probe.pixels:
+            specs['pixels'] = ((num_envs,) + probe.pixel_shape, np.uint8)
+        self._memory = {}
+        self.buffers = {}
+        buffer_specs = {}
+        for key, (shape, dtype) in specs.items():
+            size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            memory = shared_memory.SharedMemory(create=True, size=size)
+            self._memory[key] = memory
+            self.buffers[key] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+            buffer_specs[key] = (memory.name, shape, dtype)
+
+        # среды раздаются процессам по кругу
+        self._slices = [range(num_envs)[p::processes] for p in range(processes)]
+        self._conns = []
+        self._processes = []
+        for indices in self._slices:
+            parent, child = mp.Pipe()
+            process = mp.Process(target=_worker, args=(child, list(indices), buffer_specs, env_kwargs),
+                                 daemon=True)
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+
+    def _observations(self):
+        features = self.buffers['features'].copy()
+        if not self.pixels:
+            return features
+        return {'features': features, 'pixels': self.buffers['pixels'].copy()}
+
+    def reset(self, seed=None):
+        for conn, indices in zip(self._conns, self._slices):
+            conn.send(('reset', [None if seed is None else seed + i for i in indices]))
+        for conn in self._conns:
+            conn.recv()
+        return self._observations()
+
+    def step(self, actions):
+        '''infos — {индекс среды: info} для законченных на этом шаге партий; наблюдение в ответе
+        уже от новой партии, последнее наблюдение старой — в info['final_observation']
+        '''
+        actions = np.asarray(actions)
+        for conn, indices in zip(self._conns, self._slices):
+            conn.send(('step', actions[list(indices)].tolist()))
+        infos = {}
+        for conn in self._conns:
+            infos.update(conn.recv())
+        return (self._observations(), self.buffers['rewards'].copy(), self.buffers['terminated'].copy(),
+                self.buffers['truncated'].copy(), infos)
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(('close', None))
+            conn.close()
+        for process in self._processes:
+            process.join()
+        for memory in self._memory.values():
+            memory.close()
+            memory.unlink()
+        self._conns = []
@@ -0,0 +1,223 @@
+'''отрисовка записанных партий в кадры без окна: наборы данных и ролики
+
+партия повторяется по записи, а кадры рисуются тем же кодом, что и в окне
+игры. Записи раздаются пулу процессов, у каждого свой кэш спрайтов.
+Запуск из корня репозитория:
+    python -m game.frames replays/*.drr --format png --out frames
+    python -m game.frames replays/*.drr --format npy --scale 0.5 --stride 2
+    python -m game.frames replays/x.drr --format raw --out - | ffmpeg -f rawvideo -pix_fmt rgb24 -s 1000x400 -r 60 -i - x.mp4
+'''
+import os
+
+# без окна: SDL рисует в память
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import multiprocessing
+import sys
+import time
+import numpy as np
+import pygame
+from config import *
+from assets.bake import preload_sprites
+from assets.config import ANIMATION_CONFIG
+from entities.sprite_cache import sprite_cache
+from game.hud import Hud
+from game.parallax import Parallax
+from game.renderer import BackBuffer, draw_entities, hud_items, make_background, uses_parallax
+from game.replay import Replay, replay_steps, start_replay
+from game.simulation import Simulation
+
+FORMAT_NPY = 'npy' # один массив (кадры, высота, ширина, 3) uint8 на запись
+FORMAT_PNG = 'png' # каталог с кадрами на запись
+FORMAT_RAW = 'raw' # поток RGB24 без заголовков, например для ffmpeg
+FORMATS = (FORMAT_NPY, FORMAT_PNG, FORMAT_RAW)
+HINT_MS = 3000 # подсказка управления видна первые секунды партии, если была видна игроку
+
+
+class FrameRenderer:
+    '''внеэкранный кадр партии: мир, интерфейс и уменьшение до нужного размера
+
+    поверхности выделяются один раз и переиспользуются для всех кадров
+    '''
+    def __init__(self, scale=1.0, hud=True, smooth=True, parallax=None):
+        pygame.init()
+        if pygame.display.get_surface() is None:
+            # окно 1×1 в памяти нужно только для convert_alpha, то есть для тех же форматов кадров, что в игре
+            pygame.display.set_mode((1, 1))
+        self.canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.background = make_background().convert()
+        # при RENDER_SCALE > 1 мир рисуется в малый буфер и увеличивается до размера окна, как в игре
+        self.back_buffer = BackBuffer(self.canvas) if RENDER_SCALE > 1 else None
+        # по умолчанию фон тот же, что видел игрок в окне с текущими настройками
+        self.parallax = Parallax(RENDER_SCALE) if (uses_parallax() if parallax is None else parallax) else None
+        self.size = (max(1, round(SCREEN_WIDTH * scale)), max(1, round(SCREEN_HEIGHT * scale)))
+        self.output = self.canvas if self.size == self.canvas.get_size() else pygame.Surface(self.size).convert()
+        self.smooth = smooth
+        self.hud = Hud(HUD_TEXT_CACHE_SIZE) if hud else None
+        if hud:
+            self.font = pygame.font.Font(None, 36)
+            self.big_font = pygame.font.Font(None, 72)
+            self.small_font = pygame.font.Font(None, 24)
+
+    def render(self, simulation, controls_hint=True) -> pygame.Surface:
+        '''controls_hint — была ли в этой партии подсказка управления; видна первые HINT_MS'''
+        canvas = self.canvas
+        world = canvas if self.back_buffer is None else self.back_buffer.surface
+        if self.parallax is not None:
+            self.parallax.draw(world, simulation)
+        elif self.back_buffer is not None:
+            self.back_buffer.clear()
+        else:
+            canvas.blit(self.background, (0, 0))
+        draw_entities(world, simulation)
+        if self.back_buffer is not None:
+            self.back_buffer.present()
+        if self.hud is not None:
+            self.hud.draw(canvas, hud_items(simulation, self.font, self.big_font, self.small_font,
+                                            controls_hint and simulation.clock.now() < HINT_MS))
+        if self.output is not canvas:
+            if self.smooth:
+                pygame.transform.smoothscale(canvas, self.size, self.output)
+            else:
+                pygame.transform.scale(canvas, self.size, self.output)
+        return self.output
+
+    def to_array(self, surface, out=None) -> np.ndarray:
+        '''кадр как (высота, ширина, 3) uint8; out — заранее выделенный массив под результат'''
+        # одно плотное копирование строк вдвое быстрее перестановки осей у pixels3d
+        width, height = surface.get_size()
+        pixels = np.frombuffer(pygame.image.tobytes(surface, 'RGB'), np.uint8).reshape(height, width, 3)
+        if out is None:
+            return pixels.copy()
+        out[:] = pixels
+        return out
+
+
+def frame_count(replay: Replay, stride=1) -> int:
+    '''сколько кадров даст запись: начальный кадр и каждый stride-й шаг'''
+    return replay.ticks // stride + 1
+
+
+def iter_frames(replay: Replay, renderer: FrameRenderer, stride=1, simulation=None):
+    '''повтор партии с отрисовкой каждого stride-го шага; отдаёт одну и ту же поверхность renderer'''
+    simulation = start_replay(replay, simulation)
+    hint = replay.controls_hint
+    yield renderer.render(simulation, hint)
+    for tick, actions in replay_steps(replay):
+        simulation.step(actions)
+        if tick % stride == 0:
+            yield renderer.render(simulation, hint)
+
+
+def render_arrays(replay: Replay, scale=1.0, stride=1, hud=True):
+    '''кадры записи как массивы NumPy по одному, без записи на диск'''
+    renderer = FrameRenderer(scale, hud)
+    for surface in iter_frames(replay, renderer, stride):
+        yield renderer.to_array(surface)
+
+
+def _output_path(out, path, file_format) -> str:
+    name = os.path.splitext(os.path.basename(path))[0]
+    if file_format == FORMAT_PNG:
+        return os.path.join(out, name)
+    return os.path.join(out, f'{name}.{"rgb" if file_format == FORMAT_RAW else file_format}')
+
+
+def render_replay(path, renderer, file_format, out, stride=1, simulation=None) -> int:
+    '''отрисовка одной записи в файл или поток; возвращает число кадров'''
+    replay = Replay.load(path)
+    frames = iter_frames(replay, renderer, stride, simulation)
+    count = 0
+    if file_format == FORMAT_NPY:
+        width, height = renderer.size
+        # массив пишется на диск по мере отрисовки, а не собирается в памяти
+        array = np.lib.format.open_memmap(_output_path(out, path, file_format), mode='w+', dtype=np.uint8,
+                                          shape=(frame_count(replay, stride), height, width, 3))
+        for surface in frames:
+            renderer.to_array(surface, array[count])
+            count += 1
+        array.flush()
+        del array
+    elif file_format == FORMAT_PNG:
+        directory = _output_path(out, path, file_format)
+        os.makedirs(directory, exist_ok=True)
+        for surface in frames:
+            pygame.image.save(surface, os.path.join(directory, f'{count:06d}.png'))
+            count += 1
+    else:
+        stream = sys.stdout.buffer if out == '-' else open(_output_path(out, path, file_format), 'wb')
+        try:
+            for surface in frames:
+                stream.write(pygame.image.tobytes(surface, 'RGB'))
+                count += 1
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+    return count
+
+
+# состояние процесса пула: кэш спрайтов, поверхности и симуляция живут между записями
+_worker = None
+
+
+def _init_worker(scale, hud, smooth):
+    global _worker
+    renderer = FrameRenderer(scale, hud, smooth)
+    loaded = preload_sprites(sprite_cache, ANIMATION_CONFIG, FRAME_SCALE, SPRITE_CACHE_PATH)
+    _worker = (renderer, Simulation(), loaded)
+
+
+def _render_task(task) -> tuple[str, int, float]:
+    path, file_format, out, stride = task
+    renderer, simulation, _ = _worker
+    cpu_start = time.process_time()
+    count = render_replay(path, renderer, file_format, out, stride, simulation)
+    return path, count, time.process_time() - cpu_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='отрисовка записанных партий в кадры без окна')
+    parser.add_argument('paths', nargs='+', help='файлы записей .drr')
+    parser.add_argument('--format', choices=FORMATS, default=FORMAT_NPY)
+    parser.add_argument('--out', default='frames', help="каталог результатов; для raw '-' — стандартный вывод")
+    parser.add_argument('--scale', type=float, default=1.0, help='уменьшение кадра, например 0.5')
+    parser.add_argument('--nearest', action='store_true', help='уменьшать без сглаживания')
+    parser.add_argument('--stride', type=int, default=1, help='сохранять каждый stride-й шаг')
+    parser.add_argument('--no-hud', action='store_true', help='без счёта и надписей')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if args.out == '-' and (args.format != FORMAT_RAW or len(args.paths) > 1):
+        parser.error("'--out -' работает только для одной записи в формате raw")
+    if args.out != '-':
+        os.makedirs(args.out, exist_ok=True)
+
+    tasks = [(path, args.format, args.out, args.stride) for path in args.paths]
+    workers = max(1, min(args.workers, len(tasks)))
+    initargs = (args.scale, not args.no_hud, not args.nearest)
+    # в поток stdout пишет только этот процесс, поэтому сводка уходит в stderr
+    log = sys.stderr if args.out == '-' else sys.stdout
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(*initargs)
+        results = map(_render_task, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, _init_worker, initargs)
+        results = pool.imap_unordered(_render_task, tasks)
+    frames = 0
+    cpu = 0.0
+    for path, count, seconds in results:
+        frames += count
+        cpu += seconds
+        print(f'{path}: {count} кадров, {count / max(seconds, 1e-9):.0f} кадров/с', file=log)
+    if pool is not None:
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+    print(f'записей: {len(tasks)}, кадров: {frames}, процессов: {workers}, {frames / elapsed:.0f} кадров/с всего, '
+          f'{frames / max(cpu, 1e-9):.0f} кадров/с на ядро', file=log)
+
+
+if __name__ == '__main__':
+    main()
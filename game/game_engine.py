@@ -1,195 +1,236 @@
 import pygame
 import random
-import time
 from config import *
-from entities.dinosaur import Dinosaur
-from entities.fireball import Fireball
-from entities.obstacles import GroundObstacle, FlyingObstacle
+from entities.composite_cache import composite_cache
+from entities.sprite_cache import sprite_cache
+from assets.loader import AssetLoader
+from assets.config import ANIMATION_CONFIG
+from game.pacing import FramePacer
+from game.parallax import Parallax
+from game.hud import Hud
+from game.input import InputQueue, LatencyProbe, now_ms
+from game.profiler import profiler, ProfilerOverlay
+from game.renderer import (BackBuffer, DirtyRectRenderer, draw_entities, hud_items, make_background,
+                           uses_dirty_rects, uses_parallax)
+from game.replay import InputRecorder, replay_path
+from game.telemetry import Telemetry, EVENT_SESSION_START, EVENT_SESSION_END, EVENT_FRAME
+from game.simulation import Simulation
 
 
 class GameEngine:
-    def __init__(self):
+    def __init__(self, telemetry=TELEMETRY):
         pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        # темп кадров: симуляция идёт с полной скоростью, а отрисовка при нехватке времени прореживается
+        self.pacer = FramePacer(FRAME_PACING, FPS, MAX_RENDER_INTERVAL, ADAPTIVE_RENDERING, INPUT_POLL_MS)
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), **self.pacer.display_flags())
         pygame.display.set_caption("Dino Game")
-        self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, 36)
         self.big_font = pygame.font.Font(None, 72)
         self.small_font = pygame.font.Font(None, 24)
+        self.hud = Hud(HUD_TEXT_CACHE_SIZE)
+        profiler.enabled = PROFILING
+        self.profiler_overlay = ProfilerOverlay(self.small_font)
+        self._allocations = 0
 
-        self.reset_game()
+        self.background = make_background().convert()
+        self.running = True
+        # все листы спрайтов загружаются один раз до первого кадра: в фоне, пока на экране прогресс
+        self.sprite_load = self.load_assets()
+        if PROFILING:
+            print(f'спрайты ({self.sprite_load.source}): {self.sprite_load.ms:.1f} мс')
+        # мир рисуется в уменьшенный буфер в размере кадров спрайтов и увеличивается один раз за кадр
+        self.back_buffer = BackBuffer(self.screen) if RENDER_SCALE > 1 else None
+        # в режиме грязных прямоугольников на экран выводятся только изменившиеся области
+        self.dirty_renderer = DirtyRectRenderer(self.screen, self.background) if uses_dirty_rects() else None
+        self.parallax = Parallax(RENDER_SCALE) if uses_parallax() else None
+
+        # вся игровая логика живёт в симуляции, движок только читает ввод и рисует
+        self.simulation = Simulation()
+        # события партий уходят в кольцевой буфер, на диск их пишет фоновый поток
+        self.telemetry = (Telemetry(TELEMETRY_DIR, TELEMETRY_FORMAT, max_total_bytes=TELEMETRY_MAX_BYTES)
+                          if telemetry else None)
+        self.simulation.telemetry = self.telemetry
+        self.session_active = False
+        # зерно каждой партии берётся из генератора сессии, поэтому любую партию можно повторить
+        self.session_rng = random.Random(SESSION_SEED)
+        self.recorder = None
+        # нажатия с метками времени разбираются по шагам симуляции, задержка до экрана замеряется по желанию
+        self.latency_probe = LatencyProbe(telemetry=self.telemetry) if INPUT_LATENCY_PROBE else None
+        self.input = InputQueue(INPUT_GRACE_MS, self.latency_probe)
+        self.accumulator = 0.0
         self.show_controls = True
-        self.controls_timer = pygame.time.get_ticks()
+        self.reset_game()
 
-        from assets.config import ANIMATION_CONFIG
-        self.dinosaur.load_animations(ANIMATION_CONFIG)
+    def load_assets(self) -> AssetLoader:
+        '''фоновая загрузка спрайтов с экраном загрузки; окно всё это время отвечает на события'''
+        loader = AssetLoader(sprite_cache, ANIMATION_CONFIG, FRAME_SCALE)
+        loader.start()
+        while not loader.poll():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    # загрузка короткая и дожидается конца, а игровой цикл после неё сразу завершится
+                    self.running = False
+            self.draw_loading(loader.progress)
+            pygame.time.wait(5)
+        # время загрузки не должно попасть в первый кадр игры
+        self.pacer.restart()
+        return loader
+
+    def draw_loading(self, progress):
+        self.screen.blit(self.background, (0, 0))
+        text = self.hud.text_cache.render(self.font, f'Загрузка {progress:.0%}', (0, 0, 0))
+        self.screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30)))
+        bar = pygame.Rect(0, 0, 300, 16)
+        bar.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 10)
+        pygame.draw.rect(self.screen, (0, 0, 0), bar, 2)
+        pygame.draw.rect(self.screen, (0, 0, 0), (bar.x, bar.y, round(bar.w * progress), bar.h))
+        pygame.display.flip()
 
     def reset_game(self):
-        self.dinosaur = Dinosaur(100, GROUND_LEVEL - 60)
-        from assets.config import ANIMATION_CONFIG
-        self.dinosaur.load_animations(ANIMATION_CONFIG)
-        self.fireballs: list[Fireball] = []
-        self.obstacles: list[GroundObstacle | FlyingObstacle] = []
-        self.game_speed = BASE_GAME_SPEED
-        self.score = 0
-        self.last_obstacle_time = 0
-        self.last_speed_increase = pygame.time.get_ticks()
-        self.game_over = False
-        self.running = True
+        self.end_session()
+        seed = self.session_rng.getrandbits(32)
+        self.simulation.reset(seed)
+        self.session_active = True
+        if self.telemetry:
+            self.telemetry.emit(EVENT_SESSION_START, 0, seed)
+        self.input.clear()
+        if self.dirty_renderer:
+            # экран прошлой партии не должен просвечивать там, где следов уже нет
+            self.dirty_renderer.invalidate()
+        if self.show_controls:
+            # подсказка скрывается через 3 секунды времени партии
+            self.simulation.scheduler.schedule(3000, self.hide_controls)
+        if RECORD_REPLAYS:
+            self.recorder = InputRecorder(seed, self.show_controls)
+            self.simulation.recorder = self.recorder
+
+    def hide_controls(self):
+        self.show_controls = False
+
+    def end_session(self):
+        '''завершение текущей партии: запись повтора и итог в телеметрию'''
+        self.save_replay()
+        if self.session_active and self.telemetry:
+            self.telemetry.emit(EVENT_SESSION_END, self.simulation.ticks, self.simulation.score)
+        self.session_active = False
+
+    def save_replay(self):
+        '''сохранение записи текущей партии, если она ещё не сохранена'''
+        if self.recorder is None:
+            return
+        self.recorder.finish(self.simulation).save(replay_path(REPLAY_DIR, self.recorder.replay.seed))
+        self.recorder = None
+        self.simulation.recorder = None
 
     def handle_events(self):
-        for event in pygame.event.get():
+        '''последний опрос перед шагами; нажатия управления уже в очереди ввода, здесь — остальные события'''
+        self.input.poll()
+        for event in self.input.events():
             if event.type == pygame.QUIT:
                 self.running = False
-            elif event.type == pygame.KEYDOWN:
-                if self.game_over:
-                    if event.key == pygame.K_r:
-                        self.reset_game()
-                else:
-                    if event.key == pygame.K_SPACE or event.key == pygame.K_UP:
-                        self.dinosaur.jump()
-                    elif event.key == pygame.K_DOWN:
-                        self.dinosaur.duck()
-                    elif event.key == pygame.K_f:
-                        self.dinosaur.shoot(self.game_speed)
-            elif event.type == pygame.KEYUP:
-                if event.key == pygame.K_DOWN:
-                    self.dinosaur.stand_up()
-
-    def generate_obstacle(self):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_obstacle_time > random.randint(1000, 3000):
-            x = SCREEN_WIDTH
-            is_destructible = random.random() < 0.3
-            is_flying = random.choice([True, False])
-            if is_flying:
-                width = random.randint(30, 50)
-                height = random.randint(30, 50)
-                min_flying_height = 50
-                max_flying_height = 170
-                y = GROUND_LEVEL - random.randint(min_flying_height, max_flying_height)
-                color = (255, 255, 0) if is_destructible else (0, 0, 255)
-                obstacle = FlyingObstacle(x, y, width, height, color, is_destructible)
-
-            else:
-                if is_destructible and random.random() < 0.5:
-                    obstacle_type = 'wall'
-                    height = random.randint(180, 200)
-                    width = random.randint(30, 50)
-                    color = (255, 0, 0)
-                else:
-                    obstacle_type = 'jump'
-                    height = random.randint(20, 40)
-                    width = random.randint(40, 60)
-                    color = (255, 255, 0) if is_destructible else (0, 0, 255)
-
-                obstacle = GroundObstacle(x, 0, width, height, color, is_destructible, obstacle_type)
-
-            self.obstacles.append(obstacle)
-            self.last_obstacle_time = current_time
-
-    def update_speed(self):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_speed_increase > SPEED_INCREASE_INTERVAL:
-            self.game_speed += SPEED_INCREMENT
-            self.last_speed_increase = current_time
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler_overlay.visible = not self.profiler_overlay.visible
+                profiler.enabled = self.profiler_overlay.visible or PROFILING
+                if self.dirty_renderer:
+                    self.dirty_renderer.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_r and self.simulation.game_over:
+                self.reset_game()
 
     def update_game_state(self, dt):
-        if self.game_over:
-            return
-
-        # проверка создания снаряда после задержки
-        fireball = self.dinosaur.update(dt, self.game_speed)
-        if fireball:
-            self.fireballs.append(fireball)
-
-        for fireball in self.fireballs[:]:
-            fireball.update(dt)
-            if not fireball.active:
-                self.fireballs.remove(fireball)
-
-        for obstacle in self.obstacles[:]:
-            obstacle.update(self.game_speed)
-            if obstacle.is_off_screen():
-                self.obstacles.remove(obstacle)
-                self.score += 1
-
-        self.check_collisions()
-        self.generate_obstacle()
-        self.update_speed()
-
-        if self.show_controls and pygame.time.get_ticks() - self.controls_timer > 3000:
-            self.show_controls = False
-
-    def check_collisions(self):
-        for obstacle in self.obstacles[:]:
-            if obstacle.check_collision(self.dinosaur):
-                self.dinosaur.hp -= 1
-                self.obstacles.remove(obstacle)
-                self.game_speed = max(BASE_GAME_SPEED, self.game_speed - SPEED_DECREMENT_ON_HIT)
-                if self.dinosaur.hp <= 0:
-                    self.game_over = True
-                return
-
-            for fireball in self.fireballs[:]:
-                if fireball.check_collision(obstacle):
-                    obstacle.handle_fireball_collision(fireball)
-
-                    # удаляем снаряд только если он не взрывается
-                    if not fireball.is_exploding and fireball in self.fireballs:
-                        self.fireballs.remove(fireball)
-
-                    if obstacle.destroyed and obstacle in self.obstacles:
-                        self.obstacles.remove(obstacle)
-                        self.score += 2
-                    break
+        '''продвижение симуляции на прошедшее реальное время целым числом фиксированных шагов'''
+        # ограничение накопленного времени, чтобы после долгой паузы не пытаться догнать всё сразу
+        self.accumulator += min(dt, MAX_FRAME_TIME)
+        step_ms = self.simulation.step_ms
+        # симуляция отстаёт от момента опроса на накопленное время: так находится реальный конец каждого шага
+        step_end = self.input.polled_at - self.accumulator
+        while self.accumulator >= step_ms:
+            step_end += step_ms
+            # нажатие применяется в шаге, на который пришлось; более поздние ждут следующих шагов
+            self.simulation.step(self.input.actions(step_end, self.simulation))
+            self.accumulator -= step_ms
+
+        if self.simulation.game_over:
+            self.end_session()
 
     def draw(self):
-        self.screen.fill((255, 255, 255))
-
-        pygame.draw.line(self.screen, (0, 0, 0), (0, GROUND_LEVEL - 30),
-                         (SCREEN_WIDTH, GROUND_LEVEL - 30), 2)
-
-        self.dinosaur.draw(self.screen)
-
-        for fireball in self.fireballs:
-            fireball.draw(self.screen)
-
-        for obstacle in self.obstacles:
-            pygame.draw.rect(self.screen, obstacle.color, obstacle.rect)
-
-        score_text = self.font.render(f'Счёт: {self.score}', True, (0, 0, 0))
-        speed_text = self.font.render(f'Скорость: {self.game_speed}', True, (0, 0, 0))
-        hp_text = self.font.render(f'Здоровье: {self.dinosaur.hp}', True, (0, 0, 0))
-
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(speed_text, (10, 50))
-        self.screen.blit(hp_text, (10, 90))
-
-        if self.show_controls:
-            controls_text = self.small_font.render('Нажмите F чтобы стрелять', True, (0, 0, 0))
-            self.screen.blit(controls_text,
-                             (SCREEN_WIDTH // 2 - controls_text.get_width() // 2,
-                              50))
-
-        if self.game_over:
-            game_over_text = self.big_font.render('Вы вымерли', True, (255, 0, 0))
-            restart_text = self.font.render('Нажмите R чтобы начать заново', True, (0, 0, 0))
-            self.screen.blit(game_over_text,
-                             (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2,
-                              SCREEN_HEIGHT // 2 - 50))
-            self.screen.blit(restart_text,
-                             (SCREEN_WIDTH // 2 - restart_text.get_width() // 2,
-                              SCREEN_HEIGHT // 2 + 20))
-
-        pygame.display.flip()
+        simulation = self.simulation
+        world = self.back_buffer.surface if self.back_buffer else self.screen
+        if self.parallax:
+            self.parallax.draw(world, simulation)
+        elif self.back_buffer:
+            self.back_buffer.clear()
+        elif self.dirty_renderer:
+            self.dirty_renderer.erase()
+        else:
+            self.screen.blit(self.background, (0, 0))
+        rects = draw_entities(world, simulation, self.pacer.reduced_quality)
+        if self.back_buffer:
+            self.back_buffer.present()
+
+        items = hud_items(simulation, self.font, self.big_font, self.small_font, self.show_controls)
+        hud_rect = self.hud.draw(self.screen, items)
+        if hud_rect:
+            rects.append(hud_rect)
+
+        if profiler.enabled:
+            profiler.gauge('obstacles', len(simulation.obstacles))
+            profiler.gauge('fireballs', len(simulation.fireballs))
+            profiler.gauge('blits', len(rects))
+            allocations = simulation.allocations()
+            profiler.gauge('allocations', allocations - self._allocations)
+            profiler.gauge('dino_composite_hit_rate', round(composite_cache.stats()['hit_rate'], 3))
+            self._allocations = allocations
+            profiler.gauge('render_interval', self.pacer.render_interval)
+            profiler.gauge('reduced_quality', int(self.pacer.reduced_quality))
+            profiler.gauge('missed_deadlines', self.pacer.missed_deadlines)
+            if self.latency_probe is not None:
+                profiler.gauge('input_latency_p95', round(self.latency_probe.percentiles()['p95'], 1))
+        if self.profiler_overlay.visible:
+            rects.extend(self.profiler_overlay.draw(self.screen, pygame.time.get_ticks()))
+
+        self.pacer.begin_present()
+        if self.dirty_renderer:
+            # доля обновлённых пикселей за прошлый кадр
+            stat_text = self.hud.text_cache.render(
+                self.small_font, f'Обновлено: {self.dirty_renderer.updated_fraction:.0%}', (0, 0, 0))
+            rects.append(self.screen.blit(stat_text, (SCREEN_WIDTH - stat_text.get_width() - 10, 10)))
+            self.dirty_renderer.present(rects)
+        else:
+            pygame.display.flip()
+        if self.latency_probe is not None:
+            self.latency_probe.presented(simulation.ticks, now_ms())
 
     def run(self):
         while self.running:
-            dt = self.clock.get_time()
-            self.handle_events()
-            self.update_game_state(dt)
-            self.draw()
-            self.clock.tick(60)
-
+            # сначала ожидание с опросом ввода, затем кадр: шаги и отрисовка начинаются со свежих нажатий
+            self.pacer.wait(self.input.poll)
+            profiler.begin_frame()
+            self.pacer.begin_frame()
+            with profiler.section('handle_events'):
+                self.handle_events()
+            with profiler.section('update_game_state'):
+                self.update_game_state(self.pacer.dt)
+            if self.pacer.should_render():
+                self.pacer.begin_render()
+                with profiler.section('draw'):
+                    self.draw()
+            self.pacer.end_frame()
+            if self.telemetry:
+                self.telemetry.emit(EVENT_FRAME, self.simulation.ticks, self.pacer.work_ms)
+            profiler.end_frame()
+
+        self.end_session()
+        profiler.dump(PROFILE_TRACE_PATH)
+        if self.telemetry:
+            self.telemetry.close()
+        if PROFILING:
+            stats = self.pacer.stats()
+            print(f'кадров: {stats["frames"]}, отрисовано: {stats["rendered_frames"]}, '
+                  f'не уложились в бюджет: {stats["missed_deadlines"]}')
+            if self.telemetry:
+                print('телеметрия:', ', '.join(f'{key} {value}' for key, value in self.telemetry.stats().items()))
+        if self.latency_probe is not None:
+            percentiles = self.latency_probe.percentiles()
+            print(f'задержка ввода до экрана, нажатий {len(self.latency_probe.samples)}: '
+                  + ', '.join(f'{name} {ms:.1f} мс' for name, ms in percentiles.items()))
         pygame.quit()
\ No newline at end of file
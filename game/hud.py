@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import pygame
+
+# выравнивание строки относительно её точки привязки
+ALIGN_LEFT = 'left'
+ALIGN_CENTER = 'center'
+ALIGN_RIGHT = 'right'
+
+
+class TextCache:
+    '''LRU-кэш отрисованных строк по ключу (шрифт, строка, цвет)'''
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._surfaces: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color) -> pygame.Surface:
+        key = (font, text, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self._surfaces),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class Hud:
+    '''интерфейс, собранный в одну поверхность: пересобирается только при изменении строк'''
+    def __init__(self, cache_size=64):
+        self.text_cache = TextCache(cache_size)
+        self._items = None
+        self._surface = None
+        self._position = (0, 0)
+        self.rebuilds = 0
+
+    def draw(self, screen, items) -> pygame.Rect | None:
+        '''items — кортеж (шрифт, строка, цвет, (x, y), выравнивание); возвращает занятую область'''
+        if items != self._items:
+            self._compose(items)
+        if self._surface is None:
+            return None
+        return screen.blit(self._surface, self._position)
+
+    def _compose(self, items):
+        self._items = items
+        self.rebuilds += 1
+        placed = []
+        for font, text, color, (x, y), align in items:
+            text_surface = self.text_cache.render(font, text, color)
+            if align == ALIGN_CENTER:
+                x -= text_surface.get_width() // 2
+            elif align == ALIGN_RIGHT:
+                x -= text_surface.get_width()
+            placed.append((text_surface, text_surface.get_rect(topleft=(x, y))))
+
+        if not placed:
+            self._surface = None
+            return
+        bounds = placed[0][1].unionall([rect for _, rect in placed[1:]])
+        self._surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        for text_surface, rect in placed:
+            # копирование пикселей как есть: смешивание с прозрачным чёрным затемнило бы края букв
+            self._surface.blit(text_surface, (rect.x - bounds.x, rect.y - bounds.y),
+                               special_flags=pygame.BLEND_RGBA_MAX)
+        self._position = bounds.topleft
@@ -0,0 +1,131 @@
+'''ввод игрока с метками времени: нажатие применяется в том шаге симуляции, на который оно пришлось
+
+события забираются из SDL и во время ожидания начала кадра (см. FramePacer.wait),
+поэтому метка отстаёт от нажатия не больше чем на шаг опроса. Прыжок и выстрел,
+которые в момент нажатия сработать не могут (динозавр ещё в воздухе, идёт
+перезарядка), ждут до INPUT_GRACE_MS и выполняются в первом шаге, где это возможно.
+В записи партии попадают только действия, переданные симуляции, поэтому повтор
+от буфера не зависит
+'''
+from collections import deque
+from time import perf_counter
+import pygame
+from config import INPUT_GRACE_MS
+from game.profiler import percentiles
+from game.simulation import ACTION_JUMP, ACTION_DUCK, ACTION_STAND_UP, ACTION_SHOOT
+from game.telemetry import EVENT_INPUT_LATENCY
+
+KEYDOWN_ACTIONS = {pygame.K_SPACE: ACTION_JUMP, pygame.K_UP: ACTION_JUMP, pygame.K_DOWN: ACTION_DUCK,
+                   pygame.K_f: ACTION_SHOOT}
+KEYUP_ACTIONS = {pygame.K_DOWN: ACTION_STAND_UP}
+BUFFERED_ACTIONS = (ACTION_JUMP, ACTION_SHOOT) # ждут возможности сработать в течение INPUT_GRACE_MS
+
+
+def now_ms() -> float:
+    '''часы меток ввода и задержки, те же, что у FramePacer'''
+    return perf_counter() * 1000
+
+
+def _ready(action, dinosaur) -> bool:
+    if action == ACTION_JUMP:
+        return dinosaur.can_jump()
+    return dinosaur.ready_to_shoot()
+
+
+class LatencyProbe:
+    '''задержка от нажатия до вывода первого кадра, в котором его шаг уже отрисован'''
+    def __init__(self, window=1000, telemetry=None):
+        self.samples: deque[float] = deque(maxlen=window) # мс, последние window нажатий
+        self.telemetry = telemetry # каждое нажатие пишется событием input_latency
+        self._pending: deque[tuple[float, int]] = deque() # (метка, шаг), шаги не убывают
+
+    def applied(self, stamp, tick):
+        self._pending.append((stamp, tick))
+
+    def presented(self, ticks, now=None):
+        '''кадр с состоянием после шага ticks выведен на экран'''
+        now = now_ms() if now is None else now
+        pending = self._pending
+        while pending and pending[0][1] <= ticks:
+            stamp, tick = pending.popleft()
+            self.samples.append(now - stamp)
+            if self.telemetry is not None:
+                self.telemetry.emit(EVENT_INPUT_LATENCY, tick, now - stamp)
+
+    def clear(self):
+        '''нажатия прошлой партии уже не будут показаны: шаги новой начинаются с нуля'''
+        self._pending.clear()
+
+    def percentiles(self) -> dict[str, float]:
+        '''p50/p95/p99 задержки по последним window нажатиям'''
+        return percentiles(self.samples)
+
+
+class InputQueue:
+    '''нажатия игрока с метками реального времени, которые разбираются по шагам симуляции'''
+    def __init__(self, grace_ms=INPUT_GRACE_MS, probe: LatencyProbe | None = None):
+        self.grace_ms = grace_ms
+        self.probe = probe
+        self.polled_at = now_ms() # метка последнего опроса: всё нажатое раньше уже в очереди
+        self._actions: deque[tuple[float, str]] = deque() # (метка, действие) в порядке нажатий
+        self._events = [] # остальные события окна для игрового цикла
+        self._buffered: dict[str, float] = {} # действие -> метка нажатия, которое ещё не сработало
+
+    def poll(self):
+        stamp = now_ms()
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN:
+                action = KEYDOWN_ACTIONS.get(event.key)
+            elif event.type == pygame.KEYUP:
+                action = KEYUP_ACTIONS.get(event.key)
+            else:
+                action = None
+            if action is None:
+                self._events.append(event)
+            else:
+                self._actions.append((stamp, action))
+        self.polled_at = stamp
+
+    def events(self) -> list:
+        '''события окна, не относящиеся к управлению динозавром, накопленные с прошлого вызова'''
+        events, self._events = self._events, []
+        return events
+
+    def actions(self, until, simulation) -> list[str]:
+        '''действия для следующего шага симуляции, который заканчивается в реальный момент until (мс)'''
+        actions = []
+        dinosaur = simulation.dinosaur
+        queue = self._actions
+        if simulation.game_over:
+            # шаги больше не идут: нажатия отбрасываются, иначе замер ждал бы шага, который не наступит
+            while queue and queue[0][0] <= until:
+                queue.popleft()
+            self._buffered.clear()
+            return actions
+        while queue and queue[0][0] <= until:
+            stamp, action = queue.popleft()
+            if action in BUFFERED_ACTIONS and not _ready(action, dinosaur):
+                # повторное нажатие продлевает ожидание
+                self._buffered[action] = stamp
+                continue
+            self._buffered.pop(action, None)
+            self._apply(actions, action, stamp, simulation)
+        for action, stamp in list(self._buffered.items()):
+            if until - stamp > self.grace_ms:
+                del self._buffered[action]
+            elif _ready(action, dinosaur):
+                del self._buffered[action]
+                self._apply(actions, action, stamp, simulation)
+        return actions
+
+    def _apply(self, actions, action, stamp, simulation):
+        actions.append(action)
+        if self.probe is not None:
+            self.probe.applied(stamp, simulation.ticks + 1)
+
+    def clear(self):
+        '''новая партия: нажатия старой не переносятся'''
+        self._actions.clear()
+        self._buffered.clear()
+        if self.probe is not None:
+            self.probe.clear()
@@ -0,0 +1,156 @@
+from time import perf_counter, sleep
+import pygame
+
+# режимы ограничения частоты кадров
+PACING_FIXED = 'fixed' # не чаще FPS кадров в секунду, ожидание в начале кадра
+PACING_VSYNC = 'vsync' # ожидание синхронизации с монитором внутри flip
+PACING_UNCAPPED = 'uncapped' # без ожидания
+
+
+class FramePacer:
+    '''регулятор темпа кадров: при нехватке времени отрисовка прореживается, а затем упрощается
+
+    симуляция идёт фиксированными шагами по реальному времени, поэтому
+    пропуск отрисовки не замедляет игру. Стоимость обновления и отрисовки
+    сглаживается отдельно, и на каждом кадре выбирается самый качественный
+    вариант (полное качество раньше упрощённого, затем меньший интервал
+    отрисовки), который укладывается в бюджет кадра. К лучшему варианту
+    регулятор возвращается только с запасом, чтобы не переключаться на каждом кадре.
+
+    Ожидание идёт до опроса ввода, а не после отрисовки: кадр начинается со свежих
+    нажатий, а во время ожидания ввод опрашивается, чтобы метки нажатий были точными
+    '''
+    SMOOTHING = 0.1 # вес нового замера в скользящем среднем
+    TARGET = 0.9 # доля бюджета, в которую должен укладываться выбранный вариант
+    RECOVERY = 0.75 # доля бюджета для возврата к более качественному варианту
+
+    def __init__(self, mode=PACING_FIXED, fps=60, max_render_interval=4, adaptive=True, poll_ms=1):
+        self.mode = mode
+        self.fps = fps
+        self.budget_ms = 1000 / fps
+        self.max_render_interval = max_render_interval
+        self.adaptive = adaptive
+        self.poll_ms = poll_ms # шаг опроса ввода во время ожидания
+        self.render_interval = 1 # отрисовывается каждый render_interval-й кадр
+        self.reduced_quality = False
+        self.dt = 0 # реальное время прошлого кадра в мс, включая ожидание
+        self.frames = 0
+        self.rendered_frames = 0
+        self.missed_deadlines = 0 # кадры, работа которых не уложилась в бюджет
+        self.work_ms = 0.0 # время работы прошлого кадра без ожидания
+        self.update_ms = 0.0
+        self.draw_ms = [0.0, 0.0] # по уровням качества: полное, упрощённое
+        # стоимость другого уровня в момент последнего замера этого: по ней пересчитываются устаревшие замеры
+        self._snapshot = [0.0, 0.0]
+        self._sampled_level = 0
+        self._frame_start = 0.0
+        self._last_wait = perf_counter() # конец прошлого ожидания, от него отсчитываются dt и срок кадра
+        self._render_start = None
+        self._present_start = None
+
+    def display_flags(self) -> dict:
+        '''аргументы pygame.display.set_mode для выбранного режима'''
+        if self.mode == PACING_VSYNC:
+            # синхронизация в pygame 2 работает только с SCALED или OPENGL
+            return {'flags': pygame.SCALED, 'vsync': 1}
+        return {}
+
+    def restart(self):
+        '''отсчёт заново, например после загрузки: её время не должно попасть в первый кадр'''
+        self._last_wait = perf_counter()
+
+    def wait(self, poll=None):
+        '''ожидание начала кадра по режиму; poll вызывается во время ожидания и сразу после него'''
+        if self.mode == PACING_FIXED:
+            deadline = self._last_wait + self.budget_ms / 1000
+            while True:
+                if poll is not None:
+                    poll()
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    break
+                sleep(min(remaining, self.poll_ms / 1000))
+        elif poll is not None:
+            poll()
+        now = perf_counter()
+        self.dt = (now - self._last_wait) * 1000
+        self._last_wait = now
+
+    def begin_frame(self):
+        self._frame_start = perf_counter()
+        self._render_start = None
+        self._present_start = None
+
+    def should_render(self) -> bool:
+        return self.frames % self.render_interval == 0
+
+    def begin_render(self):
+        self._render_start = perf_counter()
+
+    def begin_present(self):
+        '''отметка перед выводом кадра на экран: с vsync ожидание монитора не считается работой'''
+        self._present_start = perf_counter()
+
+    def end_frame(self):
+        '''учёт стоимости кадра и выбор режима отрисовки; ожидание — в wait следующего кадра'''
+        end = perf_counter()
+        if self.mode == PACING_VSYNC and self._present_start is not None:
+            end = self._present_start
+        render_start = self._render_start if self._render_start is not None else end
+        work_ms = self.work_ms = (end - self._frame_start) * 1000
+        self.update_ms += ((render_start - self._frame_start) * 1000 - self.update_ms) * self.SMOOTHING
+        if self._render_start is not None:
+            self.rendered_frames += 1
+            level = int(self.reduced_quality)
+            draw_ms = (end - render_start) * 1000
+            if self.draw_ms[level] and level == self._sampled_level:
+                self.draw_ms[level] += (draw_ms - self.draw_ms[level]) * self.SMOOTHING
+            else:
+                # первый замер после смены уровня заменяет устаревшее среднее целиком
+                self.draw_ms[level] = draw_ms
+            self._sampled_level = level
+            self._snapshot[level] = self.draw_ms[1 - level]
+            if not self._snapshot[1 - level]:
+                # другой уровень замерялся, когда этот ещё не был известен: отсчёт от первого замера
+                self._snapshot[1 - level] = self.draw_ms[level]
+        if work_ms > self.budget_ms:
+            self.missed_deadlines += 1
+        if self.adaptive:
+            self._adapt()
+        self.frames += 1
+
+    def _draw_estimate(self, reduced) -> float:
+        '''ожидаемая стоимость отрисовки на уровне качества reduced'''
+        current = int(self.reduced_quality)
+        if reduced == current or not self._snapshot[reduced]:
+            # ещё не замерявшийся уровень считается не дешевле текущего
+            return self.draw_ms[reduced] or self.draw_ms[current]
+        # устаревший замер масштабируется так же, как с тех пор изменилась стоимость текущего уровня
+        return self.draw_ms[reduced] * self.draw_ms[current] / self._snapshot[reduced]
+
+    def _adapt(self):
+        current = (self.reduced_quality, self.render_interval)
+        for reduced in (False, True):
+            draw_ms = self._draw_estimate(reduced)
+            for interval in range(1, self.max_render_interval + 1):
+                option = (reduced, interval)
+                cost = self.update_ms + draw_ms / interval
+                limit = self.RECOVERY if option < current else self.TARGET
+                if cost <= self.budget_ms * limit:
+                    self.reduced_quality, self.render_interval = option
+                    return
+                if option == current and cost <= self.budget_ms:
+                    # текущий вариант ещё укладывается в бюджет, а лучшие не подошли с запасом
+                    return
+        self.reduced_quality, self.render_interval = True, self.max_render_interval
+
+    def stats(self) -> dict[str, int | float | bool]:
+        return {
+            'frames': self.frames,
+            'rendered_frames': self.rendered_frames,
+            'missed_deadlines': self.missed_deadlines,
+            'render_interval': self.render_interval,
+            'reduced_quality': self.reduced_quality,
+            'update_ms': self.update_ms,
+            'draw_ms': self.draw_ms[int(self.reduced_quality)],
+        }
@@ -0,0 +1,131 @@
+'''параллакс-фон: небо, дюны и текстура земли, каждый слой со своей долей скорости игры
+
+слои рисуются один раз при создании в полосы шириной с экран, края которых сходятся
+без шва; за кадр каждая полоса копируется не больше чем двумя кусками и никогда
+не перерисовывается примитивами и не масштабируется
+'''
+import math
+import random
+import pygame
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, GROUND_LEVEL
+
+COLORKEY = (255, 0, 255) # прозрачные пиксели полос, которые накладываются поверх других
+GROUND_LINE = GROUND_LEVEL - 30 # линия земли, как у статичного фона
+SKY_SPEED = 0.05 # доли скорости игры
+DUNES_SPEED = 0.25
+GROUND_SPEED = 1.0 # земля движется вместе с препятствиями
+
+
+class ParallaxLayer:
+    '''заранее отрисованная полоса, которая прокручивается по кругу'''
+    __slots__ = ('strip', 'y', 'speed')
+
+    def __init__(self, strip, y, speed):
+        self.strip = strip
+        self.y = y
+        self.speed = speed
+
+    def draw(self, surface, offset) -> int:
+        '''копирование полосы со сдвигом offset пикселей полосы; возвращает число блитов'''
+        strip = self.strip
+        width, height = strip.get_size()
+        x = int(offset * self.speed) % width
+        surface.blit(strip, (0, self.y), (x, 0, width - x, height))
+        if not x:
+            return 1
+        # хвост полосы встаёт справа от её конца
+        surface.blit(strip, (width - x, self.y), (0, 0, x, height))
+        return 2
+
+
+def _wrapped(draw, width):
+    '''фигура у края полосы дорисовывается и с другой стороны, чтобы при переходе не было шва'''
+    for shift in (-width, 0, width):
+        draw(shift)
+
+
+def _sky(width, height, scale, rng) -> pygame.Surface:
+    strip = pygame.Surface((width, height))
+    strip.fill((255, 255, 255))
+    for _ in range(6):
+        x = rng.randrange(width)
+        y = rng.randint(30, 150) // scale
+        w = rng.randint(60, 120) // scale
+        h = max(1, w // 4)
+
+        def cloud(shift, x=x, y=y, w=w, h=h):
+            pygame.draw.ellipse(strip, (236, 236, 236), (x + shift, y, w, h))
+            pygame.draw.ellipse(strip, (236, 236, 236), (x + shift + w // 4, y - h // 2, w // 2, h))
+
+        _wrapped(cloud, width)
+    return strip
+
+
+def _dunes(width, height, scale, rng) -> pygame.Surface:
+    strip = pygame.Surface((width, height))
+    strip.fill(COLORKEY)
+    # сумма синусоид с целым числом периодов на ширину полосы сама сходится на краях
+    waves = [(rng.randint(1, 4), rng.uniform(0, math.tau), rng.uniform(0.2, 0.5)) for _ in range(3)]
+    points = [(0, height)]
+    for x in range(0, width + 1, max(1, 4 // scale)):
+        level = sum(amplitude * math.sin(periods * math.tau * x / width + phase)
+                    for periods, phase, amplitude in waves)
+        points.append((x, round(height * (0.55 - 0.35 * level))))
+    points.append((width, height))
+    pygame.draw.polygon(strip, (228, 228, 228), points)
+    return strip
+
+
+def _ground(width, height, scale, rng) -> pygame.Surface:
+    strip = pygame.Surface((width, height))
+    strip.fill((255, 255, 255))
+    pygame.draw.line(strip, (0, 0, 0), (0, 0), (width, 0), max(1, 2 // scale))
+    for _ in range(width * scale // 12):
+        x = rng.randrange(width)
+        y = rng.randint(6, height * scale - 4) // scale
+        w = max(1, rng.randint(2, 10) // scale)
+
+        def pebble(shift, x=x, y=y, w=w):
+            pygame.draw.line(strip, (150, 150, 150), (x + shift, y), (x + shift + w, y))
+
+        _wrapped(pebble, width)
+    return strip
+
+
+class Parallax:
+    '''все слои фона и прокрутка по пройденному симуляцией пути
+
+    путь берётся из симуляции, где он набирается на каждом шаге с той скоростью, с которой
+    движутся препятствия, поэтому от частоты отрисовки и пропущенных кадров он не зависит;
+    scale — во сколько раз поверхность отрисовки меньше окна
+    '''
+    def __init__(self, scale=1, seed=0):
+        self.scale = scale
+        rng = random.Random(seed) # одинаковые полосы во всех процессах и запусках
+        width = SCREEN_WIDTH // scale
+        ground_y = GROUND_LINE // scale
+        dunes_height = 80 // scale
+        # небо и земля непрозрачны и вместе закрывают весь кадр, дюны накладываются по цветовому ключу
+        layers = (
+            (_sky(width, ground_y, scale, rng), 0, SKY_SPEED, False),
+            (_dunes(width, dunes_height, scale, rng), ground_y - dunes_height, DUNES_SPEED, True),
+            (_ground(width, SCREEN_HEIGHT // scale - ground_y, scale, rng), ground_y, GROUND_SPEED, False),
+        )
+        self.layers = []
+        for strip, y, speed, transparent in layers:
+            if pygame.display.get_surface() is not None:
+                strip = strip.convert()
+            if transparent:
+                strip.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            self.layers.append(ParallaxLayer(strip, y, speed))
+        self.distance = 0 # пройденный путь в пикселях окна
+
+    def update(self, simulation):
+        self.distance = simulation.distance
+
+    def draw(self, surface, simulation=None) -> int:
+        '''замена статичного фона: слои сзади вперёд, возвращает число блитов'''
+        if simulation is not None:
+            self.update(simulation)
+        offset = self.distance / self.scale
+        return sum(layer.draw(surface, offset) for layer in self.layers)
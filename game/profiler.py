@@ -0,0 +1,192 @@
+import csv
+import json
+import os
+from collections import deque
+from time import perf_counter_ns
+
+
+def percentiles(samples) -> dict[str, float]:
+    '''p50/p95/p99 выборки, ближайший ранг; у пустой выборки нули'''
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {f'p{p}': ordered[round(last * p / 100)] for p in (50, 95, 99)}
+
+
+class _NullSection:
+    '''заглушка для выключенного профилировщика: вход и выход ничего не делают'''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section:
+    '''замер одного участка кода; объект переиспользуется для каждого имени'''
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._record(self.name, self.start, perf_counter_ns())
+        return False
+
+
+class Profiler:
+    '''таймеры участков кадра, счётчики, скользящие перцентили времени кадра и трассировка
+
+    выключенный профилировщик отдаёт общий пустой контекст из section и сразу
+    выходит из count, поэтому его можно оставлять в рабочей сборке
+    '''
+    def __init__(self, window=600, max_trace_events=200_000):
+        self.enabled = False
+        self.max_trace_events = max_trace_events
+        self.reset(window)
+
+    def reset(self, window=None):
+        '''сброс всех накопленных замеров'''
+        self.window = window or self.window # число последних кадров для перцентилей и CSV
+        self.frame_index = 0
+        self.frame_times: deque[float] = deque(maxlen=self.window) # мс
+        self.frames: deque[tuple] = deque(maxlen=self.window) # (номер, мс, участки, счётчики)
+        self.trace_events: list[dict] = []
+        self.dropped_trace_events = 0
+        self._sections: dict[str, _Section] = {}
+        self._phases: dict[str, float] = {}
+        self._counters: dict[str, int] = {}
+        self._origin = perf_counter_ns()
+        self._frame_start = None
+
+    def section(self, name):
+        '''контекст для замера участка: with profiler.section('draw'): ...'''
+        if not self.enabled:
+            return _NULL_SECTION
+        section = self._sections.get(name)
+        if section is None:
+            section = self._sections[name] = _Section(self, name)
+        return section
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        '''значение на текущем кадре, например число сущностей'''
+        if self.enabled:
+            self._counters[name] = value
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame_start = perf_counter_ns()
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+        end = perf_counter_ns()
+        frame_ms = (end - self._frame_start) / 1e6
+        self.frame_times.append(frame_ms)
+        self.frames.append((self.frame_index, frame_ms, self._phases, self._counters))
+        self._trace({'name': 'frame', 'ph': 'X', 'ts': self._us(self._frame_start),
+                     'dur': frame_ms * 1000, 'pid': 0, 'tid': 0})
+        if self._counters:
+            self._trace({'name': 'counters', 'ph': 'C', 'ts': self._us(end), 'pid': 0,
+                         'args': self._counters})
+        self.frame_index += 1
+        self._phases = {}
+        self._counters = {}
+        self._frame_start = None
+
+    def _record(self, name, start, end):
+        duration_ms = (end - start) / 1e6
+        self._phases[name] = self._phases.get(name, 0.0) + duration_ms
+        self._trace({'name': name, 'ph': 'X', 'ts': self._us(start), 'dur': duration_ms * 1000,
+                     'pid': 0, 'tid': 0})
+
+    def _us(self, ns) -> float:
+        return (ns - self._origin) / 1000
+
+    def _trace(self, event):
+        if len(self.trace_events) < self.max_trace_events:
+            self.trace_events.append(event)
+        else:
+            self.dropped_trace_events += 1
+
+    def percentiles(self) -> dict[str, float]:
+        '''p50/p95/p99 времени кадра по последним window кадрам'''
+        return percentiles(self.frame_times)
+
+    def phase_averages(self) -> dict[str, float]:
+        totals: dict[str, float] = {}
+        for _, _, phases, _ in self.frames:
+            for name, ms in phases.items():
+                totals[name] = totals.get(name, 0.0) + ms
+        return {name: total / len(self.frames) for name, total in totals.items()}
+
+    def summary_lines(self) -> list[str]:
+        stats = self.percentiles()
+        lines = [f'кадр p50 {stats["p50"]:.2f} p95 {stats["p95"]:.2f} p99 {stats["p99"]:.2f} мс']
+        for name, ms in sorted(self.phase_averages().items()):
+            lines.append(f'{name}: {ms:.3f} мс')
+        if self.frames:
+            for name, value in sorted(self.frames[-1][3].items()):
+                lines.append(f'{name}: {value}')
+        return lines
+
+    def dump_trace(self, path):
+        '''трассировка в формате Chrome Trace Event (chrome://tracing, Perfetto)'''
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': self.trace_events, 'displayTimeUnit': 'ms'}, file)
+
+    def dump_csv(self, path):
+        phase_names = sorted({name for frame in self.frames for name in frame[2]})
+        counter_names = sorted({name for frame in self.frames for name in frame[3]})
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['frame', 'frame_ms'] + phase_names + counter_names)
+            for index, frame_ms, phases, counters in self.frames:
+                writer.writerow([index, f'{frame_ms:.4f}'] +
+                                [f'{phases.get(name, 0.0):.4f}' for name in phase_names] +
+                                [counters.get(name, 0) for name in counter_names])
+
+    def dump(self, trace_path):
+        '''сохранение трассировки и CSV с тем же именем, если что-то было записано'''
+        if not self.trace_events:
+            return
+        self.dump_trace(trace_path)
+        self.dump_csv(os.path.splitext(trace_path)[0] + '.csv')
+
+
+class ProfilerOverlay:
+    '''экранная сводка профилировщика; текст перерисовывается не чаще раза в interval мс'''
+    def __init__(self, font, interval=250):
+        self.font = font
+        self.interval = interval
+        self.visible = False
+        self._surfaces: list = []
+        self._last_update = None
+
+    def draw(self, screen, now) -> list:
+        if self._last_update is None or now - self._last_update >= self.interval:
+            self._surfaces = [self.font.render(line, True, (0, 120, 0)) for line in profiler.summary_lines()]
+            self._last_update = now
+        rects = []
+        y = 130
+        for surface in self._surfaces:
+            rects.append(screen.blit(surface, (10, y)))
+            y += surface.get_height()
+        return rects
+
+
+profiler = Profiler()
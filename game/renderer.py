@@ -0,0 +1,195 @@
+import pygame
+from config import (SCREEN_WIDTH, SCREEN_HEIGHT, GROUND_LEVEL, SPRITE_SCALE, RENDER_SCALE, RENDER_UPSCALE,
+                    DIRTY_RECT_RENDERING, PARALLAX)
+from game.hud import ALIGN_LEFT, ALIGN_CENTER
+
+UPSCALE_NEAREST = 'nearest'
+UPSCALE_SCALE2X = 'scale2x'
+
+
+def uses_dirty_rects() -> bool:
+    '''грязные прямоугольники имеют смысл, только пока мир рисуется прямо в окно: буфер мира обновляет его целиком'''
+    return DIRTY_RECT_RENDERING and RENDER_SCALE == 1
+
+
+def uses_parallax() -> bool:
+    '''прокручиваемый фон меняет весь кадр, поэтому с грязными прямоугольниками остаётся статичный'''
+    return PARALLAX and not uses_dirty_rects()
+
+
+def draw_background(surface, scale=1):
+    '''статичная часть мира: фон и линия земли; scale — во сколько раз surface меньше окна'''
+    surface.fill((255, 255, 255))
+
+    y = (GROUND_LEVEL - 30) // scale
+    pygame.draw.line(surface, (0, 0, 0), (0, y), (SCREEN_WIDTH // scale, y), max(1, 2 // scale))
+
+
+def make_background(scale=1) -> pygame.Surface:
+    '''заранее отрисованный фон, который потом только копируется'''
+    background = pygame.Surface((SCREEN_WIDTH // scale, SCREEN_HEIGHT // scale))
+    draw_background(background, scale)
+    return background
+
+
+def draw_entities(surface, simulation, opaque=False) -> list[pygame.Rect]:
+    '''отрисовка динозавра, снарядов и препятствий, возвращает занятые ими области
+
+    surface — буфер мира в RENDER_SCALE раз меньше окна (при RENDER_SCALE = 1 — само окно);
+    opaque — упрощённое качество: спрайты без смешивания по альфа-каналу
+    '''
+    rects = []
+    rect = simulation.dinosaur.draw(surface, opaque)
+    if rect:
+        rects.append(rect)
+
+    for fireball in simulation.fireballs:
+        rect = fireball.draw(surface, opaque)
+        if rect:
+            rects.append(rect)
+
+    if RENDER_SCALE == 1:
+        for obstacle in simulation.obstacles:
+            rects.append(pygame.draw.rect(surface, obstacle.color, obstacle.rect))
+        return rects
+    scale = RENDER_SCALE
+    for obstacle in simulation.obstacles:
+        # края округляются вниз по отдельности, чтобы соседние препятствия не расходились на пиксель
+        rect = obstacle.rect
+        x, y = rect.x // scale, rect.y // scale
+        rects.append(pygame.draw.rect(surface, obstacle.color, (x, y, rect.right // scale - x, rect.bottom // scale - y)))
+    return rects
+
+
+def draw_world(surface, simulation, background=None):
+    '''отрисовка мира симуляции без интерфейса: общая для окна и внеэкранных кадров; surface — размера буфера мира'''
+    if background is not None:
+        surface.blit(background, (0, 0))
+    else:
+        draw_background(surface, RENDER_SCALE)
+    draw_entities(surface, simulation)
+
+
+def hud_items(simulation, font, big_font, small_font, show_controls) -> tuple:
+    '''строки интерфейса партии для Hud.draw: общие для окна и внеэкранных кадров'''
+    items = [
+        (font, f'Счёт: {simulation.score}', (0, 0, 0), (10, 10), ALIGN_LEFT),
+        (font, f'Скорость: {simulation.game_speed}', (0, 0, 0), (10, 50), ALIGN_LEFT),
+        (font, f'Здоровье: {simulation.dinosaur.hp}', (0, 0, 0), (10, 90), ALIGN_LEFT),
+    ]
+    if show_controls:
+        items.append((small_font, 'Нажмите F чтобы стрелять', (0, 0, 0), (SCREEN_WIDTH // 2, 50), ALIGN_CENTER))
+    if simulation.game_over:
+        items.append((big_font, 'Вы вымерли', (255, 0, 0), (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50),
+                      ALIGN_CENTER))
+        items.append((font, 'Нажмите R чтобы начать заново', (0, 0, 0), (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20),
+                      ALIGN_CENTER))
+    return tuple(items)
+
+
+class BackBuffer:
+    '''буфер мира в RENDER_SCALE раз меньше окна: кадры спрайтов рисуются в своём размере,
+    а на target весь мир попадает одним увеличением за кадр
+
+    интерфейс рисуется уже на target поверх увеличенного мира, чтобы текст оставался чётким
+    '''
+    def __init__(self, target, scale=RENDER_SCALE, upscale=RENDER_UPSCALE):
+        if SPRITE_SCALE % scale:
+            raise ValueError(f'RENDER_SCALE {scale} должен делить SPRITE_SCALE {SPRITE_SCALE} нацело')
+        self.scale_steps = 0
+        if upscale == UPSCALE_SCALE2X:
+            # scale2x удваивает размер, поэтому годится только для степеней двойки
+            if scale & (scale - 1):
+                raise ValueError(f'scale2x увеличивает только в степень двойки раз, а не в {scale}')
+            self.scale_steps = scale.bit_length() - 1
+        elif upscale != UPSCALE_NEAREST:
+            raise ValueError(f'неизвестный способ увеличения {upscale!r}')
+        self.scale = scale
+        size = (SCREEN_WIDTH // scale, SCREEN_HEIGHT // scale)
+        self.surface = pygame.Surface(size)
+        self.background = make_background(scale)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert()
+            self.background = self.background.convert()
+        # если размер окна не делится на масштаб, остаток справа и снизу заливается фоном
+        self.target = target
+        self.area = target.subsurface((0, 0, size[0] * scale, size[1] * scale))
+        width, height = self.area.get_size()
+        self.margins = [rect for rect in (pygame.Rect(width, 0, target.get_width() - width, target.get_height()),
+                                          pygame.Rect(0, height, width, target.get_height() - height))
+                        if rect.w > 0 and rect.h > 0]
+        # промежуточные буферы scale2x, кроме последнего шага, который пишет прямо в target
+        self._steps = [pygame.Surface((size[0] << i, size[1] << i), 0, self.surface)
+                       for i in range(1, self.scale_steps)]
+
+    def clear(self):
+        self.surface.blit(self.background, (0, 0))
+
+    def present(self):
+        '''увеличение буфера мира на target без промежуточной копии во весь экран'''
+        if not self.scale_steps:
+            pygame.transform.scale(self.surface, self.area.get_size(), self.area)
+        else:
+            source = self.surface
+            for step in self._steps:
+                pygame.transform.scale2x(source, step)
+                source = step
+            pygame.transform.scale2x(source, self.area)
+        for rect in self.margins:
+            self.target.fill((255, 255, 255), rect)
+
+
+def merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+    '''объединение пересекающихся прямоугольников, чтобы не обновлять одни пиксели дважды'''
+    merged = []
+    for rect in rects:
+        rect = rect.clip(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        if not rect.w or not rect.h:
+            continue
+        # новый прямоугольник поглощает все, с которыми пересекается, пока пересечения не кончатся
+        i = 0
+        while i < len(merged):
+            if rect.colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+class DirtyRectRenderer:
+    '''вывод на экран только изменившихся областей вместо полного flip
+
+    на каждом кадре стирает фоном прошлые области сущностей и интерфейса,
+    а затем передаёт в pygame.display.update объединение старых и новых областей
+    '''
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+        self._previous: list[pygame.Rect] = []
+        self._full_redraw = True
+        self.updated_fraction = 1.0 # доля пикселей экрана, обновлённых на последнем кадре
+
+    def invalidate(self):
+        '''полная перерисовка на следующем кадре'''
+        self._full_redraw = True
+
+    def erase(self):
+        if self._full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            return
+        for rect in self._previous:
+            self.screen.blit(self.background, rect, rect)
+
+    def present(self, rects: list[pygame.Rect]):
+        '''вывод кадра; rects — всё, что было нарисовано поверх фона на этом кадре'''
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+            self.updated_fraction = 1.0
+        else:
+            dirty = merge_rects(self._previous + rects)
+            pygame.display.update(dirty)
+            self.updated_fraction = sum(r.w * r.h for r in dirty) / (SCREEN_WIDTH * SCREEN_HEIGHT)
+        self._previous = rects
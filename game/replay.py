@@ -0,0 +1,171 @@
+import argparse
+import os
+import struct
+import time
+from config import SIMULATION_TICK_RATE
+from game.simulation import Simulation, ACTIONS
+
+# заголовок: сигнатура, версия, частота шагов, зерно, число шагов, итоговые счёт и здоровье, число событий, флаги
+HEADER = struct.Struct('<4sBHQIIbIB')
+HEADER_V2 = struct.Struct('<4sBHQIIbI') # без флагов: такие записи сделаны с проверкой столкновений по хитбоксам
+MAGIC = b'DRRP'
+# 2: интервалы появления препятствий выбираются один раз на препятствие; 3: флаги режима; 4: флаг подсказки
+VERSION = 4
+FLAG_PIXEL_COLLISIONS = 1 # партия шла с попиксельными столкновениями динозавра
+FLAG_CONTROLS_HINT = 2 # в начале партии была видна подсказка управления (в окне — только в первой партии)
+ACTION_BITS = 2 # код действия 1..4 хранится как 0..3 в младших битах
+
+
+def write_varint(out: bytearray, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset) -> tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class Replay:
+    '''запись одной партии: зерно генератора, поток действий по номерам шагов и итог для проверки'''
+    def __init__(self, seed, events=None, ticks=0, score=0, hp=0, pixel_collisions=False, controls_hint=False):
+        self.seed = seed
+        self.events: list[tuple[int, int]] = events or [] # (номер шага, код действия)
+        self.ticks = ticks
+        self.score = score
+        self.hp = hp
+        self.pixel_collisions = pixel_collisions # без того же режима столкновений партия не повторится
+        self.controls_hint = controls_hint # на симуляцию не влияет, нужен для кадров, как их видел игрок
+
+    def to_bytes(self) -> bytes:
+        '''события пишутся как varint(разница шагов << 2 | код действия)'''
+        out = bytearray(HEADER.pack(MAGIC, VERSION, SIMULATION_TICK_RATE, self.seed, self.ticks,
+                                    self.score, self.hp, len(self.events),
+                                    FLAG_PIXEL_COLLISIONS * self.pixel_collisions
+                                    | FLAG_CONTROLS_HINT * self.controls_hint))
+        previous_tick = 0
+        for tick, code in self.events:
+            write_varint(out, (tick - previous_tick) << ACTION_BITS | (code - 1))
+            previous_tick = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data) -> 'Replay':
+        magic, version = struct.unpack_from('<4sB', data)
+        if magic != MAGIC or version not in (2, 3, VERSION):
+            raise ValueError('файл не является записью партии этой версии')
+        header = HEADER if version >= 3 else HEADER_V2
+        magic, version, tick_rate, seed, ticks, score, hp, count, *flags = header.unpack_from(data)
+        flags = flags[0] if flags else 0
+        if tick_rate != SIMULATION_TICK_RATE:
+            raise ValueError(f'запись сделана с частотой {tick_rate} шагов/с, а не {SIMULATION_TICK_RATE}')
+        events = []
+        offset = header.size
+        tick = 0
+        for _ in range(count):
+            value, offset = read_varint(data, offset)
+            tick += value >> ACTION_BITS
+            events.append((tick, (value & (1 << ACTION_BITS) - 1) + 1))
+        # до версии 4 подсказка не записывалась, поэтому считается, что она была
+        controls_hint = bool(flags & FLAG_CONTROLS_HINT) if version >= 4 else True
+        return cls(seed, events, ticks, score, hp, bool(flags & FLAG_PIXEL_COLLISIONS), controls_hint)
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path) -> 'Replay':
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class InputRecorder:
+    '''запись действий, применённых симуляцией, с номерами шагов'''
+    def __init__(self, seed, controls_hint=False):
+        self.replay = Replay(seed, controls_hint=controls_hint)
+
+    def record(self, tick, actions):
+        for action in actions:
+            self.replay.events.append((tick, ACTIONS.index(action)))
+
+    def finish(self, simulation) -> Replay:
+        replay = self.replay
+        replay.ticks = simulation.ticks
+        replay.score = simulation.score
+        replay.hp = simulation.dinosaur.hp
+        replay.pixel_collisions = simulation.pixel_collisions
+        return replay
+
+
+def replay_steps(replay: Replay):
+    '''(номер шага, действия) для каждого шага записи: поток событий разбирается по шагам только здесь'''
+    events = replay.events
+    i = 0
+    for tick in range(1, replay.ticks + 1):
+        actions = []
+        while i < len(events) and events[i][0] == tick:
+            actions.append(ACTIONS[events[i][1]])
+            i += 1
+        yield tick, actions
+
+
+def start_replay(replay: Replay, simulation: Simulation | None = None) -> Simulation:
+    '''симуляция в начале записанной партии: тот же режим столкновений и то же зерно'''
+    simulation = simulation or Simulation()
+    simulation.pixel_collisions = replay.pixel_collisions
+    simulation.reset(replay.seed)
+    return simulation
+
+
+def play_replay(replay: Replay, simulation: Simulation | None = None) -> Simulation:
+    '''повтор партии без окна с максимальной скоростью'''
+    simulation = start_replay(replay, simulation)
+    for _, actions in replay_steps(replay):
+        simulation.step(actions)
+    return simulation
+
+
+def verify_replay(replay: Replay, simulation: Simulation | None = None) -> bool:
+    '''совпадают ли счёт и здоровье после повтора с записанными'''
+    simulation = play_replay(replay, simulation)
+    return simulation.score == replay.score and simulation.dinosaur.hp == replay.hp
+
+
+def replay_path(directory, seed) -> str:
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{seed}.drr')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='проверка записанных партий повтором без окна')
+    parser.add_argument('paths', nargs='+', help='файлы записей .drr')
+    args = parser.parse_args()
+
+    simulation = Simulation()
+    failed = 0
+    start = time.perf_counter()
+    total_ticks = 0
+    for path in args.paths:
+        replay = Replay.load(path)
+        ok = verify_replay(replay, simulation)
+        total_ticks += replay.ticks
+        failed += not ok
+        print(f'{"OK  " if ok else "FAIL"} {path}: счёт {simulation.score}/{replay.score}, '
+              f'здоровье {simulation.dinosaur.hp}/{replay.hp}, шагов {replay.ticks}')
+    elapsed = time.perf_counter() - start
+    print(f'записей: {len(args.paths)}, ошибок: {failed}, {total_ticks / max(elapsed, 1e-9):.0f} шагов/с')
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+from heapq import heappush, heappop
+
+
+class Timer:
+    '''запланированный вызов; отменённый таймер остаётся в куче и пропускается при извлечении'''
+    __slots__ = ('due', 'interval', 'callback', 'cancelled')
+
+    def __init__(self, due, interval, callback):
+        self.due = due
+        self.interval = interval # 0 для однократного вызова
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    '''очередь отложенных вызовов по времени симуляции на двоичной куче
+
+    пока ничего не наступило, run_due стоит одного сравнения; работа O(log n)
+    выполняется только при срабатывании. Вызовы с одинаковым временем идут в
+    порядке постановки
+    '''
+    def __init__(self, now):
+        self.now = now # источник текущего времени в мс
+        self._heap: list[tuple[float, int, Timer]] = []
+        self._sequence = 0
+        self.fired = 0
+
+    def schedule(self, delay, callback) -> Timer:
+        '''однократный вызов через delay мс'''
+        return self._push(Timer(self.now() + delay, 0, callback))
+
+    def schedule_repeating(self, interval, callback) -> Timer:
+        '''вызов каждые interval мс; следующий срок отсчитывается от предыдущего, а не от момента вызова'''
+        return self._push(Timer(self.now() + interval, interval, callback))
+
+    def _push(self, timer) -> Timer:
+        self._sequence += 1
+        heappush(self._heap, (timer.due, self._sequence, timer))
+        return timer
+
+    def run_due(self):
+        '''вызов всего, чей срок наступил к текущему моменту'''
+        heap = self._heap
+        if not heap:
+            return
+        now = self.now()
+        while heap and heap[0][0] <= now:
+            timer = heappop(heap)[2]
+            if timer.cancelled:
+                continue
+            if timer.interval:
+                timer.due += timer.interval
+                self._push(timer)
+            self.fired += 1
+            timer.callback()
+
+    def clear(self):
+        self._heap.clear()
+
+    def __len__(self):
+        return len(self._heap)
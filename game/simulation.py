@@ -0,0 +1,286 @@
+import random
+from config import *
+from entities.dinosaur import Dinosaur
+from entities.fireball import Fireball, create_fireball
+from entities.obstacles import GroundObstacle, FlyingObstacle
+from entities.pool import EntityPool, swap_remove
+from game.collision import SweepAndPrune, mask_hits
+from game.profiler import profiler
+from game.scheduler import Scheduler
+from game.telemetry import EVENT_SPAWN, EVENT_DESTROY, EVENT_HIT, EVENT_SHOT, EVENT_SCORE, EVENT_SPEED
+from assets.config import ANIMATION_CONFIG
+
+# действия игрока, которые принимает Simulation.step
+ACTION_JUMP = 'jump'
+ACTION_DUCK = 'duck'
+ACTION_STAND_UP = 'stand_up'
+ACTION_SHOOT = 'shoot'
+# числовой код действия — индекс в этом кортеже, 0 означает бездействие
+ACTIONS = (None, ACTION_JUMP, ACTION_DUCK, ACTION_STAND_UP, ACTION_SHOOT)
+
+STEP_MS = 1000 / SIMULATION_TICK_RATE # длительность одного шага симуляции
+
+
+class SimulationClock:
+    '''время симуляции в мс: идёт только вместе с шагами, а не с реальными часами'''
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self) -> float:
+        return self.time
+
+    def advance(self, dt):
+        self.time += dt
+
+    def reset(self, start=0.0):
+        self.time = start
+
+
+class Simulation:
+    '''игровая логика без окна и реальных часов, продвигается фиксированными шагами'''
+    def __init__(self, clock: SimulationClock | None = None, rng: random.Random | None = None):
+        self.clock = clock or SimulationClock()
+        self.rng = rng or random.Random() # собственный генератор, чтобы партии не влияли друг на друга
+        self.step_ms = STEP_MS
+        self.scheduler = Scheduler(self.clock.now) # все отложенные события партии
+        self.spawn_obstacles = True # отключается для сценариев с заранее заданными препятствиями
+        self.pixel_collisions = PIXEL_COLLISIONS # удары по динозавру по маске видимого кадра
+
+        # пулы живут дольше одной партии, поэтому создаются до reset
+        self.fireball_pool = EntityPool(create_fireball, ENTITY_POOL_CAPACITY)
+        self.ground_obstacle_pool = EntityPool(GroundObstacle, ENTITY_POOL_CAPACITY)
+        self.flying_obstacle_pool = EntityPool(FlyingObstacle, ENTITY_POOL_CAPACITY)
+        self.fireballs: list[Fireball] = []
+        self.obstacles: list[GroundObstacle | FlyingObstacle] = []
+        self.broadphase = SweepAndPrune()
+        self.recorder = None # получает применённые действия с номерами шагов, см. game.replay
+        self.telemetry = None # шина событий партии, см. game.telemetry
+        # счётчик появившихся сущностей не сбрасывается между партиями, поэтому номера не повторяются
+        self.spawned = 0
+
+        self.reset()
+
+    def reset(self, seed=None):
+        '''новая партия; с одним и тем же seed и действиями партия повторяется в точности'''
+        self.seed = seed
+        if seed is not None:
+            self.rng.seed(seed)
+        self.clock.reset()
+        self.scheduler.clear()
+        self.dinosaur = Dinosaur(100, GROUND_LEVEL - 60, self.scheduler, self.fireball_pool)
+        self.dinosaur.load_animations(ANIMATION_CONFIG)
+        # сущности прошлой партии возвращаются в пулы
+        while self.fireballs:
+            self.fireball_pool.release(self.fireballs.pop())
+        while self.obstacles:
+            self._release_obstacle(self.obstacles.pop())
+        self.broadphase.clear()
+        self.game_speed = BASE_GAME_SPEED
+        self.score = 0
+        self.ticks = 0
+        self.distance = 0 # путь мира за партию в пикселях окна, по нему прокручивается фон
+        self.game_over = False
+        # интервал до следующего препятствия выбирается один раз при каждом появлении
+        self.scheduler.schedule(self.rng.randint(1000, 3000), self._spawn_due)
+        self.scheduler.schedule_repeating(SPEED_INCREASE_INTERVAL, self.increase_speed)
+
+    def step(self, actions=()):
+        '''один шаг фиксированной длительности: время, действия игрока, затем логика'''
+        if self.game_over:
+            return
+        self.clock.advance(self.step_ms)
+        self.ticks += 1
+        if actions and self.recorder is not None:
+            self.recorder.record(self.ticks, actions)
+        for action in actions:
+            self.apply_action(action)
+        self.update(self.step_ms)
+
+    def apply_action(self, action):
+        if action == ACTION_JUMP:
+            self.dinosaur.jump()
+        elif action == ACTION_DUCK:
+            self.dinosaur.duck()
+        elif action == ACTION_STAND_UP:
+            self.dinosaur.stand_up()
+        elif action == ACTION_SHOOT:
+            self.dinosaur.shoot(self.game_speed)
+
+    def _spawn_due(self):
+        if self.spawn_obstacles:
+            with profiler.section('generate_obstacle'):
+                self.generate_obstacle()
+        self.scheduler.schedule(self.rng.randint(1000, 3000), self._spawn_due)
+
+    def generate_obstacle(self):
+        rng = self.rng
+        x = SCREEN_WIDTH
+        is_destructible = rng.random() < 0.3
+        is_flying = rng.choice([True, False])
+        if is_flying:
+            width = rng.randint(30, 50)
+            height = rng.randint(30, 50)
+            min_flying_height = 50
+            max_flying_height = 170
+            y = GROUND_LEVEL - rng.randint(min_flying_height, max_flying_height)
+            color = (255, 255, 0) if is_destructible else (0, 0, 255)
+            obstacle = self.flying_obstacle_pool.acquire(x, y, width, height, color, is_destructible)
+
+        else:
+            if is_destructible and rng.random() < 0.5:
+                obstacle_type = 'wall'
+                height = rng.randint(180, 200)
+                width = rng.randint(30, 50)
+                color = (255, 0, 0)
+            else:
+                obstacle_type = 'jump'
+                height = rng.randint(20, 40)
+                width = rng.randint(40, 60)
+                color = (255, 255, 0) if is_destructible else (0, 0, 255)
+
+            obstacle = self.ground_obstacle_pool.acquire(x, 0, width, height, color, is_destructible,
+                                                         obstacle_type)
+
+        self.add_obstacle(obstacle)
+        if self.telemetry is not None:
+            self.telemetry.emit(EVENT_SPAWN, self.ticks, is_flying)
+
+    def increase_speed(self):
+        self.game_speed += SPEED_INCREMENT
+        if self.telemetry is not None:
+            self.telemetry.emit(EVENT_SPEED, self.ticks, self.game_speed)
+
+    def update(self, dt):
+        if self.game_over:
+            return
+
+        # наступившие события: кулдаун и задержка выстрела, появление препятствий, ускорение
+        self.scheduler.run_due()
+
+        fireball = self.dinosaur.update(dt, self.game_speed)
+        if fireball:
+            fireball.serial = self.spawned
+            self.spawned += 1
+            self.fireballs.append(fireball)
+            self.broadphase.add_fireball(fireball)
+            if self.telemetry is not None:
+                self.telemetry.emit(EVENT_SHOT, self.ticks, self.game_speed)
+
+        # неактивные сущности удаляются перестановкой последнего элемента на их место,
+        # поэтому индекс увеличивается только для оставшихся
+        i = 0
+        while i < len(self.fireballs):
+            fireball = self.fireballs[i]
+            fireball.update(dt)
+            if fireball.active:
+                i += 1
+            else:
+                self._remove_fireball(i)
+
+        # мир сдвигается вместе с препятствиями, на той же скорости
+        self.distance += self.game_speed
+        i = 0
+        while i < len(self.obstacles):
+            obstacle = self.obstacles[i]
+            obstacle.update(self.game_speed)
+            if obstacle.is_off_screen():
+                self._remove_obstacle(i)
+                self.score += 1
+                if self.telemetry is not None:
+                    self.telemetry.emit(EVENT_SCORE, self.ticks, self.score)
+            else:
+                i += 1
+
+        with profiler.section('check_collisions'):
+            self.check_collisions()
+
+    def add_obstacle(self, obstacle):
+        obstacle.serial = self.spawned
+        self.spawned += 1
+        self.obstacles.append(obstacle)
+        self.broadphase.add_obstacle(obstacle)
+
+    def check_collisions(self):
+        '''все столкновения кадра сначала находятся, затем применяются, поэтому порядок списков не важен'''
+        broadphase = self.broadphase
+        broadphase.refresh()
+        hits = self.dinosaur_hits()
+
+        # каждый снаряд взрывается о самое левое задетое препятствие, ещё не столкнувшееся с динозавром
+        claims = []
+        for fireball, candidates in broadphase.candidate_pairs():
+            if fireball.is_exploding:
+                continue
+            for obstacle in candidates:
+                if obstacle not in hits and fireball.rect.colliderect(obstacle.rect):
+                    claims.append((fireball, obstacle))
+                    break
+
+        telemetry = self.telemetry
+        for obstacle in hits:
+            obstacle.destroyed = True # столкнувшееся с динозавром препятствие убирается
+            self.dinosaur.hp -= 1
+            self.game_speed = max(BASE_GAME_SPEED, self.game_speed - SPEED_DECREMENT_ON_HIT)
+            if telemetry is not None:
+                telemetry.emit(EVENT_HIT, self.ticks, self.dinosaur.hp)
+        if self.dinosaur.hp <= 0:
+            self.game_over = True
+
+        for fireball, obstacle in claims:
+            fireball.check_collision(obstacle)
+            if not obstacle.destroyed:
+                obstacle.handle_fireball_collision(fireball)
+                if obstacle.destroyed:
+                    self.score += 2
+                    if telemetry is not None:
+                        telemetry.emit(EVENT_DESTROY, self.ticks, self.score)
+
+        if hits or claims:
+            i = 0
+            while i < len(self.obstacles):
+                if self.obstacles[i].destroyed:
+                    self._remove_obstacle(i)
+                else:
+                    i += 1
+
+    def dinosaur_hits(self) -> list:
+        '''препятствия, задевшие динозавра; широкая фаза должна быть обновлена (refresh), состояние не меняется'''
+        dinosaur = self.dinosaur
+        if self.pixel_collisions:
+            # маска собирается, только если рядом есть препятствия, и проверяется для задевших её рамку
+            candidates = self.broadphase.query_obstacles(dinosaur.reach())
+            if not candidates:
+                return candidates
+            mask, bounds = dinosaur.collision_mask()
+            return mask_hits(mask, bounds, candidates)
+        return [obstacle for obstacle in self.broadphase.query_obstacles(dinosaur.rect)
+                if obstacle.check_collision(dinosaur)]
+
+    def _remove_fireball(self, index):
+        fireball = self.fireballs[index]
+        self.broadphase.remove_fireball(fireball)
+        self.fireball_pool.release(fireball)
+        swap_remove(self.fireballs, index)
+
+    def _remove_obstacle(self, index):
+        obstacle = self.obstacles[index]
+        self.broadphase.remove_obstacle(obstacle)
+        self._release_obstacle(obstacle)
+        swap_remove(self.obstacles, index)
+
+    def _release_obstacle(self, obstacle):
+        if obstacle.is_flying:
+            self.flying_obstacle_pool.release(obstacle)
+        else:
+            self.ground_obstacle_pool.release(obstacle)
+
+    def allocations(self) -> int:
+        '''сколько сущностей пулам пришлось создать заново за всё время'''
+        return self.fireball_pool.created + self.ground_obstacle_pool.created + self.flying_obstacle_pool.created
+
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        return {
+            'fireball': self.fireball_pool.stats(),
+            'ground_obstacle': self.ground_obstacle_pool.stats(),
+            'flying_obstacle': self.flying_obstacle_pool.stats(),
+        }
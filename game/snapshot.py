@@ -0,0 +1,289 @@
+import struct
+from heapq import heapify
+from entities.obstacles import obstacle_kind
+from game.scheduler import Timer
+from assets.config import ANIMATION_CONFIG
+
+# мир: шаги, время, счёт, скорость, конец игры, счётчик сущностей, зерно (есть ли, значение),
+# число препятствий, снарядов и таймеров, порядковый номер и счётчик срабатываний планировщика,
+# наибольшая ширина препятствия в широкой фазе, пройденный путь
+WORLD = struct.Struct('<Idii?I?qHHHQQHq')
+# состояние генератора: версия 3 модуля random — 624 слова и позиция, затем кэш gauss
+RNG_WORDS = struct.Struct('<625I')
+RNG_GAUSS = struct.Struct('<?d')
+# динозавр: x, y, скорость по y, здоровье, кадр приседания, флаги, текущие анимации головы, тела, ног,
+# хитбоксы стоя и в присяде (x, y)
+DINOSAUR = struct.Struct('<dddiiHbbbiiii')
+# курсор анимации: кадр, накопленное время, активна ли, вперёд ли
+ANIMATION = struct.Struct('<hd??')
+# препятствие: номер, летающее ли, x, y, ширина, высота, цвет, разрушаемое ли, разрушено ли, тип, прочность
+OBSTACLE = struct.Struct('<I?iihh3B??Bb')
+# снаряд: номер, x, y, скорость, скорость игры, активен ли, взрывается ли, взрыв закончен;
+# за ним курсор текущей анимации (взрыва, если снаряд взрывается), другая при переключении начинается заново
+FIREBALL = struct.Struct('<Iiidd???')
+# таймер: срок, интервал, порядковый номер в куче, код вызова
+TIMER = struct.Struct('<ddQB')
+# порядок сущностей в широкой фазе — индексы в списках симуляции
+INDEX = struct.Struct('<H')
+
+DINOSAUR_FLAGS = ('can_shoot', 'is_jumping', 'is_ducking', 'was_ducking', 'is_running', 'is_alive',
+                  'is_duck_key_pressed', 'is_shooting', 'shoot_delay_active', 'shot_ready')
+OBSTACLE_TYPES = ('jump', 'wall', 'flying')
+
+
+def _pack_animation(buffer, offset, animation) -> int:
+    ANIMATION.pack_into(buffer, offset, animation.current_frame, animation.timer, animation.active, animation.forward)
+    return offset + ANIMATION.size
+
+
+def _unpack_animation(buffer, offset, animation) -> int:
+    animation.current_frame, animation.timer, animation.active, animation.forward = \
+        ANIMATION.unpack_from(buffer, offset)
+    return offset + ANIMATION.size
+
+
+def _unpack_order(buffer, offset, entities, order) -> int:
+    '''порядок широкой фазы из индексов в снимке, записанный в её список на месте'''
+    count = len(entities)
+    end = offset + INDEX.size * count
+    del order[count:]
+    for i, (index,) in enumerate(INDEX.iter_unpack(memoryview(buffer)[offset:end])):
+        entity = entities[index]
+        entity.sweep_index = i
+        if i < len(order):
+            order[i] = entity
+        else:
+            order.append(entity)
+    return end
+
+
+def _index(items, item) -> int:
+    '''номер элемента по тождеству; -1 для None'''
+    for i, candidate in enumerate(items):
+        if candidate is item:
+            return i
+    return -1
+
+
+class WorldSnapshot:
+    '''изменяемое состояние симуляции в плоском заранее выделенном буфере
+
+    сохраняются только данные: координаты, скорости, флаги, курсоры анимаций,
+    сроки таймеров и состояние генератора. Кадры, пулы и другие неизменяемые
+    объекты не копируются, а при restore состояние записывается в объекты той
+    же симуляции: живые сущности и таймеры переиспользуются, недостающие
+    берутся из её пулов. После restore партия продолжается точно так же, как
+    продолжилась бы с момента capture. Таймеры, поставленные не симуляцией
+    (например, интерфейсом движка), не сохраняются и при restore остаются как есть
+    '''
+    def __init__(self, max_obstacles=256, max_fireballs=64, max_timers=64):
+        self.max_obstacles = max_obstacles
+        self.max_fireballs = max_fireballs
+        self.max_timers = max_timers
+        self.size = (WORLD.size + RNG_WORDS.size + RNG_GAUSS.size
+                     + DINOSAUR.size + ANIMATION.size * len(ANIMATION_CONFIG)
+                     + (OBSTACLE.size + INDEX.size) * max_obstacles
+                     + (FIREBALL.size + ANIMATION.size + INDEX.size) * max_fireballs
+                     + TIMER.size * max_timers)
+        self.buffer = bytearray(self.size)
+        self.used = 0 # сколько байт занял последний снимок
+        self.ticks = None # номер шага симуляции в снимке; None — снимка ещё нет
+        self._spare_timers = [] # таймеры симуляции, которые restore записывает заново
+
+    @staticmethod
+    def _callbacks(simulation) -> tuple:
+        '''вызовы таймеров симуляции; код таймера в снимке — индекс в этом кортеже'''
+        dinosaur = simulation.dinosaur
+        return (simulation._spawn_due, simulation.increase_speed, dinosaur._end_cooldown, dinosaur._end_shoot_delay)
+
+    def capture(self, simulation):
+        obstacles = simulation.obstacles
+        fireballs = simulation.fireballs
+        callbacks = self._callbacks(simulation)
+        scheduler = simulation.scheduler
+        timers = [(due, sequence, timer) for due, sequence, timer in scheduler._heap
+                  if not timer.cancelled and timer.callback in callbacks]
+        if len(obstacles) > self.max_obstacles or len(fireballs) > self.max_fireballs or len(timers) > self.max_timers:
+            raise ValueError(f'снимок на {self.max_obstacles} препятствий, {self.max_fireballs} снарядов и '
+                             f'{self.max_timers} таймеров, а в мире {len(obstacles)}, {len(fireballs)} и {len(timers)}')
+        buffer = self.buffer
+        seed = simulation.seed
+        WORLD.pack_into(buffer, 0, simulation.ticks, simulation.clock.time, simulation.score,
+                        simulation.game_speed, simulation.game_over, simulation.spawned, seed is not None,
+                        seed or 0, len(obstacles), len(fireballs), len(timers), scheduler._sequence,
+                        scheduler.fired, simulation.broadphase.max_obstacle_width, simulation.distance)
+        offset = WORLD.size
+        _, words, gauss = simulation.rng.getstate()
+        RNG_WORDS.pack_into(buffer, offset, *words)
+        offset += RNG_WORDS.size
+        RNG_GAUSS.pack_into(buffer, offset, gauss is not None, gauss or 0.0)
+        offset += RNG_GAUSS.size
+
+        dinosaur = simulation.dinosaur
+        animations = list(dinosaur.animations.values())
+        flags = 0
+        for bit, name in enumerate(DINOSAUR_FLAGS):
+            flags |= getattr(dinosaur, name) << bit
+        DINOSAUR.pack_into(buffer, offset, dinosaur.x, dinosaur.y, dinosaur.velocity_y, dinosaur.hp,
+                           dinosaur.duck_animation_frame, flags, _index(animations, dinosaur.current_head_anim),
+                           _index(animations, dinosaur.current_body_anim),
+                           _index(animations, dinosaur.current_legs_anim), dinosaur.normal_rect.x,
+                           dinosaur.normal_rect.y, dinosaur.ducking_rect.x, dinosaur.ducking_rect.y)
+        offset += DINOSAUR.size
+        for animation in animations:
+            offset = _pack_animation(buffer, offset, animation)
+
+        for obstacle in obstacles:
+            OBSTACLE.pack_into(buffer, offset, obstacle.serial, obstacle.is_flying, obstacle.x, obstacle.y,
+                               obstacle.width, obstacle.height, *obstacle.color, obstacle.is_destructible,
+                               obstacle.destroyed, OBSTACLE_TYPES.index(obstacle.obstacle_type), obstacle.health)
+            offset += OBSTACLE.size
+        positions = {id(obstacle): i for i, obstacle in enumerate(obstacles)}
+        for obstacle in simulation.broadphase.obstacles:
+            if obstacle is None:
+                continue # удалён после последнего refresh
+            INDEX.pack_into(buffer, offset, positions[id(obstacle)])
+            offset += INDEX.size
+
+        for fireball in fireballs:
+            FIREBALL.pack_into(buffer, offset, fireball.serial, fireball.x, fireball.y, fireball.speed,
+                               fireball.game_speed, fireball.active, fireball.is_exploding,
+                               fireball.explosion_complete)
+            offset += FIREBALL.size
+            offset = _pack_animation(buffer, offset, fireball.current_animation)
+        positions = {id(fireball): i for i, fireball in enumerate(fireballs)}
+        for fireball in simulation.broadphase.fireballs:
+            if fireball is None:
+                continue # удалён после последнего refresh
+            INDEX.pack_into(buffer, offset, positions[id(fireball)])
+            offset += INDEX.size
+
+        for due, sequence, timer in timers:
+            TIMER.pack_into(buffer, offset, due, timer.interval, sequence, callbacks.index(timer.callback))
+            offset += TIMER.size
+        self.used = offset
+        self.ticks = simulation.ticks
+
+    def restore(self, simulation):
+        if self.ticks is None:
+            raise ValueError('снимок ещё не сделан')
+        buffer = self.buffer
+        (simulation.ticks, time, simulation.score, simulation.game_speed, simulation.game_over, simulation.spawned,
+         has_seed, seed, obstacle_count, fireball_count, timer_count, sequence, fired,
+         max_obstacle_width, simulation.distance) = WORLD.unpack_from(buffer, 0)
+        simulation.clock.time = time
+        simulation.seed = seed if has_seed else None
+        offset = WORLD.size
+        words = RNG_WORDS.unpack_from(buffer, offset)
+        offset += RNG_WORDS.size
+        has_gauss, gauss = RNG_GAUSS.unpack_from(buffer, offset)
+        offset += RNG_GAUSS.size
+        simulation.rng.setstate((3, words, gauss if has_gauss else None))
+
+        dinosaur = simulation.dinosaur
+        animations = list(dinosaur.animations.values())
+        (dinosaur.x, dinosaur.y, dinosaur.velocity_y, dinosaur.hp, dinosaur.duck_animation_frame, flags, head, body,
+         legs, dinosaur.normal_rect.x, dinosaur.normal_rect.y, dinosaur.ducking_rect.x,
+         dinosaur.ducking_rect.y) = DINOSAUR.unpack_from(buffer, offset)
+        offset += DINOSAUR.size
+        for bit, name in enumerate(DINOSAUR_FLAGS):
+            setattr(dinosaur, name, bool(flags >> bit & 1))
+        dinosaur.current_head_anim = animations[head] if head >= 0 else None
+        dinosaur.current_body_anim = animations[body] if body >= 0 else None
+        dinosaur.current_legs_anim = animations[legs] if legs >= 0 else None
+        for animation in animations:
+            offset = _unpack_animation(buffer, offset, animation)
+
+        # сохранённое записывается в уже живые сущности на тех же местах; из пулов берётся или в них
+        # возвращается только разница в числе (и препятствия, у которых не совпал класс)
+        broadphase = simulation.broadphase
+        obstacles = simulation.obstacles
+        live = len(obstacles)
+        end = offset + OBSTACLE.size * obstacle_count
+        for i, (serial, is_flying, x, y, width, height, red, green, blue, is_destructible, destroyed, obstacle_type,
+                health) in enumerate(OBSTACLE.iter_unpack(memoryview(buffer)[offset:end])):
+            obstacle = obstacles[i] if i < live else None
+            if obstacle is None or obstacle.is_flying != is_flying:
+                if obstacle is not None:
+                    simulation._release_obstacle(obstacle)
+                if is_flying:
+                    obstacle = simulation.flying_obstacle_pool.acquire(x, y, width, height, (red, green, blue),
+                                                                       is_destructible)
+                else:
+                    obstacle = simulation.ground_obstacle_pool.acquire(x, y, width, height, (red, green, blue),
+                                                                       is_destructible, OBSTACLE_TYPES[obstacle_type])
+                if i < live:
+                    obstacles[i] = obstacle
+                else:
+                    obstacles.append(obstacle)
+            # пул пересчитывает высоту над землёй, а в снимке уже итоговые координаты
+            obstacle.rect.update(x, y, width, height)
+            obstacle.kind = obstacle_kind((red, green, blue), OBSTACLE_TYPES[obstacle_type], is_destructible,
+                                          is_flying)
+            obstacle.serial = serial
+            obstacle.destroyed = destroyed
+            obstacle.health = health
+        while len(obstacles) > obstacle_count:
+            simulation._release_obstacle(obstacles.pop())
+        offset = end
+        offset = _unpack_order(buffer, offset, obstacles, broadphase.obstacles)
+        broadphase.max_obstacle_width = max_obstacle_width
+
+        fireballs = simulation.fireballs
+        live = len(fireballs)
+        for i in range(fireball_count):
+            serial, x, y, speed, game_speed, active, is_exploding, explosion_complete = \
+                FIREBALL.unpack_from(buffer, offset)
+            offset += FIREBALL.size
+            if i < live:
+                fireball = fireballs[i]
+                fireball.rect.update(x, y, 20, 20)
+            else:
+                fireball = simulation.fireball_pool.acquire(x, y, game_speed)
+                fireballs.append(fireball)
+            fireball.serial = serial
+            fireball.speed = speed
+            fireball.game_speed = game_speed
+            fireball.active = active
+            fireball.is_exploding = is_exploding
+            fireball.explosion_complete = explosion_complete
+            fireball.current_animation.clip = fireball.clips['fireball_explode' if is_exploding else 'fireball_fly']
+            offset = _unpack_animation(buffer, offset, fireball.current_animation)
+        while len(fireballs) > fireball_count:
+            simulation.fireball_pool.release(fireballs.pop())
+        offset = _unpack_order(buffer, offset, fireballs, broadphase.fireballs)
+
+        # таймеры других владельцев остаются, таймеры симуляции заменяются сохранёнными; куча
+        # уплотняется на месте, а объекты Timer симуляции переиспользуются
+        scheduler = simulation.scheduler
+        callbacks = self._callbacks(simulation)
+        heap = scheduler._heap
+        spare = self._spare_timers
+        kept = 0
+        foreign_sequence = 0
+        for entry in heap:
+            timer = entry[2]
+            if timer.callback in callbacks:
+                # ссылок на таймеры симуляции никто не хранит, поэтому их можно записать заново
+                spare.append(timer)
+            elif not timer.cancelled:
+                heap[kept] = entry
+                kept += 1
+                foreign_sequence = max(foreign_sequence, entry[1])
+        del heap[kept:]
+        for _ in range(timer_count):
+            due, interval, timer_sequence, code = TIMER.unpack_from(buffer, offset)
+            offset += TIMER.size
+            if spare:
+                timer = spare.pop()
+                timer.due = due
+                timer.interval = interval
+                timer.callback = callbacks[code]
+                timer.cancelled = False
+            else:
+                timer = Timer(due, interval, callbacks[code])
+            heap.append((due, timer_sequence, timer))
+        spare.clear()
+        heapify(heap)
+        scheduler._sequence = max(sequence, foreign_sequence)
+        scheduler.fired = fired
@@ -0,0 +1,602 @@
+'''сервер для зрителей и гонок на одном зерне: состояние партий рассылается с фиксированной частотой
+
+снимок кодируется разностью относительно последнего подтверждённого клиентом,
+клиенты рисуют мир с небольшой задержкой, интерполируя между снимками.
+Запуск из корня репозитория:
+    python -m game.spectator serve --tracks 2 --bot      # сервер на SPECTATOR_PORT
+    python -m game.spectator watch                        # окно зрителя
+    python -m game.spectator watch --play 0               # игрок на дорожке 0
+    python -m game.spectator loadtest --clients 10 100 500
+'''
+import argparse
+import asyncio
+import multiprocessing
+import random
+import struct
+import time
+import pygame
+from collections import deque
+from config import *
+from game.replay import write_varint, read_varint
+from game.simulation import Simulation, ACTIONS, ACTION_JUMP, ACTION_DUCK, ACTION_STAND_UP, ACTION_SHOOT
+
+# сообщения; каждое передаётся с длиной FRAME впереди
+MSG_HELLO = 0 # клиент -> сервер: роль и дорожка
+MSG_ACK = 1 # клиент -> сервер: номер полученного снимка
+MSG_ACTION = 2 # клиент -> сервер: код действия игрока из ACTIONS
+MSG_SNAPSHOT = 3 # сервер -> клиент
+FRAME = struct.Struct('<I')
+HELLO = struct.Struct('<BBB') # тип, роль, дорожка
+MAX_CLIENT_FRAME = 16 # сообщения клиента — несколько байт, длинный кадр считается ошибкой протокола
+ROLE_SPECTATOR = 0
+ROLE_PLAYER = 1
+
+# флаги динозавра и партии в заголовке дорожки
+DINO_JUMPING = 1
+DINO_DUCKING = 2
+DINO_SHOOTING = 4
+GAME_OVER = 8
+# флаги препятствия
+OBSTACLE_FLYING = 1
+OBSTACLE_DESTRUCTIBLE = 2
+OBSTACLE_WALL = 4
+
+# состояние дорожки: (заголовок, {номер: препятствие}, {номер: снаряд}), все поля целые
+# заголовок: счёт, скорость, x, y, высота динозавра, флаги, здоровье
+EMPTY_HEADER = (0,) * 7
+EMPTY_OBSTACLE = (0,) * 5 # x, y, ширина, высота, флаги
+EMPTY_FIREBALL = (0,) * 3 # x, y, взрывается ли
+
+
+def capture(simulation) -> tuple:
+    '''состояние симуляции в виде кортежей целых чисел для сравнения и кодирования'''
+    dinosaur = simulation.dinosaur
+    rect = dinosaur.rect
+    flags = (DINO_JUMPING * dinosaur.is_jumping | DINO_DUCKING * dinosaur.is_ducking
+             | DINO_SHOOTING * dinosaur.is_shooting | GAME_OVER * simulation.game_over)
+    header = (simulation.score, simulation.game_speed, rect.x, rect.y, rect.h, flags, dinosaur.hp)
+    obstacles = {}
+    for obstacle in simulation.obstacles:
+        rect = obstacle.rect
+        kind = (OBSTACLE_FLYING * obstacle.is_flying | OBSTACLE_DESTRUCTIBLE * obstacle.is_destructible
+                | OBSTACLE_WALL * (obstacle.obstacle_type == 'wall'))
+        obstacles[obstacle.serial] = (rect.x, rect.y, rect.w, rect.h, kind)
+    fireballs = {fireball.serial: (round(fireball.x), round(fireball.y), int(fireball.is_exploding))
+                 for fireball in simulation.fireballs}
+    return header, obstacles, fireballs
+
+
+def _zigzag(value) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value) -> int:
+    return -((value + 1) >> 1) if value & 1 else value >> 1
+
+
+def _encode_fields(out, values, base):
+    '''байт-маска изменившихся полей, затем их разности в zigzag-varint'''
+    mask_at = len(out)
+    out.append(0)
+    mask = 0
+    for i, (value, previous) in enumerate(zip(values, base)):
+        if value != previous:
+            mask |= 1 << i
+            write_varint(out, _zigzag(value - previous))
+    out[mask_at] = mask
+
+
+def _decode_fields(data, offset, base) -> tuple[tuple, int]:
+    mask = data[offset]
+    offset += 1
+    if not mask:
+        return base, offset
+    values = list(base)
+    for i in range(len(base)):
+        if mask >> i & 1:
+            value, offset = read_varint(data, offset)
+            values[i] += _unzigzag(value)
+    return tuple(values), offset
+
+
+def _encode_entities(out, entities, base, empty):
+    '''исчезнувшие номера, затем появившиеся и изменившиеся сущности; номера идут по возрастанию разностями'''
+    removed = sorted(serial for serial in base if serial not in entities)
+    changed = sorted(serial for serial, values in entities.items() if base.get(serial) != values)
+    for serials in (removed, changed):
+        write_varint(out, len(serials))
+        previous = 0
+        for serial in serials:
+            write_varint(out, serial - previous)
+            previous = serial
+            if serials is changed:
+                _encode_fields(out, entities[serial], base.get(serial, empty))
+
+
+def _decode_entities(data, offset, base, empty) -> tuple[dict, int]:
+    entities = dict(base)
+    count, offset = read_varint(data, offset)
+    serial = 0
+    for _ in range(count):
+        delta, offset = read_varint(data, offset)
+        serial += delta
+        del entities[serial]
+    count, offset = read_varint(data, offset)
+    serial = 0
+    for _ in range(count):
+        delta, offset = read_varint(data, offset)
+        serial += delta
+        entities[serial], offset = _decode_fields(data, offset, entities.get(serial, empty))
+    return entities, offset
+
+
+def encode_snapshot(tick, tracks, base_tick=0, base_tracks=None) -> bytes:
+    '''снимок всех дорожек; base_tick 0 означает полный снимок без опоры на предыдущий'''
+    out = bytearray((MSG_SNAPSHOT,))
+    write_varint(out, tick)
+    write_varint(out, base_tick)
+    write_varint(out, len(tracks))
+    for i, (header, obstacles, fireballs) in enumerate(tracks):
+        if base_tracks is not None and i < len(base_tracks):
+            base_header, base_obstacles, base_fireballs = base_tracks[i]
+        else:
+            base_header, base_obstacles, base_fireballs = EMPTY_HEADER, {}, {}
+        _encode_fields(out, header, base_header)
+        _encode_entities(out, obstacles, base_obstacles, EMPTY_OBSTACLE)
+        _encode_entities(out, fireballs, base_fireballs, EMPTY_FIREBALL)
+    return bytes(out)
+
+
+def snapshot_tick(data) -> int:
+    return read_varint(data, 1)[0]
+
+
+def decode_snapshot(data, history) -> tuple[int, list]:
+    '''номер и состояние дорожек; history — уже полученные состояния по номерам снимков'''
+    tick, offset = read_varint(data, 1)
+    base_tick, offset = read_varint(data, offset)
+    count, offset = read_varint(data, offset)
+    base_tracks = None
+    if base_tick:
+        base_tracks = history.get(base_tick)
+        if base_tracks is None:
+            raise ValueError(f'снимок {tick} опирается на неизвестный снимок {base_tick}')
+    tracks = []
+    for i in range(count):
+        if base_tracks is not None and i < len(base_tracks):
+            header, obstacles, fireballs = base_tracks[i]
+        else:
+            header, obstacles, fireballs = EMPTY_HEADER, {}, {}
+        header, offset = _decode_fields(data, offset, header)
+        obstacles, offset = _decode_entities(data, offset, obstacles, EMPTY_OBSTACLE)
+        fireballs, offset = _decode_entities(data, offset, fireballs, EMPTY_FIREBALL)
+        tracks.append((header, obstacles, fireballs))
+    return tick, tracks
+
+
+def bot_actions(simulation) -> list[str]:
+    '''простой игрок для дорожек без человека: стреляет при первой возможности и прыгает через низкие препятствия'''
+    dinosaur = simulation.dinosaur
+    actions = []
+    if dinosaur.can_shoot and not dinosaur.is_jumping:
+        actions.append(ACTION_SHOOT)
+    reach = 40 + simulation.game_speed * 8
+    for obstacle in simulation.obstacles:
+        if not obstacle.is_flying and 0 < obstacle.x - dinosaur.x < reach:
+            actions.append(ACTION_JUMP)
+            break
+    return actions
+
+
+class _Connection:
+    __slots__ = ('writer', 'role', 'track', 'acked')
+
+    def __init__(self, writer, role, track):
+        self.writer = writer
+        self.role = role
+        self.track = track
+        self.acked = 0 # последний подтверждённый снимок, 0 — ещё ни одного
+
+
+class SpectatorServer:
+    '''симуляции дорожек и рассылка их состояния всем подключённым
+
+    все дорожки играют одну партию с общим зерном и после конца всех партий
+    начинают новую. Снимок кодируется один раз на каждый различный
+    подтверждённый клиентами снимок, поэтому тысячи зрителей, идущих вровень,
+    стоят как один. Клиент, который не успевает забирать данные, пропускает
+    снимки, а не копит их в памяти сервера
+    '''
+    def __init__(self, tracks=1, seed=None, tick_rate=SPECTATOR_TICK_RATE, history=SPECTATOR_HISTORY, bot=False):
+        self.session_rng = random.Random(seed)
+        self.simulations = [Simulation() for _ in range(tracks)]
+        self.tick_rate = tick_rate
+        self.steps_per_tick = max(1, round(SIMULATION_TICK_RATE / tick_rate))
+        self.history_size = history
+        self.bot = bot
+        self.tick = 0
+        self.history: dict[int, list] = {} # номер снимка -> состояние дорожек
+        self.connections: set[_Connection] = set()
+        self._actions: list[list[str]] = [[] for _ in range(tracks)]
+        self._players = [0] * tracks # сколько игроков управляют дорожкой
+        self._restart_at = None
+
+        # счётчики для нагрузочного теста
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+        self.full_snapshots = 0
+        self.encodings = 0
+        self.skipped = 0 # снимки, не отправленные из-за переполненного буфера клиента
+        self.rejected = 0 # соединения, закрытые из-за неверных сообщений
+        self.new_round()
+
+    def new_round(self):
+        seed = self.session_rng.getrandbits(32)
+        for simulation in self.simulations:
+            simulation.reset(seed)
+        self._restart_at = None
+
+    async def handle_client(self, reader, writer):
+        connection = None
+        try:
+            hello = await _read_frame(reader, MAX_CLIENT_FRAME)
+            if len(hello) != HELLO.size or hello[0] != MSG_HELLO or hello[1] not in (ROLE_SPECTATOR, ROLE_PLAYER):
+                raise ValueError('ожидалось приветствие')
+            _, role, track = HELLO.unpack(hello)
+            connection = _Connection(writer, role, min(track, len(self.simulations) - 1))
+            self.connections.add(connection)
+            if role == ROLE_PLAYER:
+                self._players[connection.track] += 1
+            while True:
+                data = await _read_frame(reader, MAX_CLIENT_FRAME)
+                if not data:
+                    raise ValueError('пустое сообщение')
+                if data[0] == MSG_ACK:
+                    # обрезанное число выходит за конец кадра и даёт IndexError
+                    connection.acked = max(connection.acked, read_varint(data, 1)[0])
+                elif (data[0] == MSG_ACTION and len(data) == 2 and connection.role == ROLE_PLAYER
+                      and 0 < data[1] < len(ACTIONS)):
+                    self._actions[connection.track].append(ACTIONS[data[1]])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ValueError, IndexError):
+            # неверное сообщение закрывает только это соединение
+            self.rejected += 1
+        finally:
+            if connection is not None:
+                self.connections.discard(connection)
+                if connection.role == ROLE_PLAYER:
+                    self._players[connection.track] -= 1
+            writer.close()
+
+    def advance(self):
+        '''шаги симуляций за один интервал рассылки'''
+        for i, simulation in enumerate(self.simulations):
+            actions = self._actions[i]
+            self._actions[i] = []
+            for _ in range(self.steps_per_tick):
+                if self.bot and not self._players[i]:
+                    actions = [*actions, *bot_actions(simulation)]
+                simulation.step(actions)
+                actions = ()
+        if all(simulation.game_over for simulation in self.simulations):
+            # итог последней партии виден зрителям несколько секунд
+            if self._restart_at is None:
+                self._restart_at = self.tick + 3 * self.tick_rate
+            elif self.tick >= self._restart_at:
+                self.new_round()
+
+    def publish(self):
+        self.tick += 1
+        tracks = [capture(simulation) for simulation in self.simulations]
+        self.history[self.tick] = tracks
+        self.history.pop(self.tick - self.history_size, None)
+
+        encoded = {}
+        for connection in self.connections:
+            transport = connection.writer.transport
+            if transport.get_write_buffer_size() > SPECTATOR_MAX_BUFFERED:
+                self.skipped += 1
+                continue
+            base = connection.acked if connection.acked in self.history else 0
+            data = encoded.get(base)
+            if data is None:
+                snapshot = encode_snapshot(self.tick, tracks, base, self.history.get(base))
+                data = encoded[base] = FRAME.pack(len(snapshot)) + snapshot
+                self.encodings += 1
+            if not base:
+                self.full_snapshots += 1
+            transport.write(data)
+            self.bytes_sent += len(data)
+            self.snapshots_sent += 1
+
+    async def run(self, host='127.0.0.1', port=SPECTATOR_PORT, duration=None):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        start = next_time = loop.time()
+        async with server:
+            while duration is None or loop.time() - start < duration:
+                self.advance()
+                self.publish()
+                # интервалы отсчитываются от расписания, а не от конца работы, поэтому частота не плывёт
+                next_time += interval
+                await asyncio.sleep(max(0.0, next_time - loop.time()))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'tick': self.tick,
+            'connections': len(self.connections),
+            'snapshots_sent': self.snapshots_sent,
+            'full_snapshots': self.full_snapshots,
+            'encodings': self.encodings,
+            'skipped': self.skipped,
+            'rejected': self.rejected,
+            'bytes_sent': self.bytes_sent,
+        }
+
+
+async def _read_frame(reader, limit=None) -> bytes:
+    size = FRAME.unpack(await reader.readexactly(FRAME.size))[0]
+    if limit is not None and size > limit:
+        raise ValueError(f'кадр {size} Б длиннее {limit} Б')
+    return await reader.readexactly(size)
+
+
+def _frame(payload) -> bytes:
+    return FRAME.pack(len(payload)) + payload
+
+
+class Interpolator:
+    '''буфер снимков для плавной отрисовки: мир показывается на delay снимков позже последнего полученного
+
+    между соседними снимками координаты динозавра, препятствий и снарядов
+    интерполируются линейно, остальное берётся из более раннего снимка.
+    За пределы полученного ничего не предсказывается
+    '''
+    def __init__(self, tick_rate=SPECTATOR_TICK_RATE, delay=SPECTATOR_INTERPOLATION_DELAY):
+        self.tick_rate = tick_rate
+        self.delay = delay
+        self._snapshots: deque[tuple[int, list]] = deque(maxlen=32)
+        self._latest_time = 0.0
+
+    def push(self, tick, tracks, now):
+        if self._snapshots and tick <= self._snapshots[-1][0]:
+            return
+        self._snapshots.append((tick, tracks))
+        self._latest_time = now
+
+    def sample(self, now) -> list | None:
+        snapshots = self._snapshots
+        if not snapshots:
+            return None
+        render_tick = snapshots[-1][0] + (now - self._latest_time) * self.tick_rate - self.delay
+        if render_tick >= snapshots[-1][0]:
+            return snapshots[-1][1]
+        if render_tick <= snapshots[0][0]:
+            return snapshots[0][1]
+        for (tick_a, tracks_a), (tick_b, tracks_b) in zip(snapshots, list(snapshots)[1:]):
+            if tick_a <= render_tick <= tick_b:
+                return self._blend(tracks_a, tracks_b, (render_tick - tick_a) / (tick_b - tick_a))
+        return snapshots[-1][1]
+
+    @staticmethod
+    def _blend(tracks_a, tracks_b, t) -> list:
+        tracks = []
+        for (header_a, obstacles_a, fireballs_a), (header_b, obstacles_b, fireballs_b) in zip(tracks_a, tracks_b):
+            header = list(header_a)
+            header[2] += (header_b[2] - header_a[2]) * t
+            header[3] += (header_b[3] - header_a[3]) * t
+            tracks.append((tuple(header), _blend_entities(obstacles_a, obstacles_b, t),
+                           _blend_entities(fireballs_a, fireballs_b, t)))
+        return tracks
+
+
+def _blend_entities(entities_a, entities_b, t) -> dict:
+    '''сущности, исчезнувшие к следующему снимку, ещё видны; только что появившиеся — уже видны'''
+    blended = {}
+    for serial, a in entities_a.items():
+        b = entities_b.get(serial)
+        blended[serial] = a if b is None else (a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t) + a[2:]
+    for serial, b in entities_b.items():
+        if serial not in blended:
+            blended[serial] = b
+    return blended
+
+
+class SpectatorClient:
+    '''подключение к серверу: приём снимков, подтверждения и отправка действий игрока'''
+    def __init__(self, history=SPECTATOR_HISTORY, decode=True):
+        self.history_size = history
+        self.decode = decode # без декодирования клиент только подтверждает снимки (для нагрузочного теста)
+        self.states: dict[int, list] = {}
+        self.interpolator = Interpolator()
+        self.reader = None
+        self.writer = None
+        self.tick = 0
+        self.snapshots = 0
+        self.bytes_received = 0
+
+    async def connect(self, host='127.0.0.1', port=SPECTATOR_PORT, role=ROLE_SPECTATOR, track=0):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(_frame(HELLO.pack(MSG_HELLO, role, track)))
+
+    async def receive(self):
+        '''приём снимков до закрытия соединения'''
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await _read_frame(self.reader)
+                self.bytes_received += FRAME.size + len(data)
+                self.snapshots += 1
+                if self.decode:
+                    tick, tracks = decode_snapshot(data, self.states)
+                    self.states[tick] = tracks
+                    self.states.pop(tick - self.history_size, None)
+                    self.interpolator.push(tick, tracks, loop.time())
+                else:
+                    tick = snapshot_tick(data)
+                self.tick = tick
+                ack = bytearray((MSG_ACK,))
+                write_varint(ack, tick)
+                self.writer.write(_frame(ack))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def send_action(self, action):
+        self.writer.write(_frame(bytes((MSG_ACTION, ACTIONS.index(action)))))
+
+    def close(self):
+        self.writer.close()
+
+
+TRACK_COLORS = ((0, 0, 0), (200, 60, 60), (60, 120, 200), (60, 160, 60))
+
+
+def draw_tracks(screen, font, tracks):
+    '''все дорожки в одном окне: первая сплошными прямоугольниками, остальные контурами своего цвета'''
+    for i, (header, obstacles, fireballs) in enumerate(tracks):
+        width = 0 if i == 0 else 2
+        track_color = TRACK_COLORS[i % len(TRACK_COLORS)]
+        for x, y, w, h, kind in obstacles.values():
+            if kind & OBSTACLE_WALL:
+                color = (255, 0, 0)
+            elif kind & OBSTACLE_DESTRUCTIBLE:
+                color = (255, 255, 0)
+            else:
+                color = (0, 0, 255)
+            pygame.draw.rect(screen, color if i == 0 else track_color, (x, y, w, h), width)
+        for x, y, exploding in fireballs.values():
+            pygame.draw.circle(screen, (255, 120, 0) if not exploding else (255, 220, 0), (x, y), 10, width)
+        score, game_speed, x, y, h, flags, hp = header
+        pygame.draw.rect(screen, track_color, (x, y, 40, h), width)
+        text = f'дорожка {i}: счёт {score}, здоровье {hp}, скорость {game_speed}'
+        if flags & GAME_OVER:
+            text += ', конец игры'
+        screen.blit(font.render(text, True, track_color), (10, 10 + i * 24))
+
+
+async def watch(host, port, track=None):
+    '''окно зрителя; с track — ещё и управление этой дорожкой'''
+    from game.renderer import make_background
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption('Dino Game: зритель' if track is None else f'Dino Game: дорожка {track}')
+    background = make_background().convert()
+    font = pygame.font.Font(None, 24)
+    client = SpectatorClient()
+    await client.connect(host, port, ROLE_SPECTATOR if track is None else ROLE_PLAYER, track or 0)
+    receiver = asyncio.create_task(client.receive())
+    keys = {pygame.K_SPACE: ACTION_JUMP, pygame.K_UP: ACTION_JUMP, pygame.K_DOWN: ACTION_DUCK,
+            pygame.K_f: ACTION_SHOOT}
+    loop = asyncio.get_running_loop()
+    running = True
+    while running and not receiver.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                running = False
+            elif track is not None and event.type == pygame.KEYDOWN and event.key in keys:
+                client.send_action(keys[event.key])
+            elif track is not None and event.type == pygame.KEYUP and event.key == pygame.K_DOWN:
+                client.send_action(ACTION_STAND_UP)
+        screen.blit(background, (0, 0))
+        tracks = client.interpolator.sample(loop.time())
+        if tracks is not None:
+            draw_tracks(screen, font, tracks)
+        pygame.display.flip()
+        await asyncio.sleep(1 / FPS)
+    client.close()
+    receiver.cancel()
+    pygame.quit()
+
+
+def _serve_for_test(port, tracks, duration, results):
+    '''процесс сервера нагрузочного теста: своё процессорное время меряется отдельно от клиентов'''
+    server = SpectatorServer(tracks, seed=0, bot=True)
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    asyncio.run(server.run('127.0.0.1', port, duration))
+    stats = server.stats()
+    stats['cpu'] = (time.process_time() - cpu_start) / (time.perf_counter() - start)
+    results.put(stats)
+
+
+async def _run_clients(port, count, seconds, decoded):
+    clients = []
+    for i in range(count):
+        client = SpectatorClient(decode=i < decoded)
+        for _ in range(100):
+            try:
+                await client.connect('127.0.0.1', port)
+                break
+            except OSError:
+                await asyncio.sleep(0.05) # сервер ещё запускается
+        clients.append(client)
+    receivers = [asyncio.create_task(client.receive()) for client in clients]
+    await asyncio.sleep(1.0) # разогрев: первые полные снимки не входят в замер
+    snapshots = sum(client.snapshots for client in clients)
+    received = sum(client.bytes_received for client in clients)
+    await asyncio.sleep(seconds)
+    snapshots = sum(client.snapshots for client in clients) - snapshots
+    received = sum(client.bytes_received for client in clients) - received
+    lagging = sum(1 for client in clients if clients[0].tick - client.tick > SPECTATOR_INTERPOLATION_DELAY)
+    for client in clients:
+        client.close()
+    await asyncio.gather(*receivers, return_exceptions=True)
+    return snapshots / seconds, received / seconds, lagging
+
+
+def loadtest(counts, tracks, seconds, port, decoded):
+    '''сервер в отдельном процессе и count клиентов в этом; частота, трафик и нагрузка сервера'''
+    print(f'{SPECTATOR_TICK_RATE} снимков/с, дорожек: {tracks}, замер {seconds:.0f} с')
+    for count in counts:
+        results = multiprocessing.Queue()
+        server = multiprocessing.Process(target=_serve_for_test, args=(port, tracks, seconds + 3, results))
+        server.start()
+        rate, received, lagging = asyncio.run(_run_clients(port, count, seconds, min(decoded, count)))
+        stats = results.get()
+        server.join()
+        total_bytes = stats['bytes_sent'] or 1
+        print(f'клиентов {count:5d}: {rate / count:5.1f} снимков/с на клиента, '
+              f'{received / count / 1024:6.2f} КБ/с на клиента, {received / 1024:8.1f} КБ/с всего, '
+              f'сервер CPU {stats["cpu"]:6.1%}, кодирований {stats["encodings"]}, '
+              f'пропущено {stats["skipped"]}, отстающих {lagging}, '
+              f'средний снимок {total_bytes / max(1, stats["snapshots_sent"]):.0f} Б')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='сервер зрителей и гонок на одном зерне')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='запустить сервер')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=SPECTATOR_PORT)
+    serve.add_argument('--tracks', type=int, default=1, help='число дорожек (игроков) на одном зерне')
+    serve.add_argument('--seed', type=int, default=SESSION_SEED)
+    serve.add_argument('--bot', action='store_true', help='дорожки без игрока играет бот')
+    view = commands.add_parser('watch', help='окно зрителя или игрока')
+    view.add_argument('--host', default='127.0.0.1')
+    view.add_argument('--port', type=int, default=SPECTATOR_PORT)
+    view.add_argument('--play', type=int, metavar='TRACK', help='управлять этой дорожкой')
+    load = commands.add_parser('loadtest', help='нагрузочный тест через loopback')
+    load.add_argument('--clients', type=int, nargs='+', default=[10, 100, 500])
+    load.add_argument('--tracks', type=int, default=2)
+    load.add_argument('--seconds', type=float, default=5.0)
+    load.add_argument('--port', type=int, default=SPECTATOR_PORT + 1)
+    load.add_argument('--decoded', type=int, default=10, help='сколько клиентов полностью декодируют снимки')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = SpectatorServer(args.tracks, args.seed, bot=args.bot)
+        print(f'сервер на {args.host}:{args.port}, дорожек: {args.tracks}')
+        try:
+            asyncio.run(server.run(args.host, args.port))
+        except KeyboardInterrupt:
+            print(server.stats())
+    elif args.command == 'watch':
+        asyncio.run(watch(args.host, args.port, args.play))
+    else:
+        loadtest(args.clients, args.tracks, args.seconds, args.port, args.decoded)
+
+
+if __name__ == '__main__':
+    main()
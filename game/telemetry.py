@@ -0,0 +1,243 @@
+'''телеметрия партий: события игрового цикла пишутся в кольцевой буфер и сбрасываются в файлы фоновым потоком
+
+просмотр записанного из корня репозитория:
+    python -m game.telemetry telemetry/*.dtl            # сводка по событиям и партиям
+    python -m game.telemetry --dump telemetry/*.dtl     # все события построчно в NDJSON
+'''
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from config import BASE_GAME_SPEED
+from game.profiler import percentiles
+
+# типы событий; код — индекс в EVENT_NAMES
+EVENT_SESSION_START = 0 # значение — зерно партии
+EVENT_SESSION_END = 1 # значение — итоговый счёт
+EVENT_SPAWN = 2 # значение — 1 для летающего препятствия, 0 для наземного
+EVENT_DESTROY = 3 # препятствие уничтожено снарядом, значение — счёт после этого
+EVENT_HIT = 4 # удар по динозавру, значение — оставшееся здоровье
+EVENT_SHOT = 5 # выпущен снаряд, значение — скорость игры
+EVENT_SCORE = 6 # значение — новый счёт
+EVENT_SPEED = 7 # значение — новая скорость игры
+EVENT_FRAME = 8 # значение — время работы кадра в мс без ожидания
+EVENT_INPUT_LATENCY = 9 # значение — мс от нажатия до кадра на экране, шаг — тот, где нажатие применено
+EVENT_NAMES = ('session_start', 'session_end', 'spawn', 'destroy', 'hit', 'shot', 'score', 'speed', 'frame',
+               'input_latency')
+
+# запись фиксированного размера: код события, номер шага симуляции, значение
+RECORD = struct.Struct('<B3xId')
+# заголовок двоичного файла: сигнатура, версия, размер записи
+FILE_HEADER = struct.Struct('<4sBH')
+MAGIC = b'DRTL'
+VERSION = 1
+FORMAT_BINARY = 'binary'
+FORMAT_NDJSON = 'ndjson'
+
+
+class Telemetry:
+    '''шина событий с одним писателем (игровой цикл) и одним читателем (фоновый поток)
+
+    emit упаковывает событие прямо в заранее выделенный буфер без создания
+    объектов и без блокировок: писатель двигает только head, читатель — только
+    tail. Если буфер полон, событие отбрасывается и учитывается в dropped, а
+    игровой цикл никогда не ждёт диска. При переходе к новому файлу самые старые
+    файлы каталога удаляются, чтобы все вместе занимали не больше max_total_bytes
+    '''
+    def __init__(self, directory, file_format=FORMAT_BINARY, capacity=1 << 16,
+                 max_file_bytes=4 << 20, flush_interval=0.25, max_total_bytes=32 << 20):
+        self.directory = directory
+        self.file_format = file_format
+        self.capacity = capacity
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes # None — без ограничения
+        self.flush_interval = flush_interval
+        self._buffer = bytearray(RECORD.size * capacity)
+        self._head = 0 # сколько событий записано за всё время
+        self._tail = 0 # сколько событий прочитано фоновым потоком
+
+        # счётчики для наблюдения за противодавлением
+        self.dropped = 0
+        self.high_water = 0 # наибольшее заполнение буфера, замеченное при сбросе
+        self.written = 0
+        self.flushes = 0
+        self.files = 0
+        self.removed = 0 # старые файлы, удалённые ради ограничения объёма
+
+        self._file = None
+        self._file_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        self._thread.start()
+
+    def emit(self, code, tick, value=0.0):
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.dropped += 1
+            return
+        RECORD.pack_into(self._buffer, head % self.capacity * RECORD.size, code, tick, value)
+        # head сдвигается после записи, поэтому читатель не увидит недописанную запись
+        self._head = head + 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+
+    def flush(self):
+        '''перенос накопленных событий в файл; вызывается из фонового потока'''
+        head = self._head
+        tail = self._tail
+        if head == tail:
+            return
+        self.high_water = max(self.high_water, head - tail)
+        size = RECORD.size
+        start = tail % self.capacity
+        end = head % self.capacity
+        if start < end:
+            data = bytes(self._buffer[start * size:end * size])
+        else:
+            data = bytes(self._buffer[start * size:]) + bytes(self._buffer[:end * size])
+        # место в буфере освобождается только после копирования
+        self._tail = head
+
+        self._write(data)
+        self.written += head - tail
+        self.flushes += 1
+
+    def _write(self, data):
+        if self._file is None or self._file_bytes >= self.max_file_bytes:
+            self._rotate()
+        if self.file_format == FORMAT_NDJSON:
+            data = ''.join(json.dumps(_event(record)) + '\n' for record in RECORD.iter_unpack(data)).encode()
+        self._file.write(data)
+        self._file.flush()
+        self._file_bytes += len(data)
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        extension = 'ndjson' if self.file_format == FORMAT_NDJSON else 'dtl'
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{self.files}.{extension}')
+        self._file = open(path, 'ab')
+        self._file_bytes = 0
+        if self.file_format == FORMAT_BINARY:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.files += 1
+        if self.max_total_bytes is not None:
+            self._prune(path)
+
+    def _prune(self, current):
+        '''удаление самых старых файлов телеметрии, пока вместе с новым они не уложатся в max_total_bytes'''
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.path != current and entry.name.endswith(('.dtl', '.ndjson')):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+        # место для нового файла оставляется заранее: он дорастёт до max_file_bytes
+        total = sum(size for _, _, size in files) + self.max_file_bytes
+        files.sort()
+        for _, path, size in files:
+            if total <= self.max_total_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue # файл занят или уже удалён другим процессом
+            total -= size
+            self.removed += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'emitted': self._head,
+            'pending': self._head - self._tail,
+            'dropped': self.dropped,
+            'written': self.written,
+            'high_water': self.high_water,
+            'flushes': self.flushes,
+            'files': self.files,
+            'removed': self.removed,
+        }
+
+    def close(self):
+        '''последний сброс и закрытие файла; ждёт фоновый поток'''
+        self._stop.set()
+        self._thread.join()
+
+
+def _event(record) -> dict:
+    code, tick, value = record
+    return {'event': EVENT_NAMES[code], 'tick': tick, 'value': value}
+
+
+def read_events(path):
+    '''события файла телеметрии любого формата в виде (код, шаг, значение)'''
+    if path.endswith('.ndjson'):
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                event = json.loads(line)
+                yield EVENT_NAMES.index(event['event']), event['tick'], event['value']
+        return
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, record_size = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f'{path}: не файл телеметрии этой версии')
+    # недописанный хвост (например, после аварийного завершения) отбрасывается
+    end = FILE_HEADER.size + (len(data) - FILE_HEADER.size) // RECORD.size * RECORD.size
+    yield from RECORD.iter_unpack(memoryview(data)[FILE_HEADER.size:end])
+
+
+def summarize(paths) -> list[str]:
+    counts = [0] * len(EVENT_NAMES)
+    sessions = []
+    frames = []
+    latencies = []
+    for path in paths:
+        for code, tick, value in read_events(path):
+            counts[code] += 1
+            if code == EVENT_SESSION_START:
+                sessions.append({'seed': int(value), 'score': 0, 'ticks': 0, 'max_speed': float(BASE_GAME_SPEED)})
+            elif sessions:
+                session = sessions[-1]
+                session['ticks'] = max(session['ticks'], tick)
+                if code in (EVENT_SCORE, EVENT_SESSION_END, EVENT_DESTROY):
+                    session['score'] = int(value)
+                elif code == EVENT_SPEED:
+                    session['max_speed'] = max(session['max_speed'], value)
+            if code == EVENT_FRAME:
+                frames.append(value)
+            elif code == EVENT_INPUT_LATENCY:
+                latencies.append(value)
+
+    lines = [', '.join(f'{name}: {count}' for name, count in zip(EVENT_NAMES, counts))]
+    for session in sessions:
+        lines.append(f'партия {session["seed"]}: счёт {session["score"]}, шагов {session["ticks"]}, '
+                     f'наибольшая скорость {session["max_speed"]:.0f}')
+    for label, values in (('кадр', frames), ('задержка ввода', latencies)):
+        if values:
+            lines.append(label + ' ' + ' '.join(f'{name} {ms:.2f}' for name, ms in percentiles(values).items()) + ' мс')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='просмотр записанной телеметрии')
+    parser.add_argument('paths', nargs='+', help='файлы .dtl или .ndjson')
+    parser.add_argument('--dump', action='store_true', help='вывести все события в NDJSON')
+    args = parser.parse_args()
+    if args.dump:
+        for path in args.paths:
+            for record in read_events(path):
+                print(json.dumps(_event(record)))
+        return
+    for line in summarize(args.paths):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()